@@ -0,0 +1,202 @@
+"""
+NeuroForge Admin Router
+
+Operational endpoints for the workbench app. All routes require the admin
+API key in the X-API-Key header.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from admission_control import admission_controller, stream_admission_controller
+import database
+from chain_memo import node_memo_cache
+from config import config
+from deployment_cache import deployment_resolver
+from embedding_service import embedding_service
+from fallback_maintenance import fallback_maintainer
+from ollama_scheduler import ollama_scheduler
+from output_cache import exact_output_cache
+from planning_sessions import planning_sessions
+from prompt_cache import fetch_model_cache_totals, fetch_reuse_report, prompt_cache_ledger
+from prompt_versions import prompt_version_store
+from provider_catalog import provider_catalog
+from provider_pool import provider_transport
+from provider_stats import provider_stats
+from tracing import profiler, tracer
+
+logger = logging.getLogger(__name__)
+
+
+async def verify_admin_api_key(x_api_key: Optional[str] = Header(None)) -> str:
+    """Validate the admin API key."""
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Missing X-API-Key header")
+
+    if not config.admin_api_key:
+        if config.environment == "production":
+            raise HTTPException(status_code=503, detail="Admin API key not configured")
+        logger.warning("Development mode: No admin API key configured. Accepting any key.")
+        return x_api_key
+
+    if x_api_key != config.admin_api_key:
+        raise HTTPException(status_code=403, detail="Invalid admin API key")
+    return x_api_key
+
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    dependencies=[Depends(verify_admin_api_key)]
+)
+
+
+@router.get("/tracing")
+async def get_tracing_snapshot(limit: int = Query(20, ge=0, le=200)):
+    """Span latency histograms (with exemplars) and recent sampled traces."""
+    return tracer.snapshot(trace_limit=limit)
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def run_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1.0, le=100.0)
+):
+    """
+    Run a time-boxed sampling profiler on the live process.
+
+    Returns collapsed stacks, ready for flamegraph.pl or speedscope.
+    """
+    seconds = min(seconds, config.profile_max_seconds)
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.to_folded(stacks)
+
+
+@router.get("/providers/pools")
+async def get_provider_pools():
+    """Connection pool limits, usage and saturation per provider."""
+    return provider_transport.snapshot()
+
+
+@router.post("/providers/{provider}/warm")
+async def warm_provider_pool(provider: str):
+    """Pre-warm a provider's connection pool."""
+    if provider not in provider_transport.configs:
+        raise HTTPException(status_code=404, detail=f"Unknown provider: {provider}")
+    return {"provider": provider, "warmed": await provider_transport.warm(provider)}
+
+
+@router.get("/ollama/scheduler")
+async def get_ollama_scheduler():
+    """Local Ollama queue depths, resident models and swap counts."""
+    return ollama_scheduler.snapshot()
+
+
+@router.get("/routing/stats")
+async def get_routing_stats():
+    """Sliding-window latency, error rate and cost per provider/model."""
+    return provider_stats.snapshot()
+
+
+@router.get("/cache/output")
+async def get_output_cache_stats():
+    """Exact-match output cache size, hit rate and bytes saved."""
+    return exact_output_cache.snapshot()
+
+
+@router.get("/fallback/maintenance")
+async def get_fallback_maintenance():
+    """Fallback store maintenance state and the last pass's results."""
+    return fallback_maintainer.snapshot()
+
+
+@router.post("/fallback/maintenance")
+async def run_fallback_maintenance(vacuum: bool = Query(False, description="Force VACUUM")):
+    """Run a maintenance pass now (flush, evict, analyze/vacuum)."""
+    try:
+        return await asyncio.to_thread(fallback_maintainer.run_once, vacuum)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Fallback store maintenance failed: {e}")
+
+
+@router.get("/deployments/cache")
+async def get_deployment_cache():
+    """Cached deployment artifacts and resolver hit/load counts."""
+    return deployment_resolver.snapshot()
+
+
+@router.post("/deployments/cache/refresh")
+async def refresh_deployment_cache():
+    """Run the deployment version check now."""
+    return await deployment_resolver.refresh()
+
+
+@router.get("/admission")
+async def get_admission_state():
+    """Adaptive concurrency limit, queue depths per priority and rejection counts (streams separately)."""
+    return {**admission_controller.snapshot(), "streams": stream_admission_controller.snapshot()}
+
+
+@router.get("/prompt-cache/report")
+async def get_prompt_cache_report(prompt_id: Optional[str] = None):
+    """Achieved provider prefix-cache reuse per prompt/version, worst first."""
+    if database.engine is None:
+        raise HTTPException(status_code=503, detail="Inference database not initialized")
+    await prompt_cache_ledger.flush(database.engine)
+    async with database.engine.connect() as conn:
+        return {"prompts": await fetch_reuse_report(conn, prompt_id)}
+
+
+@router.get("/prompt-cache/models")
+async def get_prompt_cache_model_totals():
+    """Cached vs. total input tokens per model."""
+    if database.engine is None:
+        raise HTTPException(status_code=503, detail="Inference database not initialized")
+    await prompt_cache_ledger.flush(database.engine)
+    async with database.engine.connect() as conn:
+        return {"models": await fetch_model_cache_totals(conn)}
+
+
+@router.get("/embeddings/stats")
+async def get_embedding_stats():
+    """Embedding backend, cache hit counts and achieved batch sizes."""
+    return embedding_service.snapshot()
+
+
+@router.get("/chains/memo")
+async def get_chain_memo_stats():
+    """Chain node memo size and hit counts."""
+    return node_memo_cache.snapshot()
+
+
+@router.get("/providers/health")
+async def get_provider_health():
+    """Per-provider probe results behind the /api/v1/models catalog."""
+    return provider_catalog.status_detail()
+
+
+@router.post("/providers/health/refresh")
+async def refresh_provider_health():
+    """Probe every provider now instead of waiting for the schedule."""
+    return {"reachable": await provider_catalog.refresh(), "etag": provider_catalog.snapshot.etag}
+
+
+@router.get("/planning/sessions")
+async def get_planning_session_stats():
+    """Live planning sessions and start/attach/resume/replay counts."""
+    return planning_sessions.snapshot()
+
+
+@router.get("/prompt-versions/stats")
+async def get_prompt_version_stats(prompt_id: Optional[str] = None):
+    """Snapshot/delta counts, stored vs full-copy bytes and materialization cache use."""
+    return await asyncio.to_thread(prompt_version_store.storage_stats, prompt_id)
@@ -0,0 +1,497 @@
+"""
+NeuroForge Admission Control
+
+Bounded, prioritized admission in front of LLM-bound endpoints.
+
+- Requests queue per priority class (interactive before standard before
+  batch) and round-robin across tenants within a class, so one tenant's
+  burst cannot starve the others.
+- The concurrency limit adapts to provider call latency (gradient style, fed
+  by provider_stats with a baseline per provider/model): it grows while
+  latency stays near the no-load baseline and shrinks as queueing inside the
+  providers pushes latency up. Timeouts, 5xx and failed provider calls cut it
+  multiplicatively. End-to-end HTTP time only feeds the queue-wait estimate.
+- Streaming routes (SSE) hold a slot for the whole stream, so they are
+  admitted by a separate controller with a fixed limit and never feed the
+  gradient.
+- A request whose estimated queue wait exceeds its deadline is rejected up
+  front with Retry-After (429 when its tenant is over its queue share, 503
+  otherwise) instead of timing out later.
+- Tenant and priority headers are honored only from allowlisted clients
+  (e.g. the trusted reverse proxy); anyone else is their own tenant and may
+  only lower their priority.
+
+Queue wait is exported separately from service time.
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Hashable, Optional, Sequence, Tuple
+
+from config import config
+from provider_stats import provider_stats
+from tracing import tracer
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    Counter = Gauge = Histogram = None
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES: Tuple[str, ...] = ("interactive", "standard", "batch")
+
+QUEUE_WAIT = ADMISSION_REJECTED = CONCURRENCY_LIMIT = None
+if Histogram is not None:
+    QUEUE_WAIT = Histogram(
+        "admission_queue_wait_seconds", "Time spent queued for admission", ["priority"],
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    ADMISSION_REJECTED = Counter(
+        "admission_rejected_total", "Requests rejected by admission control", ["priority", "reason"]
+    )
+    CONCURRENCY_LIMIT = Gauge(
+        "admission_concurrency_limit", "Current adaptive concurrency limit", ["pool"],
+        multiprocess_mode="livesum"
+    )
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After."""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class GradientLimit:
+    """
+    Adaptive concurrency limit.
+
+    Each sample compares a slow moving baseline latency with the sample:
+    gradient = clamp(tolerance * baseline / sample, 0.5, 1.0), and the limit
+    moves toward limit * gradient + sqrt(limit). Healthy latency therefore
+    grows the limit by ~sqrt(limit) per sample; inflated latency shrinks it,
+    by at most max_decrease per sample.
+
+    The baseline is the mean of the first warmup_samples samples, then a slow
+    EWMA in both directions, so a single fast (or slow) outlier barely moves
+    it. The limit is not adjusted until the warmup is over. Samples may carry
+    a key (provider, model); each key keeps its own baseline, so a shift in
+    model mix is not mistaken for congestion.
+    """
+
+    def __init__(
+        self,
+        initial: float = 20.0,
+        min_limit: float = 2.0,
+        max_limit: float = 500.0,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        baseline_alpha: float = 0.01,
+        backoff: float = 0.9,
+        max_decrease: float = 0.05,
+        warmup_samples: int = 10
+    ):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.baseline_alpha = baseline_alpha
+        self.backoff = backoff
+        self.max_decrease = max_decrease
+        self.warmup_samples = warmup_samples
+        self.baselines: Dict[Hashable, float] = {}
+        self._samples: Dict[Hashable, int] = {}
+
+    def on_sample(
+        self, latency: float, in_flight: int, dropped: bool = False, key: Hashable = None
+    ) -> float:
+        if dropped:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return self.limit
+        samples = self._samples[key] = self._samples.get(key, 0) + 1
+        baseline = self.baselines.get(key)
+        if baseline is None:
+            baseline = latency
+        else:
+            # Running mean while warming up, then a slow EWMA
+            alpha = max(self.baseline_alpha, 1.0 / samples)
+            baseline += alpha * (latency - baseline)
+        self.baselines[key] = baseline
+
+        if samples <= self.warmup_samples or in_flight < self.limit / 2:
+            return self.limit  # warming up, or app-limited: samples say nothing about capacity
+        gradient = max(0.5, min(1.0, self.tolerance * baseline / max(latency, 1e-9)))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit + self.smoothing * (target - self.limit)
+        limit = max(limit, self.limit * (1.0 - self.max_decrease))
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        return self.limit
+
+
+@dataclass
+class _Waiter:
+    tenant: str
+    priority: str
+    deadline: float
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """Priority/tenant-fair queues in front of an adaptive concurrency limit."""
+
+    def __init__(
+        self,
+        limit: Optional[GradientLimit] = None,
+        max_queue: int = 1000,
+        max_queue_per_tenant: int = 100,
+        default_timeouts: Optional[Dict[str, float]] = None,
+        provider_feedback: bool = False,
+        name: str = "default"
+    ):
+        self.limiter = limit or GradientLimit()
+        self.name = name
+        # With provider feedback the gradient follows provider call latency only;
+        # otherwise it follows the time each admitted request holds its slot
+        self.provider_feedback = provider_feedback
+        self.max_queue = max_queue
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.default_timeouts = default_timeouts or {"interactive": 30.0, "standard": 60.0, "batch": 300.0}
+
+        # priority -> tenant -> waiters; OrderedDict order is the round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._queued = 0
+        self._queued_by_tenant: Dict[str, int] = {}
+        self.in_flight = 0
+        self._service_time: Optional[float] = None  # EWMA seconds per admitted request
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def slot(self, tenant: str = "default", priority: str = "standard", timeout: Optional[float] = None):
+        """
+        Hold one unit of concurrency for the body of the `async with`.
+
+        Raises AdmissionRejected if the request cannot be admitted in time.
+        Yields the seconds spent queued.
+        """
+        if priority not in self._queues:
+            priority = "standard"
+        timeout = timeout if timeout is not None else self.default_timeouts.get(priority, 60.0)
+        queued_for = await self._acquire(tenant, priority, timeout)
+
+        start = time.monotonic()
+        dropped = False
+        try:
+            yield queued_for
+        except (asyncio.TimeoutError, TimeoutError):
+            dropped = True
+            raise
+        finally:
+            self._release(time.monotonic() - start, dropped)
+
+    def record_drop(self) -> None:
+        """Report a provider timeout/5xx seen outside `slot()` (cuts the limit)."""
+        self._update_limit(self.limiter.on_sample(0.0, self.in_flight, dropped=True))
+
+    def observe_provider_call(self, provider: str, model: str, latency_ms: float, success: bool) -> None:
+        """provider_stats listener: one provider call's latency drives the gradient."""
+        if not success:
+            self.record_drop()
+            return
+        self._update_limit(self.limiter.on_sample(latency_ms / 1000, self.in_flight, key=(provider, model)))
+
+    def estimated_wait(self, priority: str) -> float:
+        """Seconds a new request of this priority would queue, from current throughput."""
+        ahead = 0
+        for p in PRIORITIES:
+            ahead += sum(len(q) for q in self._queues[p].values())
+            if p == priority:
+                break
+        if self.in_flight + ahead < self.limit:
+            return 0.0
+        service_time = self._service_time or 1.0
+        throughput = self.limit / service_time  # completions per second at the current limit
+        return (ahead + 1) / throughput
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.limiter.limit))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limiter.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": {p: sum(len(q) for q in tenants.values()) for p, tenants in self._queues.items()},
+            "queued_tenants": len(self._queued_by_tenant),
+            "baseline_latency_s": {
+                "/".join(key) if isinstance(key, tuple) else "request": baseline
+                for key, baseline in self.limiter.baselines.items()
+            },
+            "service_time_s": self._service_time,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _reject(self, status_code: int, retry_after: float, reason: str, priority: str) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        if ADMISSION_REJECTED is not None:
+            ADMISSION_REJECTED.labels(priority=priority, reason=reason).inc()
+        return AdmissionRejected(status_code, max(1.0, retry_after), reason)
+
+    async def _acquire(self, tenant: str, priority: str, timeout: float) -> float:
+        if self.in_flight < self.limit and self._queued == 0:
+            self.in_flight += 1
+            self.admitted += 1
+            self._observe_wait(priority, 0.0)
+            return 0.0
+
+        wait = self.estimated_wait(priority)
+        if wait > timeout:
+            raise self._reject(503, wait, "deadline", priority)
+        if self._queued_by_tenant.get(tenant, 0) >= self.max_queue_per_tenant:
+            raise self._reject(429, wait, "tenant_queue_full", priority)
+        if self._queued >= self.max_queue:
+            raise self._reject(503, wait, "queue_full", priority)
+
+        waiter = _Waiter(tenant, priority, time.monotonic() + timeout, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(tenant, deque()).append(waiter)
+        self._queued += 1
+        self._queued_by_tenant[tenant] = self._queued_by_tenant.get(tenant, 0) + 1
+
+        with tracer.span("admission.queue", priority=priority, tenant=tenant):
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Admitted just as we gave up; hand the slot on
+                    self.in_flight -= 1
+                    self._dispatch()
+                else:
+                    waiter.future.cancel()
+                    self._remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise self._reject(503, self.estimated_wait(priority), "timeout", priority)
+
+        queued_for = time.monotonic() - waiter.enqueued_at
+        self._observe_wait(priority, queued_for)
+        return queued_for
+
+    def _remove(self, waiter: _Waiter) -> None:
+        tenants = self._queues[waiter.priority]
+        queue = tenants.get(waiter.tenant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._dequeued(waiter, tenants, queue)
+
+    def _dequeued(self, waiter: _Waiter, tenants, queue) -> None:
+        self._queued -= 1
+        remaining = self._queued_by_tenant[waiter.tenant] - 1
+        if remaining:
+            self._queued_by_tenant[waiter.tenant] = remaining
+        else:
+            del self._queued_by_tenant[waiter.tenant]
+        if not queue:
+            del tenants[waiter.tenant]
+
+    def _dispatch(self) -> None:
+        """Admit queued waiters while there is capacity."""
+        now = time.monotonic()
+        while self.in_flight < self.limit and self._queued:
+            waiter = self._pop_next()
+            if waiter is None:
+                break
+            if waiter.future.done() or waiter.deadline <= now:
+                continue  # gave up, or would miss its deadline anyway
+            self.in_flight += 1
+            self.admitted += 1
+            waiter.future.set_result(None)
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            tenants = self._queues[priority]
+            if not tenants:
+                continue
+            tenant, queue = next(iter(tenants.items()))
+            waiter = queue.popleft()
+            self._dequeued(waiter, tenants, queue)
+            if queue:
+                tenants.move_to_end(tenant)  # round-robin to the next tenant
+            return waiter
+        return None
+
+    def _release(self, service_time: float, dropped: bool) -> None:
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if not dropped:
+            self._service_time = (
+                service_time if self._service_time is None
+                else self._service_time + 0.1 * (service_time - self._service_time)
+            )
+        if dropped or not self.provider_feedback:
+            self._update_limit(self.limiter.on_sample(service_time, in_flight, dropped))
+        self._dispatch()
+
+    def _update_limit(self, limit: float) -> None:
+        if CONCURRENCY_LIMIT is not None:
+            CONCURRENCY_LIMIT.labels(pool=self.name).set(limit)
+
+    def _observe_wait(self, priority: str, seconds: float) -> None:
+        if QUEUE_WAIT is not None:
+            QUEUE_WAIT.labels(priority=priority).observe(seconds)
+
+
+def route_matcher(routes: Sequence[str]):
+    """
+    Predicate matching request paths against exact route templates.
+
+    Paths are compared segment by segment; a `{param}` segment matches any
+    single segment, so "/api/v1/workbench/chains/{chain_id}/execute" matches
+    one chain's execute route but not /api/v1/workbench/chains/{id}/executions.
+    """
+    templates = [tuple(route.strip("/").split("/")) for route in routes]
+
+    def matches(path: str) -> bool:
+        segments = path.strip("/").split("/")
+        for template in templates:
+            if len(template) == len(segments) and all(
+                t == s or (t.startswith("{") and t.endswith("}") and s)
+                for t, s in zip(template, segments)
+            ):
+                return True
+        return False
+
+    return matches
+
+
+def client_allowlist(entries: Sequence[str]):
+    """Predicate matching client addresses against IPs and CIDR ranges."""
+    networks = [ipaddress.ip_network(entry.strip(), strict=False) for entry in entries if entry.strip()]
+
+    def allowed(host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in networks)
+
+    return allowed
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying admission control to LLM-bound routes.
+
+    The deadline comes from X-Request-Timeout (seconds). From trusted clients
+    the tenant comes from X-Tenant-ID (or X-User-ID) and the priority from
+    X-Priority; other clients are keyed by address and can only lower their
+    priority. Queue time is reported in a Server-Timing header. CORS
+    preflights are never queued.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        routes: Sequence[str],
+        trusted_clients: Sequence[str] = ()
+    ):
+        self.app = app
+        self.controller = controller
+        self.matches = route_matcher(routes)
+        self.trusted = client_allowlist(trusted_clients)
+
+    def _tenant_and_priority(self, scope, headers: Dict[str, str]) -> Tuple[str, str]:
+        client = (scope.get("client") or ("anon",))[0]
+        priority = headers.get("x-priority", "standard").lower()
+        if self.trusted(client):
+            return headers.get("x-tenant-id") or headers.get("x-user-id") or client, priority
+        if priority not in PRIORITIES or PRIORITIES.index(priority) < PRIORITIES.index("standard"):
+            priority = "standard"
+        return client, priority
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS" or not self.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        tenant, priority = self._tenant_and_priority(scope, headers)
+        try:
+            timeout = float(headers["x-request-timeout"]) if "x-request-timeout" in headers else None
+        except ValueError:
+            timeout = None
+
+        try:
+            async with self.controller.slot(tenant, priority, timeout) as queued_for:
+                status = {}
+
+                async def timed_send(message):
+                    if message["type"] == "http.response.start":
+                        status["code"] = message["status"]
+                        message = dict(message)
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"server-timing", f"queue;dur={queued_for * 1000:.1f}".encode())
+                        ]
+                    await send(message)
+
+                await self.app(scope, receive, timed_send)
+                if status.get("code") in (502, 503, 504):
+                    self.controller.record_drop()
+        except AdmissionRejected as e:
+            body = json.dumps({"detail": f"Server busy ({e.reason}), retry later"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": e.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(math.ceil(e.retry_after)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+
+# Global instances
+admission_controller = AdmissionController(
+    limit=GradientLimit(
+        initial=config.admission_initial_limit,
+        min_limit=config.admission_min_limit,
+        max_limit=config.admission_max_limit,
+    ),
+    max_queue=config.admission_max_queue,
+    max_queue_per_tenant=config.admission_max_queue_per_tenant,
+    provider_feedback=True,
+)
+provider_stats.add_listener(admission_controller.observe_provider_call)
+
+stream_admission_controller = AdmissionController(
+    limit=GradientLimit(
+        initial=config.admission_stream_limit,
+        min_limit=config.admission_stream_limit,
+        max_limit=config.admission_stream_limit,
+    ),
+    max_queue=config.admission_max_queue,
+    max_queue_per_tenant=config.admission_max_queue_per_tenant,
+    name="stream",
+)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: micro-batched vs unbatched embeddings.
+
+Drives N concurrent callers through EmbeddingService and reports embeddings
+per second, CPU milliseconds per embedding (process time, so it reads as
+cost per core), and the achieved batch size. The backend is the hashing
+stand-in wrapped with a simulated per-call overhead, a per-text cost and a
+cap on parallel calls, which is the shape of both a rate-limited embeddings
+API and a local model on a few cores.
+
+Usage:
+    python benchmarks/bench_embeddings.py                  # 2000 texts
+    python benchmarks/bench_embeddings.py 5000 2.0 0.05 4
+        # texts, per-call overhead ms, per-text cost ms, parallel backend calls
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from embedding_service import EmbeddingService, HashingBackend  # noqa: E402
+
+CONCURRENCY_LEVELS = (1, 8, 64, 256)
+
+
+class SimulatedBackend(HashingBackend):
+    """Hashing embeddings plus per-call overhead, per-text cost and limited parallelism."""
+
+    def __init__(self, call_overhead_ms: float, per_text_ms: float, parallel: int):
+        super().__init__(dimension=384)
+        self.call_overhead_ms = call_overhead_ms
+        self.per_text_ms = per_text_ms
+        self._slots = asyncio.Semaphore(parallel)
+
+    async def embed_batch(self, texts):
+        async with self._slots:
+            await asyncio.sleep((self.call_overhead_ms + self.per_text_ms * len(texts)) / 1000)
+            return await super().embed_batch(texts)
+
+
+async def run(texts, concurrency: int, max_batch_size: int, backend_args: tuple) -> dict:
+    service = EmbeddingService(
+        SimulatedBackend(*backend_args), max_batch_size=max_batch_size, max_wait_ms=2.0,
+        cache_size=0
+    )
+    queue = list(reversed(texts))
+
+    async def worker():
+        while queue:
+            await service.embed(queue.pop())
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    stats = service.snapshot()
+    return {
+        "per_sec": len(texts) / wall,
+        "cpu_ms": cpu * 1000 / len(texts),
+        "avg_batch": stats["avg_batch_size"],
+    }
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    overhead_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    per_text_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    parallel = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    # Unique texts so the LRU never answers for the backend
+    texts = [f"request {i}: summarise chapter {i % 97} in the style of volume {i % 13}" for i in range(count)]
+
+    print(f"{count} texts, {overhead_ms}ms per call + {per_text_ms}ms per text, {parallel} parallel calls\n")
+    print(f"{'concurrency':>11}  {'mode':>9}  {'emb/s':>10}  {'cpu ms/emb':>10}  {'avg batch':>9}")
+    for concurrency in CONCURRENCY_LEVELS:
+        for mode, batch_size in (("unbatched", 1), ("batched", 64)):
+            result = asyncio.run(run(texts, concurrency, batch_size, (overhead_ms, per_text_ms, parallel)))
+            print(
+                f"{concurrency:>11}  {mode:>9}  {result['per_sec']:>10.0f}  "
+                f"{result['cpu_ms']:>10.3f}  {result['avg_batch']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark: response and DataForge payload (de)serialization.
+
+Compares the usual path (Pydantic validation + model_dump + stdlib json) with
+the serialization module on realistic payloads: a 100-item prompt list, a
+20-node chain definition and an execution result carrying full node outputs.
+Decoding is measured both as typed models (validate_json, one pydantic-core
+pass) and as plain dicts (loads, for trusted pass-through data).
+
+Usage:
+    python benchmarks/bench_serialization.py            # 200 iterations
+    python benchmarks/bench_serialization.py 1000
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import serialization  # noqa: E402
+from serialization import dumps, iter_json_array, loads, validate_json  # noqa: E402
+
+
+class PromptVersion(BaseModel):
+    version: str
+    base_prompt: str
+    parameters: Dict[str, Any] = {}
+    created_at: str
+
+
+class Prompt(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    tags: List[str] = []
+    versions: List[PromptVersion]
+
+
+class ChainNode(BaseModel):
+    id: str
+    prompt_id: str
+    prompt_name: str
+    x: float
+    y: float
+    inputs: Dict[str, Any] = {}
+    outputs: List[str] = []
+
+
+class Chain(BaseModel):
+    id: str
+    name: str
+    nodes: List[ChainNode]
+    connections: List[Dict[str, str]]
+
+
+class NodeResult(BaseModel):
+    node_id: str
+    output: str
+    model_used: str
+    latency_ms: float
+    tokens_used: int
+
+
+class ChainExecution(BaseModel):
+    execution_id: str
+    chain_id: str
+    status: str
+    node_results: List[NodeResult]
+
+
+PARAGRAPH = "The archivist unrolled the map and traced the river back to its source. " * 8
+
+
+def payloads() -> Dict[str, tuple]:
+    prompts = {"prompts": [
+        {
+            "id": f"prompt_{i}", "name": f"Character Creator {i}", "description": "Builds a character sheet",
+            "tags": ["fiction", "character", "draft"],
+            "versions": [
+                {"version": f"v{v}", "base_prompt": PARAGRAPH, "parameters": {"temperature": 0.7, "max_tokens": 800},
+                 "created_at": "2024-05-01T12:30:00Z"}
+                for v in range(3)
+            ],
+        }
+        for i in range(100)
+    ]}
+    chain = {
+        "id": "chain_1", "name": "Novel outline",
+        "nodes": [
+            {"id": f"node{i}", "prompt_id": f"prompt_{i}", "prompt_name": f"Step {i}", "x": 100.0 * i, "y": 80.0,
+             "inputs": {"style": "noir", "length": 1200}, "outputs": ["draft", "notes"]}
+            for i in range(20)
+        ],
+        "connections": [{"from": f"node{i}", "to": f"node{i + 1}"} for i in range(19)],
+    }
+    execution = {
+        "execution_id": "exec_1", "chain_id": "chain_1", "status": "completed",
+        "node_results": [
+            {"node_id": f"node{i}", "output": PARAGRAPH * 6, "model_used": "gpt-4",
+             "latency_ms": 1234.5, "tokens_used": 950}
+            for i in range(20)
+        ],
+    }
+    return {
+        "prompt list (100)": (prompts, Prompt, "prompts"),
+        "chain definition": (chain, Chain, None),
+        "execution result": (execution, ChainExecution, None),
+    }
+
+
+def timed(fn, iterations: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / iterations
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"JSON backend: {serialization.BACKEND}, {iterations} iterations, microseconds per payload\n")
+    print(f"{'payload':<20} {'bytes':>8}  {'encode: validate+json':>22} {'fast':>8} {'x':>5}"
+          f"  {'decode: json+validate':>22} {'typed':>8} {'x':>5} {'dicts':>8} {'x':>5}")
+
+    for name, (data, model, list_key) in payloads().items():
+        if list_key:
+            # List endpoints: one model per item
+            def slow_encode():
+                items = [model.model_validate(item) for item in data[list_key]]
+                return json.dumps({list_key: [m.model_dump(mode="json") for m in items]}).encode()
+
+            def fast_encode():
+                return dumps(data)
+
+            encoded = fast_encode()
+
+            def slow_decode():
+                return [model.model_validate(item) for item in json.loads(encoded)[list_key]]
+
+            items_encoded = dumps(data[list_key])
+
+            def fast_decode():
+                return validate_json(List[model], items_encoded)
+        else:
+            def slow_encode():
+                return json.dumps(model.model_validate(data).model_dump(mode="json")).encode()
+
+            def fast_encode():
+                return dumps(data)
+
+            encoded = fast_encode()
+
+            def slow_decode():
+                return model.model_validate(json.loads(encoded))
+
+            def fast_decode():
+                return validate_json(model, encoded)
+
+        se, fe = timed(slow_encode, iterations), timed(fast_encode, iterations)
+        sd, fd = timed(slow_decode, iterations), timed(fast_decode, iterations)
+        dd = timed(lambda: loads(encoded), iterations)
+        print(f"{name:<20} {len(encoded):>8}  {se:>22.1f} {fe:>8.1f} {se / fe:>5.1f}"
+              f"  {sd:>22.1f} {fd:>8.1f} {sd / fd:>5.1f} {dd:>8.1f} {sd / dd:>5.1f}")
+
+    # Streaming: time to first byte and peak chunk size for a large list
+    rows = [{"id": i, "output": PARAGRAPH} for i in range(5000)]
+
+    async def first_chunk():
+        start = time.perf_counter()
+        sizes = []
+        async for chunk in iter_json_array(rows, key="runs"):
+            if not sizes:
+                first = time.perf_counter() - start
+            sizes.append(len(chunk))
+        return first, max(sizes), sum(sizes)
+
+    first, peak, total = asyncio.run(first_chunk())
+    whole = timed(lambda: json.dumps({"runs": rows}), 5)
+    print(f"\nstreamed list of 5000: first chunk after {first * 1e6:.0f}us, largest chunk {peak} bytes "
+          f"of {total}; one-shot stdlib render {whole:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput scaling with worker processes.
+
+Starts gunicorn (gunicorn.conf.py, UvicornWorker) with 1..N workers, drives a
+fixed-concurrency load against one endpoint, and reports requests/second per
+worker count. Also times the shared cache against a cold lookup.
+
+Usage:
+    python benchmarks/bench_workers.py                          # /health, up to CPU count
+    python benchmarks/bench_workers.py workbench_app:app /health 8 20
+        # app, path, max workers, seconds per run
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from shared_cache import SharedCache, SharedCacheStore  # noqa: E402
+
+PORT = 8765
+CONCURRENCY = 64
+
+
+def start_server(app: str, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(PORT), HOST="127.0.0.1")
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", app, "-c", "gunicorn.conf.py", "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not come up at {url}")
+
+
+async def drive(url: str, seconds: float) -> tuple:
+    """Requests completed and errors over `seconds` at fixed concurrency."""
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        async def loop():
+            nonlocal done, errors
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                    done += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(CONCURRENCY)))
+    return done, errors
+
+
+def bench_shared_cache(entries: int = 20000) -> None:
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        cache = SharedCache(SharedCacheStore(os.path.join(tmp, "bench.db")), "bench", max_entries=entries)
+        payload = {"tokens": list(range(64)), "model": "bench"}
+
+        start = time.perf_counter()
+        for i in range(entries):
+            cache.set(f"k{i}", payload)
+        write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(entries):
+            cache.get(f"k{i}")
+        read = time.perf_counter() - start
+
+    print(f"  shared cache: {entries / write:,.0f} sets/s, {entries / read:,.0f} gets/s")
+
+
+def main():
+    app = sys.argv[1] if len(sys.argv) > 1 else "workbench_app:app"
+    path = sys.argv[2] if len(sys.argv) > 2 else "/health"
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 10.0
+    url = f"http://127.0.0.1:{PORT}{path}"
+
+    print("=" * 60)
+    print(f"Worker scaling: {app} {path}, {CONCURRENCY} concurrent, {seconds:.0f}s per run")
+    print("=" * 60)
+
+    counts = sorted({1, *[w for w in (2, 4, 8, 16) if w < max_workers], max_workers})
+    baseline = None
+    for workers in counts:
+        server = start_server(app, workers)
+        try:
+            asyncio.run(wait_ready(url))
+            done, errors = asyncio.run(drive(url, seconds))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+        rps = done / seconds
+        baseline = baseline or rps
+        print(f"  {workers:>3} workers  {rps:10.0f} req/s  {rps / baseline:5.2f}x  errors={errors}")
+
+    print()
+    bench_shared_cache()
+
+
+if __name__ == "__main__":
+    main()
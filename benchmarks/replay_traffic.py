@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic against a NeuroForge instance.
+
+Drives a target open-loop from a capture (see traffic_capture.py) at the
+captured pace scaled by one or more speed factors, or at fixed request rates.
+For each level it reports throughput and latency per endpoint, then the first
+level at which each endpoint saturates: achieved throughput below 90% of
+offered, more than 1% errors, or p95 over 3x its value at the lowest level.
+
+Provider calls can be pointed at a local stub so replays never reach real
+providers: --stub-providers starts one, and --launch starts the app with every
+provider base URL aimed at it.
+
+Usage:
+    python benchmarks/replay_traffic.py captures/ --speed 1,2,4,8
+    python benchmarks/replay_traffic.py captures/ --rps 10,50,100 --duration 30
+    python benchmarks/replay_traffic.py captures/ --launch workbench_app:app --stub-providers --speed 1,4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from traffic_capture import load_capture, percentile, replay_schedule  # noqa: E402
+
+
+# ----------------------------------------------------------------------
+# Provider stub
+# ----------------------------------------------------------------------
+
+def _stub_response(path: str) -> dict:
+    if path.endswith("/chat/completions") or path.endswith("/completions"):
+        return {
+            "id": "stub", "object": "chat.completion", "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub response"},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        }
+    if path.endswith("/messages"):
+        return {
+            "id": "stub", "type": "message", "role": "assistant", "model": "stub",
+            "content": [{"type": "text", "text": "stub response"}],
+            "stop_reason": "end_turn", "usage": {"input_tokens": 10, "output_tokens": 2},
+        }
+    if path.endswith("/embeddings"):
+        return {"object": "list", "data": [{"index": 0, "embedding": [0.0] * 8}], "model": "stub"}
+    if path.endswith("/api/chat"):
+        return {"model": "stub", "message": {"role": "assistant", "content": "stub response"}, "done": True}
+    if path.endswith("/api/generate"):
+        return {"model": "stub", "response": "stub response", "done": True}
+    return {"models": [], "data": []}
+
+
+def start_provider_stub(latency_ms: float, jitter_ms: float) -> str:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+            body = json.dumps(_stub_response(self.path)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def launch_app(app: str, port: int, stub_url: str = None) -> subprocess.Popen:
+    env = dict(os.environ, TRAFFIC_CAPTURE_ENABLED="false", PROVIDER_PREWARM="false")
+    if stub_url:
+        env.update(
+            OPENAI_BASE_URL=f"{stub_url}/v1",
+            ANTHROPIC_BASE_URL=stub_url,
+            OLLAMA_BASE_URL=stub_url,
+            GROQ_BASE_URL=f"{stub_url}/openai/v1",
+        )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{url}/health")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Target did not come up at {url}")
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+
+async def replay_level(target, records, speed, rps, duration, max_in_flight, extra_headers):
+    """Fire the schedule open-loop; returns {endpoint: stats} for this level."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    offered = defaultdict(int)
+    dropped = defaultdict(int)
+    in_flight = 0
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=60.0) as client:
+        async def fire(record, endpoint):
+            nonlocal in_flight
+            in_flight += 1
+            headers = {**record.get("headers", {}), **extra_headers}
+            if "body" in record:
+                content = json.dumps(record["body"]).encode()
+                headers.setdefault("content-type", "application/json")
+            else:
+                content = b"x" * record.get("body_bytes", 0)
+            start = time.perf_counter()
+            try:
+                url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+                response = await client.request(record["method"], url, content=content or None, headers=headers)
+                if response.status_code >= 400:
+                    errors[endpoint] += 1  # 401/404/429 are not throughput either
+            except httpx.HTTPError:
+                errors[endpoint] += 1
+            finally:
+                latencies[endpoint].append((time.perf_counter() - start) * 1000)
+                in_flight -= 1
+
+        tasks = []
+        start = time.monotonic()
+        for offset, record in replay_schedule(records, speed=speed, rps=rps):
+            if duration and offset > duration:
+                break
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = f"{record['method']} {record.get('route') or record['path']}"
+            offered[endpoint] += 1
+            if in_flight >= max_in_flight:
+                dropped[endpoint] += 1  # the client itself is saturated
+                continue
+            tasks.append(asyncio.create_task(fire(record, endpoint)))
+        schedule_seconds = max(time.monotonic() - start, 1e-6)
+        await asyncio.gather(*tasks)
+        elapsed = max(time.monotonic() - start, 1e-6)
+
+    results = {}
+    for endpoint, count in offered.items():
+        values = sorted(latencies[endpoint])
+        failed = errors[endpoint] + dropped[endpoint]
+        results[endpoint] = {
+            "offered_rps": count / schedule_seconds,
+            "achieved_rps": (len(values) - errors[endpoint]) / elapsed,
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "error_rate": failed / count,
+            "requests": count,
+        }
+    return results
+
+
+def saturation_points(levels):
+    """First level label per endpoint at which it saturated."""
+    baseline_p95 = {}
+    saturated = {}
+    for label, results in levels:
+        for endpoint, stats in results.items():
+            if endpoint in saturated or stats["p95"] is None:
+                continue
+            baseline_p95.setdefault(endpoint, stats["p95"])
+            if (
+                stats["achieved_rps"] < 0.9 * stats["offered_rps"]
+                or stats["error_rate"] > 0.01
+                or stats["p95"] > 3 * max(baseline_p95[endpoint], 1.0)
+            ):
+                saturated[endpoint] = label
+    return saturated
+
+
+def _fmt(value):
+    return f"{value:8.1f}" if value is not None else "       -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="Capture segment file or directory")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", default="1", help="Comma-separated speed factors (1 = captured pace)")
+    parser.add_argument("--rps", default=None, help="Comma-separated fixed rates; overrides --speed")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds of schedule per level")
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--header", action="append", default=[], help="Extra header, e.g. 'X-API-Key: ...'")
+    parser.add_argument("--stub-providers", action="store_true", help="Serve provider APIs from a local stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=300.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--launch", metavar="APP", help="Start APP (module:attr) with uvicorn for the run")
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)
+    if not records:
+        sys.exit(f"No records in {args.capture}")
+    extra_headers = dict(h.split(":", 1) for h in args.header)
+    extra_headers = {k.strip(): v.strip() for k, v in extra_headers.items()}
+
+    stub_url = start_provider_stub(args.stub_latency_ms, args.stub_jitter_ms) if args.stub_providers else None
+    if stub_url:
+        print(f"Provider stub at {stub_url}")
+    server = None
+    if args.launch:
+        port = httpx.URL(args.target).port or 8000
+        server = launch_app(args.launch, port, stub_url)
+        asyncio.run(wait_ready(args.target))
+
+    if args.rps:
+        levels = [(f"{r} rps", None, float(r)) for r in args.rps.split(",")]
+    else:
+        levels = [(f"{s}x", float(s), None) for s in args.speed.split(",")]
+
+    span = records[-1]["ts"] - records[0]["ts"]
+    print("=" * 96)
+    print(f"Replaying {len(records)} requests ({span:.0f}s captured) against {args.target}")
+    print("=" * 96)
+
+    measured = []
+    try:
+        for label, speed, rps in levels:
+            results = asyncio.run(replay_level(
+                args.target, records, speed or 1.0, rps, args.duration, args.max_in_flight, extra_headers
+            ))
+            measured.append((label, results))
+            print(f"\n[{label}]")
+            print(f"  {'endpoint':<48} {'offered':>8} {'achieved':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err%':>6}")
+            for endpoint, s in sorted(results.items(), key=lambda item: -item[1]["requests"]):
+                print(
+                    f"  {endpoint[:48]:<48} {s['offered_rps']:8.1f} {s['achieved_rps']:8.1f} "
+                    f"{_fmt(s['p50'])} {_fmt(s['p95'])} {_fmt(s['p99'])} {s['error_rate'] * 100:6.2f}"
+                )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print("\nSaturation points")
+    saturated = saturation_points(measured)
+    endpoints = sorted({e for _, results in measured for e in results})
+    for endpoint in endpoints:
+        print(f"  {endpoint[:60]:<60} {saturated.get(endpoint, 'not reached')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+NeuroForge Chain Node Memoization
+
+Content-addressed reuse of chain node results across executions.
+
+A node's result is keyed by (prompt_id, prompt version, model, parameters,
+hash of resolved inputs). Resolved inputs include upstream outputs, so a node
+whose prompt and upstream results are unchanged is answered from the memo and
+anything downstream of a changed node misses naturally. Re-running a node on
+purpose invalidates it and everything reachable from it through the chain's
+`connections`.
+
+Results come from the chain's stored `chain_execution` history (loaded at most
+once per chain per `history_ttl_seconds` through a configurable loader) with
+a bounded in-process LRU in front. Evicting an entry does not trigger a
+reload: a miss after eviction just re-executes the node. Memoization is
+opt-in per chain (`"memoize": true`) or per run.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import config
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+MEMO_LOOKUPS = None
+if Counter is not None:
+    MEMO_LOOKUPS = Counter("chain_node_memo_lookups_total", "Chain node memo lookups", ["result"])
+
+# chain_id -> stored chain_execution records, oldest first
+HistoryLoader = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+# (node, resolved inputs) -> node output
+NodeExecutor = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]]
+
+
+def node_memo_key(
+    prompt_id: str,
+    prompt_version: Any,
+    model: Optional[str],
+    parameters: Optional[Dict[str, Any]],
+    inputs: Dict[str, Any]
+) -> str:
+    """Content address of one node execution."""
+    inputs_hash = hashlib.sha256(_canonical_json(inputs).encode("utf-8")).hexdigest()
+    canonical = _canonical_json([prompt_id, prompt_version, model, parameters or {}, inputs_hash])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+# ----------------------------------------------------------------------
+# Graph helpers
+# ----------------------------------------------------------------------
+
+def _endpoints(connection: Dict[str, Any]) -> Tuple[str, str]:
+    source = connection.get("from", connection.get("source"))
+    target = connection.get("to", connection.get("target"))
+    if source is None or target is None:
+        raise ValueError(f"Connection needs from/to node ids: {connection}")
+    return source, target
+
+
+def topological_order(nodes: List[Dict[str, Any]], connections: List[Dict[str, Any]]) -> List[str]:
+    """Node ids in dependency order (stable w.r.t. the node list); ValueError on cycles."""
+    order = [node["id"] for node in nodes]
+    indegree = {node_id: 0 for node_id in order}
+    children: Dict[str, List[str]] = defaultdict(list)
+    for connection in connections:
+        source, target = _endpoints(connection)
+        if source not in indegree or target not in indegree:
+            raise ValueError(f"Connection references unknown node: {source} -> {target}")
+        children[source].append(target)
+        indegree[target] += 1
+
+    ready = [node_id for node_id in order if indegree[node_id] == 0]
+    result = []
+    while ready:
+        node_id = ready.pop(0)
+        result.append(node_id)
+        for child in children[node_id]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    if len(result) != len(order):
+        raise ValueError("Chain connections contain a cycle")
+    return result
+
+
+def downstream_nodes(connections: List[Dict[str, Any]], node_ids: Iterable[str]) -> Set[str]:
+    """The given nodes plus everything reachable from them through connections."""
+    children: Dict[str, List[str]] = defaultdict(list)
+    for connection in connections:
+        source, target = _endpoints(connection)
+        children[source].append(target)
+    reached = set(node_ids)
+    stack = list(reached)
+    while stack:
+        for child in children[stack.pop()]:
+            if child not in reached:
+                reached.add(child)
+                stack.append(child)
+    return reached
+
+
+def resolve_inputs(
+    node: Dict[str, Any],
+    connections: List[Dict[str, Any]],
+    outputs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Static node inputs overlaid with upstream outputs along incoming connections."""
+    resolved = dict(node.get("inputs") or {})
+    for connection in connections:
+        source, target = _endpoints(connection)
+        if target != node["id"]:
+            continue
+        value = outputs.get(source)
+        output_name = connection.get("output")
+        if output_name and isinstance(value, dict):
+            value = value.get(output_name)
+        resolved[connection.get("input") or source] = value
+    return resolved
+
+
+# ----------------------------------------------------------------------
+# Memo cache
+# ----------------------------------------------------------------------
+
+@dataclass
+class _Entry:
+    chain_id: str
+    node_id: str
+    output: Any
+
+
+class NodeMemoCache:
+    """Bounded LRU of node results, backed by stored chain_execution history."""
+
+    def __init__(
+        self,
+        history_loader: Optional[HistoryLoader] = None,
+        max_entries: int = 2048,
+        history_ttl_seconds: float = 600.0
+    ):
+        self.history_loader = history_loader
+        self.max_entries = max_entries
+        self.history_ttl_seconds = history_ttl_seconds
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._per_chain: Dict[str, int] = defaultdict(int)
+        # chain_id -> when its history was last read; independent of residency
+        self._loaded: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.history_loads = 0
+
+    def configure(self, history_loader: Optional[HistoryLoader] = None) -> None:
+        """Attach the DataForge-backed chain_execution history loader."""
+        if history_loader is not None:
+            self.history_loader = history_loader
+
+    async def lookup(self, chain_id: str, key: str) -> Tuple[bool, Any]:
+        """(found, output) for a memo key; reads the chain's history on first use."""
+        loaded_at = self._loaded.get(chain_id)
+        if loaded_at is None or time.monotonic() - loaded_at >= self.history_ttl_seconds:
+            await self._load_history(chain_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if MEMO_LOOKUPS is not None:
+                MEMO_LOOKUPS.labels(result="miss").inc()
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if MEMO_LOOKUPS is not None:
+            MEMO_LOOKUPS.labels(result="hit").inc()
+        return True, entry.output
+
+    def store(self, chain_id: str, node_id: str, key: str, output: Any) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._per_chain[previous.chain_id] -= 1
+        self._entries[key] = _Entry(chain_id, node_id, output)
+        self._per_chain[chain_id] += 1
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._per_chain[evicted.chain_id] -= 1
+
+    def invalidate(
+        self,
+        chain_id: str,
+        node_ids: Iterable[str],
+        connections: List[Dict[str, Any]]
+    ) -> Set[str]:
+        """Drop memoized results for nodes and everything downstream of them."""
+        affected = downstream_nodes(connections, node_ids)
+        for key in [k for k, e in self._entries.items() if e.chain_id == chain_id and e.node_id in affected]:
+            del self._entries[key]
+            self._per_chain[chain_id] -= 1
+        return affected
+
+    def forget_chain(self, chain_id: str) -> None:
+        """Drop everything for a deleted chain."""
+        for key in [k for k, e in self._entries.items() if e.chain_id == chain_id]:
+            del self._entries[key]
+        self._per_chain.pop(chain_id, None)
+        self._loaded.pop(chain_id, None)
+
+    async def _load_history(self, chain_id: str) -> None:
+        now = time.monotonic()
+        if len(self._loaded) > self.max_entries:
+            self._loaded = {c: t for c, t in self._loaded.items() if now - t < self.history_ttl_seconds}
+        self._loaded[chain_id] = now
+        if self.history_loader is None:
+            return
+        try:
+            executions = await self.history_loader(chain_id)
+        except Exception as e:
+            # Memoization is an optimization; a history outage means re-executing
+            logger.warning(f"Failed to load execution history for chain {chain_id}: {e}")
+            self._loaded.pop(chain_id, None)
+            return
+        self.history_loads += 1
+        # Oldest first, so the newest result for a key wins
+        for execution in executions:
+            for node_id, result in (execution.get("node_results") or {}).items():
+                key = result.get("memo_key")
+                if key and result.get("status", "completed") == "completed":
+                    self.store(chain_id, node_id, key, result.get("output"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "chains": sum(1 for count in self._per_chain.values() if count > 0),
+            "hits": self.hits,
+            "misses": self.misses,
+            "history_loads": self.history_loads,
+        }
+
+
+# ----------------------------------------------------------------------
+# Execution
+# ----------------------------------------------------------------------
+
+@dataclass
+class ChainRunResult:
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    node_results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def reused(self) -> List[str]:
+        return [node_id for node_id, result in self.node_results.items() if result["cached"]]
+
+
+def memoization_enabled(chain: Dict[str, Any], memoize: Optional[bool] = None) -> bool:
+    """Per-run flag wins over the chain's own setting."""
+    return bool(chain.get("memoize", False)) if memoize is None else memoize
+
+
+async def execute_chain(
+    chain: Dict[str, Any],
+    execute_node: NodeExecutor,
+    memo: Optional[NodeMemoCache] = None,
+    memoize: Optional[bool] = None,
+    rerun: Iterable[str] = ()
+) -> ChainRunResult:
+    """
+    Run a chain's nodes in dependency order, reusing memoized node results.
+
+    Nodes are expected to carry their resolved `prompt_version`, `model` and
+    `parameters`. `rerun` forces the named nodes (and everything downstream)
+    to execute even when a memoized result exists. `node_results` carries the
+    memo keys and is what the caller should persist as the chain_execution
+    record so later runs can reuse it.
+    """
+    chain_id = chain["id"]
+    nodes = {node["id"]: node for node in chain.get("nodes", [])}
+    connections = chain.get("connections") or []
+    order = topological_order(list(nodes.values()), connections)
+
+    use_memo = memo is not None and memoization_enabled(chain, memoize)
+    forced = set()
+    if use_memo and rerun:
+        forced = memo.invalidate(chain_id, rerun, connections)
+
+    result = ChainRunResult()
+    for node_id in order:
+        node = nodes[node_id]
+        inputs = resolve_inputs(node, connections, result.outputs)
+        key = node_memo_key(
+            node.get("prompt_id"), node.get("prompt_version", node.get("version")),
+            node.get("model"), node.get("parameters"), inputs
+        )
+
+        cached = False
+        if use_memo and node_id not in forced:
+            cached, output = await memo.lookup(chain_id, key)
+        if not cached:
+            output = await execute_node(node, inputs)
+            if use_memo:
+                memo.store(chain_id, node_id, key, output)
+
+        result.outputs[node_id] = output
+        result.node_results[node_id] = {
+            "memo_key": key, "output": output, "cached": cached, "status": "completed",
+        }
+    if use_memo:
+        logger.info(f"Chain {chain_id}: reused {len(result.reused)}/{len(order)} node results")
+    return result
+
+
+# Global instance
+node_memo_cache = NodeMemoCache(
+    max_entries=config.chain_memo_max_entries,
+    history_ttl_seconds=config.chain_memo_history_ttl_seconds,
+)
@@ -33,7 +33,50 @@ class Config:
         self.admin_api_key: Optional[str] = os.getenv("ADMIN_API_KEY")
         self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
         self.anthropic_api_key: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
-        
+        self.groq_api_key: Optional[str] = os.getenv("GROQ_API_KEY")
+
+        # Provider endpoints (override to point at local stub servers)
+        self.openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        self.anthropic_base_url: str = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+        self.ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.groq_base_url: str = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
+        # Provider connection pools: "provider=max_concurrency,..."
+        self.provider_max_concurrency: dict[str, int] = {
+            name.strip(): int(limit)
+            for name, limit in (
+                item.split("=") for item in os.getenv(
+                    "PROVIDER_MAX_CONCURRENCY",
+                    "openai=32,anthropic=32,ollama=4,groq=16"
+                ).split(",") if item.strip()
+            )
+        }
+        self.provider_keepalive_seconds: float = float(os.getenv("PROVIDER_KEEPALIVE_SECONDS", "120"))
+        self.provider_http2: bool = os.getenv("PROVIDER_HTTP2", "true").lower() == "true"
+        self.provider_prewarm: bool = os.getenv("PROVIDER_PREWARM", "true").lower() == "true"
+
+        # Ollama local scheduler
+        self.ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+        self.ollama_max_resident_models: int = int(os.getenv("OLLAMA_MAX_RESIDENT_MODELS", "1"))
+        self.ollama_memory_budget_bytes: Optional[int] = (
+            int(float(os.getenv("OLLAMA_MEMORY_BUDGET_GB")) * 1024 ** 3)
+            if os.getenv("OLLAMA_MEMORY_BUDGET_GB") else None
+        )
+        self.ollama_spill_queue_depth: int = int(os.getenv("OLLAMA_SPILL_QUEUE_DEPTH", "8"))
+
+        # Latency/cost-aware routing
+        self.routing_stats_window_seconds: float = float(os.getenv("ROUTING_STATS_WINDOW_SECONDS", "300"))
+        self.routing_stats_half_life_seconds: float = float(os.getenv("ROUTING_STATS_HALF_LIFE_SECONDS", "120"))
+        self.routing_quality_floor: float = float(os.getenv("ROUTING_QUALITY_FLOOR", "0.95"))
+        self.routing_cost_weight: float = float(os.getenv("ROUTING_COST_WEIGHT", "0.5"))
+
+        # Context compaction
+        self.context_dedup_threshold: float = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+        self.context_fingerprint_cache_size: int = int(os.getenv("CONTEXT_FINGERPRINT_CACHE_SIZE", "10000"))
+
+        # Text normalization: "auto" uses neuroforge_perf when it passes conformance
+        self.text_normalizer_backend: str = os.getenv("TEXT_NORMALIZER_BACKEND", "auto")
+
         # Security & Authentication
         self.secret_key: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
         self.access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
@@ -53,7 +96,119 @@ class Config:
         
         # Logging
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
-        
+
+        # Tracing & profiling
+        self.trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        self.profile_max_seconds: int = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+        # Multi-worker deployment
+        self.workers: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+        self.prometheus_multiproc_dir: str = os.getenv(
+            "PROMETHEUS_MULTIPROC_DIR",
+            "/dev/shm/neuroforge_metrics" if os.path.isdir("/dev/shm") else "/tmp/neuroforge_metrics"
+        )
+        self.shared_cache_path: str = os.getenv(
+            "SHARED_CACHE_PATH",
+            "/dev/shm/neuroforge_cache.db" if os.path.isdir("/dev/shm") else "/tmp/neuroforge_cache.db"
+        )
+
+        # Exact-match output cache
+        self.output_cache_max_bytes: int = int(float(os.getenv("OUTPUT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        self.output_cache_codec: str = os.getenv("OUTPUT_CACHE_CODEC", "auto")  # auto, zstd, gzip, none
+        self.output_cache_ttl_seconds: Optional[float] = (
+            float(os.getenv("OUTPUT_CACHE_TTL_SECONDS")) if os.getenv("OUTPUT_CACHE_TTL_SECONDS") else None
+        )
+        # Back the tier with the shared cache so workers reuse each other's outputs
+        # ("auto": only when WEB_CONCURRENCY asks for several workers; unset means
+        # a single uvicorn process, whatever the CPU count)
+        output_cache_shared = os.getenv("OUTPUT_CACHE_SHARED", "auto").lower()
+        self.output_cache_shared: bool = (
+            int(os.getenv("WEB_CONCURRENCY", "1")) > 1 if output_cache_shared == "auto"
+            else output_cache_shared == "true"
+        )
+        self.output_cache_shared_max_entries: int = int(os.getenv("OUTPUT_CACHE_SHARED_MAX_ENTRIES", "50000"))
+
+        # RAG fallback store maintenance
+        self.fallback_db_path: str = os.getenv("FALLBACK_DB_PATH", "neuroforge_fallback.db")
+        self.fallback_project_budget_bytes: int = int(float(os.getenv("FALLBACK_PROJECT_BUDGET_MB", "64")) * 1024 * 1024)
+        self.fallback_freshness_half_life_days: float = float(os.getenv("FALLBACK_FRESHNESS_HALF_LIFE_DAYS", "14"))
+        self.fallback_usage_flush_seconds: float = float(os.getenv("FALLBACK_USAGE_FLUSH_SECONDS", "5"))
+        self.fallback_maintenance_interval_seconds: float = float(os.getenv("FALLBACK_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+        self.fallback_vacuum_free_ratio: float = float(os.getenv("FALLBACK_VACUUM_FREE_RATIO", "0.2"))
+
+        # Traffic capture for replay
+        self.traffic_capture_enabled: bool = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+        self.traffic_capture_dir: str = os.getenv("TRAFFIC_CAPTURE_DIR", "captures")
+        self.traffic_capture_sample_rate: float = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0"))
+        self.traffic_capture_segment_bytes: int = int(float(os.getenv("TRAFFIC_CAPTURE_SEGMENT_MB", "64")) * 1024 * 1024)
+        self.traffic_capture_max_segments: int = int(os.getenv("TRAFFIC_CAPTURE_MAX_SEGMENTS", "20"))
+        self.traffic_capture_redact_text: bool = os.getenv("TRAFFIC_CAPTURE_REDACT_TEXT", "true").lower() == "true"
+
+        # Deployment resolution cache
+        self.deployment_refresh_seconds: float = float(os.getenv("DEPLOYMENT_REFRESH_SECONDS", "30"))
+
+        # Admission control for LLM-bound endpoints
+        self.admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.admission_routes: list[str] = [
+            p.strip() for p in os.getenv(
+                "ADMISSION_ROUTES",
+                "/api/v1/execute,/api/v1/inference,/api/v1/inference/batch,"
+                "/api/v1/workbench/chains/{chain_id}/execute"
+            ).split(",") if p.strip()
+        ]
+        # Long-lived streams: fixed concurrency cap, kept out of the adaptive limit
+        self.admission_stream_routes: list[str] = [
+            p.strip() for p in os.getenv(
+                "ADMISSION_STREAM_ROUTES", "/api/v1/orchestrate/planning/stream"
+            ).split(",") if p.strip()
+        ]
+        self.admission_stream_limit: float = float(os.getenv("ADMISSION_STREAM_LIMIT", "100"))
+        # Clients (IPs/CIDRs, e.g. the reverse proxy) whose X-Tenant-ID/X-Priority are honored
+        self.admission_trusted_clients: list[str] = [
+            p.strip() for p in os.getenv("ADMISSION_TRUSTED_CLIENTS", "127.0.0.1,::1").split(",") if p.strip()
+        ]
+        self.admission_initial_limit: float = float(os.getenv("ADMISSION_INITIAL_LIMIT", "20"))
+        self.admission_min_limit: float = float(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+        self.admission_max_limit: float = float(os.getenv("ADMISSION_MAX_LIMIT", "500"))
+        self.admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "1000"))
+        self.admission_max_queue_per_tenant: int = int(os.getenv("ADMISSION_MAX_QUEUE_PER_TENANT", "100"))
+
+        # Provider prompt caching
+        self.prompt_cache_flush_seconds: float = float(os.getenv("PROMPT_CACHE_FLUSH_SECONDS", "30"))
+
+        # Embedding service
+        self.embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "openai")  # openai, ollama, local, hashing
+        self.embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.embedding_dimension: int = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
+        self.embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding_max_wait_ms: float = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "2"))
+        self.embedding_cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+
+        # Chain node memoization
+        self.chain_memo_max_entries: int = int(os.getenv("CHAIN_MEMO_MAX_ENTRIES", "2048"))
+        self.chain_memo_history_ttl_seconds: float = float(os.getenv("CHAIN_MEMO_HISTORY_TTL_SECONDS", "600"))
+
+        # Provider health / model catalog probes
+        self.provider_probe_interval_seconds: float = float(os.getenv("PROVIDER_PROBE_INTERVAL_SECONDS", "30"))
+        self.provider_probe_jitter: float = float(os.getenv("PROVIDER_PROBE_JITTER", "0.2"))
+        self.provider_probe_timeout_seconds: float = float(os.getenv("PROVIDER_PROBE_TIMEOUT_SECONDS", "3"))
+
+        # Resumable planning sessions
+        self.planning_session_db_path: str = os.getenv("PLANNING_SESSION_DB_PATH", "planning_sessions.db")
+        self.planning_session_flush_seconds: float = float(os.getenv("PLANNING_SESSION_FLUSH_SECONDS", "0.5"))
+        self.planning_session_heartbeat_seconds: float = float(os.getenv("PLANNING_SESSION_HEARTBEAT_SECONDS", "15"))
+        self.planning_session_orphan_seconds: float = float(os.getenv("PLANNING_SESSION_ORPHAN_SECONDS", "60"))
+        self.planning_session_retention_hours: float = float(os.getenv("PLANNING_SESSION_RETENTION_HOURS", "24"))
+
+        # Serialization
+        self.json_backend: str = os.getenv("JSON_BACKEND", "auto")  # auto, orjson, pydantic, json
+
+        # Prompt version store (snapshots + deltas)
+        self.prompt_version_db_path: str = os.getenv("PROMPT_VERSION_DB_PATH", "prompt_versions.db")
+        self.prompt_version_snapshot_interval: int = int(os.getenv("PROMPT_VERSION_SNAPSHOT_INTERVAL", "20"))
+        self.prompt_version_max_delta_ratio: float = float(os.getenv("PROMPT_VERSION_MAX_DELTA_RATIO", "0.5"))
+        self.prompt_version_cache_size: int = int(os.getenv("PROMPT_VERSION_CACHE_SIZE", "256"))
+
     def get_cors_origins(self) -> list[str]:
         """Get list of allowed CORS origins."""
         return self.cors_origins
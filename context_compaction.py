@@ -0,0 +1,219 @@
+"""
+NeuroForge Context Compaction
+
+Near-duplicate elimination and redundancy-aware ordering for context chunks,
+run before token-budget truncation in the context builder.
+
+Chunks are fingerprinted with MinHash over word shingles; fingerprints are
+cached by chunk_id so repeated retrievals of the same chunk cost nothing.
+Chunks whose estimated Jaccard similarity to an already-kept chunk exceeds
+the threshold are dropped, and the rest are ordered so that each next chunk
+adds the most new content relative to what was already selected.
+"""
+
+import hashlib
+import logging
+import re
+import struct
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from config import config
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENS_SAVED = None
+if Counter is not None:
+    PROMPT_TOKENS_SAVED = Counter(
+        "context_compaction_tokens_saved_total",
+        "Prompt tokens removed by near-duplicate context elimination"
+    )
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class CompactionResult:
+    """Chunks kept after compaction, plus what was dropped and saved."""
+    chunks: List[Any]
+    dropped_ids: List[str]
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, with an LRU keyed by chunk_id."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, cache_size: int = 10000, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.cache_size = cache_size
+        # Universal hash family h(x) = (a*x + b) mod p, truncated to 32 bits
+        rng = hashlib.sha256(f"minhash-{seed}".encode()).digest()
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.sha256(rng + struct.pack(">I", i)).digest()
+            a, b = struct.unpack(">QQ", digest[:16])
+            params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+        self._params = params
+        self._cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def shingles(self, text: str) -> set:
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        k = self.shingle_size
+        return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+    def _signature(self, text: str) -> Tuple[int, ...]:
+        hashed = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+            for s in self.shingles(text)
+        ]
+        if not hashed:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed)
+            for a, b in self._params
+        )
+
+    def signature(self, text: str, chunk_id: Optional[str] = None) -> Tuple[int, ...]:
+        """MinHash signature, cached by chunk_id (or content hash)."""
+        key = chunk_id or hashlib.sha1(text.encode()).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+        signature = self._signature(text)
+        self._cache[key] = signature
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return signature
+
+    @staticmethod
+    def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class ContextCompactor:
+    """Drop near-duplicate chunks and order the rest by marginal novelty."""
+
+    def __init__(
+        self,
+        hasher: Optional[MinHasher] = None,
+        similarity_threshold: float = 0.8,
+        redundancy_weight: float = 0.5,
+        token_counter: Callable[[str], int] = _estimate_tokens
+    ):
+        self.hasher = hasher or MinHasher()
+        self.similarity_threshold = similarity_threshold
+        self.redundancy_weight = redundancy_weight
+        self.token_counter = token_counter
+
+    def compact(
+        self,
+        chunks: List[Any],
+        text_of: Callable[[Any], str] = lambda c: c["text"],
+        id_of: Callable[[Any], Optional[str]] = lambda c: c.get("chunk_id"),
+        score_of: Callable[[Any], float] = lambda c: c.get("score", 0.0),
+        pinned: int = 0
+    ) -> CompactionResult:
+        """
+        Compact a retrieval result.
+
+        Chunks are expected in relevance order. The first `pinned` chunks (e.g.
+        primary chunks) keep their position; the remainder is greedily
+        re-ordered by relevance minus redundancy with what is already kept
+        (MMR-style). Accessors let callers pass dicts or dataclasses.
+        """
+        texts = [text_of(c) for c in chunks]
+        tokens = [self.token_counter(t) for t in texts]
+        signatures = [self.hasher.signature(t, id_of(c)) for c, t in zip(chunks, texts)]
+
+        kept: List[int] = []
+        dropped: List[int] = []
+
+        def max_similarity(i: int) -> float:
+            return max((MinHasher.similarity(signatures[i], signatures[j]) for j in kept), default=0.0)
+
+        # Pinned chunks are deduplicated among themselves but keep their order
+        for i in range(min(pinned, len(chunks))):
+            (dropped if max_similarity(i) >= self.similarity_threshold else kept).append(i)
+
+        remaining = list(range(min(pinned, len(chunks)), len(chunks)))
+        while remaining:
+            best, best_value = None, None
+            for i in list(remaining):
+                overlap = max_similarity(i)
+                if overlap >= self.similarity_threshold:
+                    remaining.remove(i)
+                    dropped.append(i)
+                    continue
+                value = score_of(chunks[i]) - self.redundancy_weight * overlap
+                if best_value is None or value > best_value:
+                    best, best_value = i, value
+            if best is None:
+                break
+            remaining.remove(best)
+            kept.append(best)
+
+        result = CompactionResult(
+            chunks=[chunks[i] for i in kept],
+            dropped_ids=[str(id_of(chunks[i])) for i in dropped],
+            tokens_before=sum(tokens),
+            tokens_after=sum(tokens[i] for i in kept),
+        )
+        if result.tokens_saved and PROMPT_TOKENS_SAVED is not None:
+            PROMPT_TOKENS_SAVED.inc(result.tokens_saved)
+        if dropped:
+            logger.debug(
+                f"Context compaction dropped {len(dropped)} chunks, "
+                f"saved ~{result.tokens_saved} tokens"
+            )
+        return result
+
+
+def truncate_to_budget(
+    chunks: List[Any],
+    max_tokens: int,
+    text_of: Callable[[Any], str] = lambda c: c["text"],
+    token_counter: Callable[[str], int] = _estimate_tokens
+) -> List[Any]:
+    """Keep chunks in order until the token budget is exhausted."""
+    selected, used = [], 0
+    for chunk in chunks:
+        cost = token_counter(text_of(chunk))
+        if used + cost > max_tokens:
+            break
+        selected.append(chunk)
+        used += cost
+    return selected
+
+
+# Global instance
+context_compactor = ContextCompactor(
+    hasher=MinHasher(cache_size=config.context_fingerprint_cache_size),
+    similarity_threshold=config.context_dedup_threshold,
+)
@@ -7,6 +7,8 @@ Database initialization and session management.
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
+from config import config
+
 
 # Simple in-memory setup for MVP
 engine = None
@@ -16,16 +18,20 @@ async_session_maker = None
 async def init_db():
     """Initialize database connection."""
     global engine, async_session_maker
-    # For MVP, we're using in-memory storage in workbench modules
-    # This stub satisfies imports from main.py
-    pass
+    # Workbench modules persist to DataForge; the local engine only serves
+    # read paths over the inference log (e.g. inference history exports)
+    if engine is None:
+        engine = create_async_engine(config.get_database_url())
+        async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
 async def close_db():
     """Close database connection."""
-    global engine
+    global engine, async_session_maker
     if engine:
         await engine.dispose()
+        engine = None
+        async_session_maker = None
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,281 @@
+"""
+NeuroForge Deployment Resolution Cache
+
+Serves deployed prompt endpoints from memory.
+
+Resolving a deployment normally walks deployment -> prompt -> version through
+DataForge (replaying prompt_deployment and prompt_update runs) on every call.
+The resolver keeps one compiled artifact per active deployment instead: a
+pre-parsed template, the model config and the provider adapter name. It is
+refreshed by push from the deployment router on deploy/undeploy, and by a
+periodic version check that costs one DataForge call for all deployments.
+A warm resolve makes no DataForge calls.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# deployment_id -> full deployment record (deployment + prompt version), or None if gone
+DeploymentLoader = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+# () -> {deployment_id: version token} for every active deployment
+VersionProbe = Callable[[], Awaitable[Dict[str, Any]]]
+
+_ADAPTER_PREFIXES: Tuple[Tuple[str, str], ...] = (
+    ("gpt-", "openai"),
+    ("o1-", "openai"),
+    ("text-embedding", "openai"),
+    ("claude", "anthropic"),
+)
+
+
+# Same placeholder syntax as the per-request prompt substitution: `{name}` with
+# a word-character name. Any other brace (JSON examples, code) is literal text.
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+class DeploymentNotFoundError(LookupError):
+    """No active deployment with this id."""
+
+
+def adapter_for_model(model: str, provider: Optional[str] = None) -> str:
+    """Provider adapter for a model; an explicit provider wins."""
+    if provider:
+        return provider
+    name = model.lower()
+    for prefix, adapter in _ADAPTER_PREFIXES:
+        if name.startswith(prefix):
+            return adapter
+    return "ollama"  # local models carry arbitrary names
+
+
+class CompiledTemplate:
+    """A `{variable}` template parsed once; rendering is a single join."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            self._parts.append((source[position:match.start()], match.group(1)))
+            position = match.end()
+        self._parts.append((source[position:], None))
+        self.variables = frozenset(name for _, name in self._parts if name)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        missing = self.variables - variables.keys()
+        if missing:
+            raise ValueError(f"Missing template variables: {', '.join(sorted(missing))}")
+        out = []
+        for literal, name in self._parts:
+            out.append(literal)
+            if name:
+                out.append(str(variables[name]))
+        return "".join(out)
+
+
+@dataclass
+class CompiledDeployment:
+    """Everything needed to serve a deployment without touching DataForge."""
+    deployment_id: str
+    prompt_id: str
+    version: Any
+    template: CompiledTemplate
+    model: str
+    adapter: str
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    compiled_at: float = field(default_factory=time.time)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        return self.template.render(variables)
+
+
+def compile_deployment(record: Dict[str, Any]) -> CompiledDeployment:
+    """Build the serving artifact from a deployment record."""
+    models = record.get("models") or []
+    model = record.get("model") or (models[0] if models else None)
+    if not model:
+        raise ValueError(f"Deployment {record.get('deployment_id')} has no model")
+    return CompiledDeployment(
+        deployment_id=record["deployment_id"],
+        prompt_id=record["prompt_id"],
+        version=record.get("version"),
+        template=CompiledTemplate(record.get("template") or record.get("base_prompt") or ""),
+        model=model,
+        adapter=adapter_for_model(model, record.get("provider")),
+        parameters=dict(record.get("parameters") or {}),
+    )
+
+
+class DeploymentResolver:
+    """In-memory deployment -> compiled artifact map with push and poll refresh."""
+
+    def __init__(
+        self,
+        loader: Optional[DeploymentLoader] = None,
+        version_probe: Optional[VersionProbe] = None,
+        refresh_interval_seconds: float = 30.0
+    ):
+        self.loader = loader
+        self.version_probe = version_probe
+        self.refresh_interval_seconds = refresh_interval_seconds
+
+        self._deployments: Dict[str, CompiledDeployment] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._epochs: Dict[str, int] = {}  # bumped by push events; stale loads are discarded
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.last_refresh: Optional[float] = None
+
+    def configure(
+        self,
+        loader: Optional[DeploymentLoader] = None,
+        version_probe: Optional[VersionProbe] = None
+    ) -> None:
+        """Attach the DataForge-backed loader and version probe."""
+        if loader is not None:
+            self.loader = loader
+        if version_probe is not None:
+            self.version_probe = version_probe
+
+    # ------------------------------------------------------------------
+    # Serving path
+    # ------------------------------------------------------------------
+
+    async def resolve(self, deployment_id: str) -> CompiledDeployment:
+        """Compiled deployment; loads (once, even under concurrency) on a cold miss."""
+        compiled = self._deployments.get(deployment_id)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        pending = self._loading.get(deployment_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[deployment_id] = future
+        try:
+            compiled = await self._load(deployment_id)
+            future.set_result(compiled)
+            return compiled
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here; waiters re-raise it
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # loader was cancelled; waiters retry on their next call
+            del self._loading[deployment_id]
+
+    async def _load(self, deployment_id: str) -> CompiledDeployment:
+        if self.loader is None:
+            raise DeploymentNotFoundError(deployment_id)
+        epoch = self._epochs.get(deployment_id, 0)
+        record = await self.loader(deployment_id)
+        self.loads += 1
+        if self._epochs.get(deployment_id, 0) != epoch:
+            # A deploy/undeploy was pushed while loading; it is newer than this read
+            if deployment_id in self._deployments:
+                return self._deployments[deployment_id]
+            raise DeploymentNotFoundError(deployment_id)
+        if record is None:
+            raise DeploymentNotFoundError(deployment_id)
+        compiled = compile_deployment(record)
+        self._deployments[deployment_id] = compiled
+        return compiled
+
+    # ------------------------------------------------------------------
+    # Push refresh (called by the deployment router)
+    # ------------------------------------------------------------------
+
+    def on_deploy(self, record: Dict[str, Any]) -> CompiledDeployment:
+        compiled = compile_deployment(record)
+        self._bump(compiled.deployment_id)
+        self._deployments[compiled.deployment_id] = compiled
+        logger.info(f"Deployment {compiled.deployment_id} cached at version {compiled.version}")
+        return compiled
+
+    def on_undeploy(self, deployment_id: str) -> None:
+        self._bump(deployment_id)
+        if self._deployments.pop(deployment_id, None) is not None:
+            logger.info(f"Deployment {deployment_id} removed from cache")
+
+    def _bump(self, deployment_id: str) -> None:
+        self._epochs[deployment_id] = self._epochs.get(deployment_id, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Poll refresh
+    # ------------------------------------------------------------------
+
+    async def refresh(self) -> Dict[str, int]:
+        """Reload deployments whose version changed and drop ones that are gone."""
+        if self.version_probe is None:
+            return {"reloaded": 0, "removed": 0}
+        versions = await self.version_probe()
+        reloaded = removed = 0
+        for deployment_id in list(self._deployments):
+            if deployment_id not in versions:
+                self.on_undeploy(deployment_id)
+                removed += 1
+            elif versions[deployment_id] != self._deployments[deployment_id].version:
+                try:
+                    await self._load(deployment_id)
+                    reloaded += 1
+                except Exception as e:
+                    # Keep serving the previous version rather than failing requests
+                    logger.warning(f"Failed to refresh deployment {deployment_id}: {e}")
+        self.refreshes += 1
+        self.last_refresh = time.time()
+        return {"reloaded": reloaded, "removed": removed}
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Deployment version check failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "deployments": {
+                d.deployment_id: {"prompt_id": d.prompt_id, "version": d.version, "model": d.model,
+                                  "adapter": d.adapter, "compiled_at": d.compiled_at}
+                for d in self._deployments.values()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+            "refresh_interval_seconds": self.refresh_interval_seconds,
+        }
+
+
+# Global instance
+deployment_resolver = DeploymentResolver(refresh_interval_seconds=config.deployment_refresh_seconds)
@@ -0,0 +1,329 @@
+"""
+NeuroForge Embedding Service
+
+Micro-batched, cached embeddings for the semantic caches and RAG fallback.
+
+Concurrent embed() calls that arrive within a few milliseconds of each other
+are coalesced into one backend call (up to max_batch_size), identical texts
+in flight share a single computation, and results are kept in an LRU keyed by
+a hash of the normalized text. Vectors are returned as read-only float32
+numpy arrays; numpy is optional, and without it the service raises on use
+rather than breaking imports.
+
+Backends are pluggable: a provider embeddings API (OpenAI-compatible or
+Ollama), a local CPU model (sentence-transformers), or a deterministic
+feature-hashing stand-in for tests and benchmarks.
+"""
+
+import abc
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    Counter = Histogram = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = EMBED_LOOKUPS = None
+if Histogram is not None:
+    BATCH_SIZE = Histogram(
+        "embedding_batch_size", "Texts per backend embedding call",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+    )
+    EMBED_LOOKUPS = Counter("embedding_cache_lookups_total", "Embedding cache lookups", ["result"])
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_for_embedding(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace, stripped."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Embeddings require the numpy package")
+
+
+def _cache_key(normalized: str) -> bytes:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+class EmbeddingBackend(abc.ABC):
+    """Embeds a batch of texts into an (n, dimension) float32 matrix."""
+
+    name = "base"
+    dimension = 0
+
+    @abc.abstractmethod
+    async def embed_batch(self, texts: List[str]) -> "np.ndarray":
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic feature-hashing embeddings (signed token hashes, L2
+    normalized). No model, no network; similar texts share features, so it is
+    a reasonable stand-in for tests and load benchmarks.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def _features(self, text: str) -> Tuple[List[int], List[float]]:
+        indices, signs = [], []
+        for token in _TOKEN_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            indices.append(h % self.dimension)
+            signs.append(1.0 if (h >> 63) else -1.0)
+        return indices, signs
+
+    async def embed_batch(self, texts: List[str]) -> "np.ndarray":
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, signs = self._features(text)
+            if indices:
+                np.add.at(matrix[row], indices, signs)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def provider_api_key(provider: str) -> Optional[str]:
+    return {
+        "openai": config.openai_api_key,
+        "groq": config.groq_api_key,
+    }.get(provider)
+
+
+class ProviderBackend(EmbeddingBackend):
+    """Embeddings API over the shared provider connection pool."""
+
+    def __init__(self, provider: str, model: str, dimension: int, api_key: Optional[str] = None):
+        self.name = provider
+        self.provider = provider
+        self.model = model
+        self.dimension = dimension
+        self.api_key = api_key if api_key is not None else provider_api_key(provider)
+
+    async def embed_batch(self, texts: List[str]) -> "np.ndarray":
+        from provider_pool import provider_transport
+
+        async with provider_transport.acquire(self.provider) as client:
+            if self.provider == "ollama":
+                response = await client.post("/api/embed", json={"model": self.model, "input": texts})
+                response.raise_for_status()
+                vectors = response.json()["embeddings"]
+            else:
+                if not self.api_key:
+                    raise RuntimeError(f"No API key configured for {self.provider} embeddings")
+                response = await client.post(
+                    "/embeddings",
+                    json={"model": self.model, "input": texts},
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                )
+                response.raise_for_status()
+                data = sorted(response.json()["data"], key=lambda item: item["index"])
+                vectors = [item["embedding"] for item in data]
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class LocalModelBackend(EmbeddingBackend):
+    """sentence-transformers model on CPU, run off the event loop."""
+
+    name = "local"
+
+    def __init__(self, model: str):
+        self.model = model
+        self._model = None  # loaded on first use; loading takes seconds
+
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("Local embeddings require the sentence-transformers package") from e
+        model = SentenceTransformer(self.model, device="cpu")
+        self.dimension = model.get_sentence_embedding_dimension()
+        return model
+
+    async def embed_batch(self, texts: List[str]) -> "np.ndarray":
+        if self._model is None:
+            self._model = await asyncio.to_thread(self._load)
+        matrix = await asyncio.to_thread(
+            self._model.encode, texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True
+        )
+        return matrix.astype(np.float32, copy=False)
+
+
+def create_backend(kind: str, model: str = "", dimension: int = 256) -> EmbeddingBackend:
+    if kind == "hashing":
+        return HashingBackend(dimension)
+    if kind == "local":
+        return LocalModelBackend(model)
+    if kind in ("openai", "ollama", "groq"):
+        return ProviderBackend(kind, model, dimension)
+    raise ValueError(f"Unknown embedding backend: {kind}")
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+class EmbeddingService:
+    """Coalesces concurrent embed calls into backend batches, with an LRU in front."""
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 50000
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._batch: List[Tuple[bytes, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.backend_seconds = 0.0
+
+    async def embed(self, text: str) -> "np.ndarray":
+        """Embedding for one text as a read-only float32 vector."""
+        _require_numpy()
+        self.requests += 1
+        normalized = normalize_for_embedding(text)
+        key = _cache_key(normalized)
+
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            if EMBED_LOOKUPS is not None:
+                EMBED_LOOKUPS.labels(result="hit").inc()
+            return vector
+        if EMBED_LOOKUPS is not None:
+            EMBED_LOOKUPS.labels(result="miss").inc()
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            self._enqueue(key, normalized)
+        return await asyncio.shield(future)
+
+    async def embed_many(self, texts: List[str]) -> "np.ndarray":
+        """(len(texts), dimension) float32 matrix; duplicates are computed once."""
+        _require_numpy()
+        if not texts:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+        return np.stack(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "dimension": self.backend.dimension,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "backend_ms_per_text": (
+                round(self.backend_seconds * 1000 / self.batched_texts, 4) if self.batched_texts else None
+            ),
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, key: bytes, normalized: str) -> None:
+        self._batch.append((key, normalized))
+        if len(self._batch) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[bytes, str]]) -> None:
+        start = time.perf_counter()
+        try:
+            matrix = await self.backend.embed_batch([text for _, text in batch])
+            if matrix.shape[0] != len(batch):
+                raise ValueError(f"Backend returned {matrix.shape[0]} embeddings for {len(batch)} texts")
+        except Exception as e:
+            for key, _ in batch:
+                future = self._inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.backend_seconds += time.perf_counter() - start
+
+        self.batches += 1
+        self.batched_texts += len(batch)
+        if BATCH_SIZE is not None:
+            BATCH_SIZE.observe(len(batch))
+        for row, (key, _) in enumerate(batch):
+            vector = np.array(matrix[row], dtype=np.float32)  # own copy, not a view into the batch
+            vector.flags.writeable = False  # shared by every caller and the cache
+            self._store(key, vector)
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+
+    def _store(self, key: bytes, vector: "np.ndarray") -> None:
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+# Global instance
+embedding_service = EmbeddingService(
+    backend=create_backend(config.embedding_backend, config.embedding_model, config.embedding_dimension),
+    max_batch_size=config.embedding_batch_size,
+    max_wait_ms=config.embedding_max_wait_ms,
+    cache_size=config.embedding_cache_size,
+)
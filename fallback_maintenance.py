@@ -0,0 +1,317 @@
+"""
+NeuroForge Fallback Store Maintenance
+
+Background upkeep for the SQLite RAG fallback store (neuroforge_fallback.db).
+
+- Reads record chunk usage and cache hits/misses in memory; a flush writes
+  them in one transaction instead of one UPDATE per read.
+- Freshness is derived at read time: the stored score (reset to full
+  freshness when a chunk is used) decays with a configurable half-life from
+  last_used_at. Uniform decay never changes the order, so no pass rewrites
+  rows to age them.
+- Each project is held under a byte budget by evicting its least fresh,
+  least recently used chunks.
+- ANALYZE runs after eviction; VACUUM runs when enough pages are free.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_MAINTENANCE_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_chunks_project_freshness
+    ON chunks(project_id, freshness_score, last_used_at);
+"""
+
+# Approximate on-disk footprint of a chunk row
+_CHUNK_BYTES = (
+    "LENGTH(text) + COALESCE(LENGTH(embedding), 0) + COALESCE(LENGTH(title), 0)"
+    " + COALESCE(LENGTH(source), 0) + LENGTH(chunk_id) + LENGTH(project_id)"
+)
+
+
+# Days since a chunk was last used, for a Unix time bound as the only parameter
+_AGE_DAYS = "(? / 86400.0 + 2440587.5 - julianday(COALESCE(last_used_at, created_at)))"
+
+
+def _sqlite_timestamp(ts: float) -> str:
+    """Same format as SQLite's CURRENT_TIMESTAMP (UTC)."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def decayed_freshness(score: Optional[float], age_days: Optional[float], half_life_days: float) -> float:
+    """Stored freshness score aged by the time since the chunk was last used."""
+    return (1.0 if score is None else score) * 0.5 ** (max(0.0, age_days or 0.0) / half_life_days)
+
+
+class UsageBuffer:
+    """Coalesces chunk usage and hit/miss counts between flushes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._used: Dict[Tuple[str, str], float] = {}
+        self._lookups: Dict[str, list] = {}  # project_id -> [hits, misses]
+
+    def record_use(self, project_id: str, chunk_id: str, ts: Optional[float] = None) -> None:
+        with self._lock:
+            self._used[(chunk_id, project_id)] = ts or time.time()
+
+    def record_lookup(self, project_id: str, hit: bool) -> None:
+        with self._lock:
+            counts = self._lookups.setdefault(project_id, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def drain(self) -> Tuple[Dict[Tuple[str, str], float], Dict[str, list]]:
+        with self._lock:
+            used, lookups = self._used, self._lookups
+            self._used, self._lookups = {}, {}
+        return used, lookups
+
+    def restore(self, used: Dict[Tuple[str, str], float], lookups: Dict[str, list]) -> None:
+        """Put drained work back after a failed flush."""
+        with self._lock:
+            for key, ts in used.items():
+                self._used[key] = max(ts, self._used.get(key, 0.0))
+            for project_id, (hits, misses) in lookups.items():
+                counts = self._lookups.setdefault(project_id, [0, 0])
+                counts[0] += hits
+                counts[1] += misses
+
+    def __len__(self) -> int:
+        return len(self._used) + len(self._lookups)
+
+
+class FallbackStoreMaintainer:
+    """Flush, evict and vacuum the fallback store."""
+
+    def __init__(
+        self,
+        db_path: str,
+        project_budget_bytes: int = 64 * 1024 * 1024,
+        half_life_days: float = 14.0,
+        flush_interval_seconds: float = 5.0,
+        maintenance_interval_seconds: float = 3600.0,
+        vacuum_free_ratio: float = 0.2
+    ):
+        self.db_path = db_path
+        self.project_budget_bytes = project_budget_bytes
+        self.half_life_days = half_life_days
+        self.flush_interval_seconds = flush_interval_seconds
+        self.maintenance_interval_seconds = maintenance_interval_seconds
+        self.vacuum_free_ratio = vacuum_free_ratio
+
+        self.usage = UsageBuffer()
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._schema_ready = False
+        self.last_run: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Read-path hooks (cheap, in memory)
+    # ------------------------------------------------------------------
+
+    def record_use(self, project_id: str, chunk_id: str) -> None:
+        self.usage.record_use(project_id, chunk_id)
+
+    def record_lookup(self, project_id: str, hit: bool) -> None:
+        self.usage.record_lookup(project_id, hit)
+
+    # ------------------------------------------------------------------
+    # Maintenance steps (blocking; run via asyncio.to_thread)
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        half_life_days = self.half_life_days
+        conn.create_function(
+            "decayed_freshness", 2, lambda score, age: decayed_freshness(score, age, half_life_days),
+            deterministic=True
+        )
+        if not self._schema_ready:
+            conn.executescript(_MAINTENANCE_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def flush_usage(self) -> int:
+        """Write buffered last_used_at and hit/miss counts; returns rows touched."""
+        used, lookups = self.usage.drain()
+        if not used and not lookups:
+            return 0
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(
+                        "UPDATE chunks SET last_used_at = ?, freshness_score = 1.0 "
+                        "WHERE chunk_id = ? AND project_id = ?",
+                        [(_sqlite_timestamp(ts), chunk_id, project_id)
+                         for (chunk_id, project_id), ts in used.items()]
+                    )
+                    conn.executemany(
+                        "INSERT INTO cache_stats (project_id, hits, misses) VALUES (?, ?, ?) "
+                        "ON CONFLICT(project_id) DO UPDATE SET "
+                        "hits = hits + excluded.hits, misses = misses + excluded.misses, "
+                        "last_updated = CURRENT_TIMESTAMP",
+                        [(project_id, hits, misses) for project_id, (hits, misses) in lookups.items()]
+                    )
+                    conn.execute("COMMIT")
+                finally:
+                    conn.close()
+        except Exception:
+            self.usage.restore(used, lookups)
+            raise
+        return len(used) + len(lookups)
+
+    def freshness(self, project_id: str, now: Optional[float] = None) -> Dict[str, float]:
+        """Current freshness per chunk of a project."""
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT chunk_id, decayed_freshness(freshness_score, {_AGE_DAYS}) "
+                    "FROM chunks WHERE project_id = ?",
+                    (now or time.time(), project_id)
+                ).fetchall()
+            finally:
+                conn.close()
+        return dict(rows)
+
+    def evict_cold_chunks(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Hold every project under its byte budget; returns chunks evicted per project."""
+        now = now or time.time()
+        evicted: Dict[str, int] = {}
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                over_budget = conn.execute(
+                    f"SELECT project_id FROM chunks GROUP BY project_id HAVING SUM({_CHUNK_BYTES}) > ?",
+                    (self.project_budget_bytes,)
+                ).fetchall()
+                for (project_id,) in over_budget:
+                    conn.execute("BEGIN IMMEDIATE")
+                    # Keep the freshest chunks whose running size fits the budget
+                    deleted = conn.execute(
+                        f"""
+                        DELETE FROM chunks WHERE project_id = ? AND chunk_id IN (
+                            SELECT chunk_id FROM (
+                                SELECT chunk_id, SUM({_CHUNK_BYTES}) OVER (
+                                    ORDER BY decayed_freshness(freshness_score, {_AGE_DAYS}) DESC,
+                                        last_used_at DESC, chunk_id
+                                ) AS running_bytes
+                                FROM chunks WHERE project_id = ?
+                            ) WHERE running_bytes > ?
+                        )
+                        """,
+                        (project_id, now, project_id, self.project_budget_bytes)
+                    ).rowcount
+                    conn.execute(
+                        "INSERT INTO cache_stats (project_id, chunk_count) "
+                        "VALUES (?, (SELECT COUNT(*) FROM chunks WHERE project_id = ?)) "
+                        "ON CONFLICT(project_id) DO UPDATE SET "
+                        "chunk_count = excluded.chunk_count, last_updated = CURRENT_TIMESTAMP",
+                        (project_id, project_id)
+                    )
+                    conn.execute("COMMIT")
+                    evicted[project_id] = deleted
+            finally:
+                conn.close()
+        if evicted:
+            logger.info(f"Fallback store evicted cold chunks: {evicted}")
+        return evicted
+
+    def optimize(self, force_vacuum: bool = False) -> Dict[str, Any]:
+        """ANALYZE, and VACUUM when the free-page ratio crosses the threshold."""
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                conn.execute("ANALYZE")
+                page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                free_ratio = free_pages / page_count if page_count else 0.0
+                vacuumed = force_vacuum or free_ratio >= self.vacuum_free_ratio
+                if vacuumed:
+                    conn.execute("VACUUM")
+            finally:
+                conn.close()
+        return {"free_ratio": round(free_ratio, 4), "vacuumed": vacuumed}
+
+    def run_once(self, force_vacuum: bool = False) -> Dict[str, Any]:
+        """One full maintenance pass; FileNotFoundError if the store does not exist."""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Fallback store not found: {self.db_path}")
+        start = time.perf_counter()
+        size_before = os.path.getsize(self.db_path)
+        result = {
+            "flushed": self.flush_usage(),
+            "evicted": self.evict_cold_chunks(),
+            **self.optimize(force_vacuum=force_vacuum),
+            "size_before": size_before,
+            "size_after": os.path.getsize(self.db_path),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "finished_at": time.time(),
+        }
+        self.last_run = result
+        return result
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't lose buffered usage on shutdown
+        await asyncio.to_thread(self.flush_usage)
+
+    async def _run(self) -> None:
+        next_maintenance = time.monotonic() + self.maintenance_interval_seconds
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                if time.monotonic() >= next_maintenance:
+                    await asyncio.to_thread(self.run_once)
+                    next_maintenance = time.monotonic() + self.maintenance_interval_seconds
+                elif len(self.usage):
+                    await asyncio.to_thread(self.flush_usage)
+            except Exception as e:
+                logger.error(f"Fallback store maintenance failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "db_path": self.db_path,
+            "running": self._task is not None and not self._task.done(),
+            "buffered_updates": len(self.usage),
+            "project_budget_bytes": self.project_budget_bytes,
+            "half_life_days": self.half_life_days,
+            "last_run": self.last_run,
+        }
+
+
+# Global instance
+fallback_maintainer = FallbackStoreMaintainer(
+    db_path=config.fallback_db_path,
+    project_budget_bytes=config.fallback_project_budget_bytes,
+    half_life_days=config.fallback_freshness_half_life_days,
+    flush_interval_seconds=config.fallback_usage_flush_seconds,
+    maintenance_interval_seconds=config.fallback_maintenance_interval_seconds,
+    vacuum_free_ratio=config.fallback_vacuum_free_ratio,
+)
@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration for multi-worker NeuroForge deployments.
+
+Usage:
+    gunicorn workbench_app:app -c gunicorn.conf.py
+
+Workers share Prometheus metrics through PROMETHEUS_MULTIPROC_DIR and the
+exact output cache through the tmpfs-backed shared cache (see metrics.py,
+shared_cache.py). Other in-process caches are per worker.
+"""
+
+import os
+import shutil
+
+from config import config
+
+# prometheus_client picks its value backend at import time, so the shared
+# directory must be in the environment before anything imports it (workers
+# inherit the master's modules and environment).
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = config.prometheus_multiproc_dir
+
+bind = f"{config.host}:{config.port}"
+workers = config.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = 75
+graceful_timeout = 30
+
+
+def on_starting(server):
+    """Reset shared metric files left over from a previous run."""
+    shutil.rmtree(config.prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(config.prometheus_multiproc_dir, exist_ok=True)
+    server.log.info(f"Multi-worker mode: {workers} workers, metrics in {config.prometheus_multiproc_dir}")
+
+
+def child_exit(server, worker):
+    """Remove a dead worker's live gauges from the aggregated /metrics."""
+    import metrics
+
+    metrics.mark_worker_dead(worker.pid)
@@ -0,0 +1,199 @@
+"""
+NeuroForge Inference History
+
+Keyset-paginated reads and streaming exports over the `inferences` table.
+
+Pages are addressed by an opaque cursor over (created_at, inference_id), so
+page N costs the same as page 1. Exports walk the same keyset in fixed-size
+batches, keeping memory flat regardless of result size.
+"""
+
+import base64
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from serialization import dumps
+
+# Existing (model_id, created_at)-style indexes extended with the tie-breaker.
+# Every filter combination walks one of these in (created_at, inference_id)
+# order, so there is no sort step: the most selective equality prefix is
+# searched and any other filters are applied to the rows it yields. The
+# indexes are not covering; each matched row is read from the table. A
+# task_type filter without domain has no index of its own and is applied
+# while scanning idx_created_keyset.
+KEYSET_INDEXES = {
+    "idx_created_keyset": "(created_at, inference_id)",
+    "idx_model_created_keyset": "(model_id, created_at, inference_id)",
+    "idx_status_created_keyset": "(status, created_at, inference_id)",
+    "idx_domain_created_keyset": "(domain, created_at, inference_id)",
+    "idx_domain_task_created_keyset": "(domain, task_type, created_at, inference_id)",
+}
+
+# The original indexes are prefixes of the keyset ones above, so they only
+# cost writes and space once those exist.
+SUPERSEDED_INDEXES = ("idx_model_created", "idx_status_created", "idx_domain_task_created")
+
+HISTORY_COLUMNS = [
+    "inference_id", "domain", "task_type", "model_id", "model_provider", "status",
+    "evaluation_score", "evaluation_passed", "tokens_used", "latency_ms",
+    "created_at", "completed_at",
+]
+
+EXPORT_COLUMNS = HISTORY_COLUMNS + ["context_pack_id", "user_query", "output", "error_message"]
+
+
+@dataclass
+class HistoryFilters:
+    """Equality filters; every combination is served in order by a keyset index."""
+    model_id: Optional[str] = None
+    status: Optional[str] = None
+    domain: Optional[str] = None
+    task_type: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+def encode_cursor(created_at: Any, inference_id: str) -> str:
+    """Opaque cursor for the row after which the next page starts."""
+    if isinstance(created_at, datetime):
+        payload = {"t": "dt", "c": created_at.isoformat(), "i": inference_id}
+    else:
+        payload = {"t": "str", "c": str(created_at), "i": inference_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Inverse of `encode_cursor`. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = payload["c"]
+        if payload["t"] == "dt":
+            created_at = datetime.fromisoformat(created_at)
+        return created_at, payload["i"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _build_query(
+    columns: List[str],
+    filters: HistoryFilters,
+    after: Optional[Tuple[Any, str]],
+    limit: int
+) -> Tuple[str, Dict[str, Any]]:
+    clauses: List[str] = []
+    params: Dict[str, Any] = {"limit": limit}
+
+    # Equality filters first, in index column order
+    for name in ("model_id", "status", "domain", "task_type"):
+        value = getattr(filters, name)
+        if value is not None:
+            clauses.append(f"{name} = :{name}")
+            params[name] = value
+    if filters.since is not None:
+        clauses.append("created_at >= :since")
+        params["since"] = filters.since
+    if filters.until is not None:
+        clauses.append("created_at < :until")
+        params["until"] = filters.until
+    if after is not None:
+        clauses.append("(created_at, inference_id) < (:after_created_at, :after_inference_id)")
+        params["after_created_at"], params["after_inference_id"] = after
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (
+        f"SELECT {', '.join(columns)} FROM inferences {where} "
+        "ORDER BY created_at DESC, inference_id DESC LIMIT :limit"
+    )
+    return sql, params
+
+
+async def ensure_keyset_indexes(conn: AsyncConnection) -> None:
+    """Create the keyset indexes and drop the ones they replace (idempotent)."""
+    for name, columns in KEYSET_INDEXES.items():
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON inferences {columns}"))
+    for name in SUPERSEDED_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+async def fetch_history_page(
+    conn: AsyncConnection,
+    filters: Optional[HistoryFilters] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of inference history, newest first.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    columns = columns or HISTORY_COLUMNS
+    after = decode_cursor(cursor) if cursor else None
+    sql, params = _build_query(columns, filters or HistoryFilters(), after, limit + 1)
+    result = await conn.execute(text(sql), params)
+    rows = [dict(row._mapping) for row in result]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["inference_id"])
+    return rows, next_cursor
+
+
+async def iter_history(
+    conn: AsyncConnection,
+    filters: Optional[HistoryFilters] = None,
+    batch_size: int = 500,
+    columns: Optional[List[str]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the full filtered history in keyset batches."""
+    columns = columns or EXPORT_COLUMNS
+    filters = filters or HistoryFilters()
+    after: Optional[Tuple[Any, str]] = None
+    while True:
+        sql, params = _build_query(columns, filters, after, batch_size)
+        result = await conn.execute(text(sql), params)
+        rows = [dict(row._mapping) for row in result]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1]["created_at"], rows[-1]["inference_id"])
+
+
+async def export_ndjson(
+    conn: AsyncConnection,
+    filters: Optional[HistoryFilters] = None,
+    batch_size: int = 500
+) -> AsyncIterator[str]:
+    """Stream history as newline-delimited JSON, one chunk per batch."""
+    async for rows in iter_history(conn, filters, batch_size):
+        yield b"".join(dumps(row) + b"\n" for row in rows).decode("utf-8")
+
+
+async def export_csv(
+    conn: AsyncConnection,
+    filters: Optional[HistoryFilters] = None,
+    batch_size: int = 500
+) -> AsyncIterator[str]:
+    """Stream history as CSV with a header row, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    async for rows in iter_history(conn, filters, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
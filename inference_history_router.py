@@ -0,0 +1,109 @@
+"""
+NeuroForge Inference History Router
+
+Keyset-paginated history and streaming NDJSON/CSV export of the inference log.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+import database
+from inference_history import (
+    HistoryFilters,
+    ensure_keyset_indexes,
+    export_csv,
+    export_ndjson,
+    fetch_history_page,
+)
+from serialization import json_response
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/inference")
+
+
+async def init_history_store() -> None:
+    """Open the local database and create keyset indexes."""
+    await database.init_db()
+    async with database.engine.begin() as conn:
+        await ensure_keyset_indexes(conn)
+
+
+def _filters(
+    model_id: Optional[str],
+    status: Optional[str],
+    domain: Optional[str],
+    task_type: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> HistoryFilters:
+    return HistoryFilters(
+        model_id=model_id, status=status, domain=domain,
+        task_type=task_type, since=since, until=until
+    )
+
+
+def _require_engine():
+    if database.engine is None:
+        raise HTTPException(status_code=503, detail="Inference database not initialized")
+    return database.engine
+
+
+@router.get("/history")
+async def get_inference_history(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    model_id: Optional[str] = None,
+    status: Optional[str] = None,
+    domain: Optional[str] = None,
+    task_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Page through inference history, newest first.
+
+    Pass the returned `next_cursor` back as `cursor` to get the next page.
+    """
+    engine = _require_engine()
+    filters = _filters(model_id, status, domain, task_type, since, until)
+    try:
+        async with engine.connect() as conn:
+            items, next_cursor = await fetch_history_page(conn, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Rows come straight from our own table; skip jsonable_encoder and encode once
+    return json_response({"items": items, "next_cursor": next_cursor, "limit": limit})
+
+
+@router.get("/history/export")
+async def export_inference_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(500, ge=10, le=5000),
+    model_id: Optional[str] = None,
+    status: Optional[str] = None,
+    domain: Optional[str] = None,
+    task_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream the full filtered history as NDJSON or CSV."""
+    engine = _require_engine()
+    filters = _filters(model_id, status, domain, task_type, since, until)
+    exporter = export_csv if format == "csv" else export_ndjson
+
+    async def stream():
+        async with engine.connect() as conn:
+            async for chunk in exporter(conn, filters, batch_size):
+                yield chunk
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=inference_history.{format}"}
+    )
@@ -0,0 +1,51 @@
+"""
+NeuroForge Metrics
+
+Prometheus exposition for single- and multi-worker deployments.
+
+In multi-worker mode (PROMETHEUS_MULTIPROC_DIR set before prometheus_client
+is imported, see gunicorn.conf.py) every worker writes its samples to mmap'd files
+in that directory, and /metrics aggregates all workers on each scrape instead
+of reporting whichever worker happened to serve it.
+"""
+
+import logging
+import os
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        generate_latest,
+    )
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+def is_multiprocess() -> bool:
+    """True when metrics are shared across worker processes."""
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges from the aggregate."""
+    if PROMETHEUS_AVAILABLE and is_multiprocess():
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition payload and content type, aggregated across workers if needed."""
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client not installed\n", "text/plain; charset=utf-8"
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
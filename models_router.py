@@ -0,0 +1,26 @@
+"""
+NeuroForge Models Router
+
+Model list and provider status served from the background provider catalog.
+"""
+
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Header, Response
+
+from provider_catalog import etag_matches, provider_catalog
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1")
+
+
+@router.get("/models")
+async def list_models(if_none_match: Optional[str] = Header(None)):
+    """Available models with status, context window and champion flag (no outbound calls)."""
+    snapshot = provider_catalog.snapshot
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
@@ -0,0 +1,305 @@
+"""
+NeuroForge Ollama Scheduler
+
+Local inference scheduler in front of Ollama.
+
+Requests are queued per model and dispatched in same-model batches. The
+scheduler drains models that are already resident in Ollama's memory before
+switching, and evicts the least recently used model (keep_alive=0) only when a
+new model would exceed the residency budget (model count, and memory once
+sizes are known from /api/ps and /api/tags). Queue depth and swap counts are
+exported so the model router can spill to remote providers when the local
+queue is too long.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import config
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    Counter = Gauge = None
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = MODEL_SWAPS = None
+if Gauge is not None:
+    QUEUE_DEPTH = Gauge("ollama_queue_depth", "Queued Ollama requests", ["model"], multiprocess_mode="livesum")
+    MODEL_SWAPS = Counter("ollama_model_swaps_total", "Ollama model loads that evicted another model")
+
+# (endpoint, payload) -> response JSON
+OllamaCall = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# endpoint -> response JSON (GET)
+OllamaFetch = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+async def _post_to_ollama(endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Default transport: the shared Ollama connection pool."""
+    from provider_pool import provider_transport
+
+    async with provider_transport.acquire("ollama") as client:
+        response = await client.post(endpoint, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+
+async def _get_from_ollama(endpoint: str) -> Dict[str, Any]:
+    from provider_pool import provider_transport
+
+    async with provider_transport.acquire("ollama") as client:
+        response = await client.get(endpoint)
+        response.raise_for_status()
+        return response.json()
+
+
+def _model_names(name: str) -> List[str]:
+    """Ollama reports "llama3:latest" for a model requested as "llama3"."""
+    return [name, name[:-len(":latest")]] if name.endswith(":latest") else [name]
+
+
+@dataclass
+class OllamaJob:
+    """One queued Ollama request."""
+    model: str
+    endpoint: str
+    payload: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ResidencyBudget:
+    """
+    How many models Ollama may keep loaded at once.
+
+    `max_bytes` applies when model sizes are known (the scheduler fills them
+    from /api/ps and /api/tags); `max_models` is the fallback and hard cap.
+    """
+    max_models: int = 1
+    max_bytes: Optional[int] = None
+    model_sizes: Dict[str, int] = field(default_factory=dict)
+
+    def fits(self, models: List[str]) -> bool:
+        if len(models) > self.max_models:
+            return False
+        if self.max_bytes is None or any(m not in self.model_sizes for m in models):
+            return True
+        return sum(self.model_sizes[m] for m in models) <= self.max_bytes
+
+
+class OllamaScheduler:
+    """Per-model queues with same-model batching and residency-aware ordering."""
+
+    def __init__(
+        self,
+        call: Optional[OllamaCall] = None,
+        budget: Optional[ResidencyBudget] = None,
+        keep_alive: str = "10m",
+        batch_size: int = 4,
+        max_wait_seconds: float = 30.0,
+        spill_queue_depth: int = 8,
+        fetch: Optional[OllamaFetch] = None,
+        size_refresh_seconds: float = 60.0
+    ):
+        self.call = call or _post_to_ollama
+        self.fetch = fetch or _get_from_ollama
+        self.size_refresh_seconds = size_refresh_seconds
+        self.budget = budget or ResidencyBudget()
+        self.keep_alive = keep_alive
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.spill_queue_depth = spill_queue_depth
+
+        self.queues: Dict[str, Deque[OllamaJob]] = {}
+        self.resident: "OrderedDict[str, float]" = OrderedDict()  # model -> last used
+        self.swap_count = 0
+        self.batches_dispatched = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._sizes_refreshed_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def submit(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        endpoint: str = "/api/generate"
+    ) -> Dict[str, Any]:
+        """Queue a request for `model` and wait for Ollama's response."""
+        self._ensure_worker()
+        job = OllamaJob(
+            model=model,
+            endpoint=endpoint,
+            # Ollama streams NDJSON unless told otherwise; we read one JSON body
+            payload={**payload, "model": model, "keep_alive": self.keep_alive, "stream": False},
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self.queues.setdefault(model, deque()).append(job)
+        self._export_depth(model)
+        self._wakeup.set()
+        return await job.future
+
+    def queue_depth(self, model: Optional[str] = None) -> int:
+        """Queued requests for one model, or across all models."""
+        if model is not None:
+            return len(self.queues.get(model, ()))
+        return sum(len(q) for q in self.queues.values())
+
+    def should_spill(self, model: str) -> bool:
+        """True when the router should send this request to a remote provider."""
+        depth = self.queue_depth()
+        if model not in self.resident:
+            # A cold model waits for the whole backlog plus a load
+            return depth >= max(1, self.spill_queue_depth // 2)
+        return depth >= self.spill_queue_depth
+
+    def record_model_size(self, model: str, size_bytes: int) -> None:
+        """Record a model's memory footprint."""
+        for name in _model_names(model):
+            self.budget.model_sizes[name] = size_bytes
+
+    async def refresh_model_sizes(self) -> None:
+        """
+        Learn model sizes from Ollama: loaded models from /api/ps (actual
+        memory), everything else from /api/tags (size on disk, an estimate).
+        """
+        self._sizes_refreshed_at = time.monotonic()
+        try:
+            loaded = (await self.fetch("/api/ps")).get("models", [])
+            local = (await self.fetch("/api/tags")).get("models", [])
+        except Exception as e:
+            logger.warning(f"Failed to read Ollama model sizes: {e}")
+            return
+        for entry in local:
+            if entry.get("name") and entry.get("size"):
+                self.record_model_size(entry["name"], int(entry["size"]))
+        for entry in loaded:
+            if entry.get("name") and entry.get("size"):
+                self.record_model_size(entry["name"], int(entry["size"]))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": {m: len(q) for m, q in self.queues.items() if q},
+            "resident_models": list(self.resident),
+            "swap_count": self.swap_count,
+            "batches_dispatched": self.batches_dispatched,
+            "keep_alive": self.keep_alive,
+            "max_resident_models": self.budget.max_models,
+            "memory_budget_bytes": self.budget.max_bytes,
+            "model_sizes": dict(self.budget.model_sizes),
+        }
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def _export_depth(self, model: str) -> None:
+        if QUEUE_DEPTH is not None:
+            QUEUE_DEPTH.labels(model=model).set(len(self.queues.get(model, ())))
+
+    def _next_model(self) -> Optional[str]:
+        """
+        Pick the model to serve next.
+
+        Resident models with queued work go first (most recently used first),
+        unless another model's oldest request has waited past max_wait_seconds;
+        otherwise the model with the oldest queued request wins.
+        """
+        pending = {m: q for m, q in self.queues.items() if q}
+        if not pending:
+            return None
+
+        oldest_model = min(pending, key=lambda m: pending[m][0].enqueued_at)
+        oldest_wait = time.monotonic() - pending[oldest_model][0].enqueued_at
+        if oldest_wait >= self.max_wait_seconds:
+            return oldest_model
+
+        for model in reversed(self.resident):
+            if model in pending:
+                return model
+        return oldest_model
+
+    async def _make_resident(self, model: str) -> None:
+        if model in self.resident:
+            self.resident.move_to_end(model)
+            return
+
+        if self.budget.max_bytes is not None and model not in self.budget.model_sizes and (
+            self._sizes_refreshed_at is None
+            or time.monotonic() - self._sizes_refreshed_at >= self.size_refresh_seconds
+        ):
+            await self.refresh_model_sizes()
+
+        while self.resident and not self.budget.fits(list(self.resident) + [model]):
+            evicted, _ = self.resident.popitem(last=False)
+            self.swap_count += 1
+            if MODEL_SWAPS is not None:
+                MODEL_SWAPS.inc()
+            logger.info(f"Unloading Ollama model {evicted} to make room for {model}")
+            try:
+                await self.call("/api/generate", {"model": evicted, "keep_alive": 0, "stream": False})
+            except Exception as e:
+                logger.warning(f"Failed to unload Ollama model {evicted}: {e}")
+        self.resident[model] = time.monotonic()
+
+    async def _dispatch(self, job: OllamaJob) -> None:
+        try:
+            result = await self.call(job.endpoint, job.payload)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _run(self) -> None:
+        while True:
+            model = self._next_model()
+            if model is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            queue = self.queues[model]
+            batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+            self._export_depth(model)
+
+            await self._make_resident(model)
+            self.batches_dispatched += 1
+            await asyncio.gather(*(self._dispatch(job) for job in batch))
+            self.resident[model] = time.monotonic()
+
+
+# Global instance
+ollama_scheduler = OllamaScheduler(
+    budget=ResidencyBudget(
+        max_models=config.ollama_max_resident_models,
+        max_bytes=config.ollama_memory_budget_bytes,
+    ),
+    keep_alive=config.ollama_keep_alive,
+    batch_size=config.provider_max_concurrency.get("ollama", 4),
+    spill_queue_depth=config.ollama_spill_queue_depth,
+)
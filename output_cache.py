@@ -0,0 +1,363 @@
+"""
+NeuroForge Exact Output Cache
+
+Exact-match tier in front of the semantic output cache.
+
+Deterministic requests (temperature 0) are keyed by a hash of the
+canonicalized request plus the prompt version, so byte-identical batch
+requests are answered without embedding or similarity search. Outputs are
+stored compressed (zstd when installed, gzip otherwise) and the tier is
+bounded by stored bytes. Eviction is GreedyDual-Size-Frequency: an entry's
+priority is clock + hits * cost / size, so large, cheap, rarely reused
+outputs go first and expensive small ones stay.
+
+In multi-worker mode the tier is backed by the host-wide shared cache
+(shared_cache.py, "output" namespace): stores are written through, and a
+local miss is answered from an output another worker already produced. The
+shared store is attached at app startup (init_shared_output_cache), never
+at import.
+"""
+
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import sqlite3
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from serialization import dumps, loads
+from shared_cache import SharedCache, get_shared_cache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    Counter = Gauge = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = CACHE_BYTES_SAVED = CACHE_STORED_BYTES = None
+if Counter is not None:
+    CACHE_LOOKUPS = Counter(
+        "output_cache_exact_lookups_total", "Exact output cache lookups", ["result"]
+    )
+    CACHE_BYTES_SAVED = Counter(
+        "output_cache_exact_bytes_saved_total", "Output bytes served from the exact cache instead of regenerated"
+    )
+    CACHE_STORED_BYTES = Gauge(
+        "output_cache_exact_stored_bytes", "Compressed bytes held by the exact output cache",
+        multiprocess_mode="livesum"
+    )
+
+# Top-level request envelope fields that do not change the model's output.
+# Only stripped at the top level: the same names inside messages or tool
+# arguments are content and must stay in the key.
+_VOLATILE_FIELDS = frozenset({
+    "request_id", "correlation_id", "user_id", "metadata", "stream", "timeout", "trace",
+})
+
+_CODEC_NONE = b"\x00"
+_CODEC_GZIP = b"\x01"
+_CODEC_ZSTD = b"\x02"
+
+
+def is_deterministic(request: Dict[str, Any]) -> bool:
+    """Only temperature-0 requests are safe to answer from the exact tier."""
+    temperature = request.get("temperature", (request.get("parameters") or {}).get("temperature"))
+    return temperature is not None and float(temperature) == 0.0
+
+
+def _canonicalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _canonicalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # 0.0 and 0 hash the same
+    return value
+
+
+def request_key(request: Dict[str, Any], prompt_version: Optional[str] = None) -> str:
+    """Stable hash of the canonicalized request plus prompt version."""
+    envelope = {k: v for k, v in request.items() if k not in _VOLATILE_FIELDS}
+    canonical = json.dumps(
+        [prompt_version, _canonicalize(envelope)],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Compressor:
+    """zstd when available, gzip otherwise; small payloads are stored raw."""
+
+    def __init__(self, codec: str = "auto", level: int = 3, min_bytes: int = 256):
+        if codec == "auto":
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, falling back to gzip for output cache")
+            codec = "gzip"
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+        self._zstd_c = zstandard.ZstdCompressor(level=level) if codec == "zstd" else None
+        self._zstd_d = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def compress(self, raw: bytes) -> bytes:
+        if self.codec == "none" or len(raw) < self.min_bytes:
+            return _CODEC_NONE + raw
+        if self.codec == "zstd":
+            return _CODEC_ZSTD + self._zstd_c.compress(raw)
+        return _CODEC_GZIP + gzip.compress(raw, compresslevel=min(self.level, 9), mtime=0)
+
+    def decompress(self, blob: bytes) -> bytes:
+        tag, body = blob[:1], blob[1:]
+        if tag == _CODEC_NONE:
+            return body
+        if tag == _CODEC_GZIP:
+            return gzip.decompress(body)
+        if tag == _CODEC_ZSTD:
+            if self._zstd_d is None:
+                raise ValueError("zstd-compressed entry but zstandard is not installed")
+            return self._zstd_d.decompress(body)
+        raise ValueError(f"Unknown output cache codec {tag!r}")
+
+
+@dataclass
+class _Entry:
+    blob: bytes
+    raw_size: int
+    cost: float
+    hits: int = 0
+    priority: float = 0.0
+    seq: int = 0
+    created_at: float = 0.0
+
+
+class ExactOutputCache:
+    """Byte-bounded exact-match output cache with GDSF eviction."""
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        compressor: Optional[Compressor] = None,
+        ttl_seconds: Optional[float] = None,
+        shared: Optional[SharedCache] = None
+    ):
+        self.max_bytes = max_bytes
+        self.compressor = compressor or Compressor()
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+
+        self._entries: Dict[str, _Entry] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (priority, seq, key); stale rows skipped
+        self._seq = 0
+        self._clock = 0.0  # GDSF inflation value: priority of the last eviction
+        self.stored_bytes = 0
+        self.raw_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self.shared_hits = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def lookup(self, request: Dict[str, Any], prompt_version: Optional[str] = None) -> Optional[Any]:
+        """Cached output for a deterministic request, or None."""
+        if not is_deterministic(request):
+            return None
+        return self.get(request_key(request, prompt_version))
+
+    def store(
+        self,
+        request: Dict[str, Any],
+        output: Any,
+        prompt_version: Optional[str] = None,
+        cost: float = 0.0
+    ) -> bool:
+        """
+        Cache a deterministic request's output.
+
+        `cost` is what regenerating the output would cost (USD or latency; it
+        only needs to be consistent across calls).
+        """
+        if not is_deterministic(request):
+            return False
+        return self.put(request_key(request, prompt_version), output, cost)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            entry = self._from_shared(key)
+        if entry is None:
+            self.misses += 1
+            if CACHE_LOOKUPS is not None:
+                CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        entry.hits += 1
+        self._push(key, entry)
+        self.hits += 1
+        self.bytes_saved += entry.raw_size
+        if CACHE_LOOKUPS is not None:
+            CACHE_LOOKUPS.labels(result="hit").inc()
+            CACHE_BYTES_SAVED.inc(entry.raw_size)
+        return loads(self.compressor.decompress(entry.blob))
+
+    def put(self, key: str, output: Any, cost: float = 0.0) -> bool:
+        raw = dumps(output)
+        blob = self.compressor.compress(raw)
+        if len(blob) > self.max_bytes:
+            return False
+        cost = max(cost, 1e-9)
+        if self.shared is not None:
+            try:
+                self.shared.set_bytes(key, struct.pack("<dq", cost, len(raw)) + blob, self.ttl_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared output cache write failed: {e}")
+        return self._insert(key, blob, len(raw), cost, time.time())
+
+    def invalidate(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+            self._export_size()
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared output cache delete failed: {e}")
+
+    def clear(self) -> None:
+        if self.shared is not None:
+            self.shared.clear()
+        self._entries.clear()
+        self._heap.clear()
+        self._clock = 0.0
+        self.stored_bytes = self.raw_bytes = 0
+        self._export_size()
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "stored_bytes": self.stored_bytes,
+            "max_bytes": self.max_bytes,
+            "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+            "codec": self.compressor.codec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+            "shared": self.shared is not None,
+            "shared_hits": self.shared_hits,
+        }
+
+    # ------------------------------------------------------------------
+    # Local and shared tiers
+    # ------------------------------------------------------------------
+
+    def _insert(self, key: str, blob: bytes, raw_size: int, cost: float, created_at: float) -> bool:
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(blob=blob, raw_size=raw_size, cost=cost, hits=1, created_at=created_at)
+        self._entries[key] = entry
+        self.stored_bytes += len(blob)
+        self.raw_bytes += raw_size
+        self._push(key, entry)
+        self._evict()
+        self._export_size()
+        return key in self._entries
+
+    def _from_shared(self, key: str) -> Optional[_Entry]:
+        """Promote an output stored by any worker into this process's tier."""
+        if self.shared is None:
+            return None
+        try:
+            value = self.shared.get_bytes(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared output cache read failed: {e}")
+            return None
+        if value is None:
+            return None
+        cost, raw_size = struct.unpack_from("<dq", value)
+        # Shared TTL already applies; the local copy lives at most one more TTL
+        if not self._insert(key, bytes(value[16:]), raw_size, cost, time.time()):
+            return None
+        self.shared_hits += 1
+        entry = self._entries[key]
+        entry.hits = 0  # the hit is counted by get()
+        return entry
+
+    # ------------------------------------------------------------------
+    # GDSF bookkeeping
+    # ------------------------------------------------------------------
+
+    def _push(self, key: str, entry: _Entry) -> None:
+        entry.priority = self._clock + entry.hits * entry.cost / len(entry.blob)
+        self._seq += 1
+        entry.seq = self._seq
+        heapq.heappush(self._heap, (entry.priority, self._seq, key))
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            self._compact_heap()
+
+    def _compact_heap(self) -> None:
+        self._heap = [
+            (priority, seq, key) for priority, seq, key in self._heap
+            if key in self._entries and self._entries[key].seq == seq
+        ]
+        heapq.heapify(self._heap)
+
+    def _evict(self) -> None:
+        while self.stored_bytes > self.max_bytes and self._heap:
+            priority, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry.seq != seq:
+                continue  # superseded by a later push
+            self._clock = priority
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.stored_bytes -= len(entry.blob)
+        self.raw_bytes -= entry.raw_size
+
+    def _export_size(self) -> None:
+        if CACHE_STORED_BYTES is not None:
+            CACHE_STORED_BYTES.set(self.stored_bytes)
+
+
+# Global instance
+exact_output_cache = ExactOutputCache(
+    max_bytes=config.output_cache_max_bytes,
+    compressor=Compressor(codec=config.output_cache_codec),
+    ttl_seconds=config.output_cache_ttl_seconds,
+)
+
+
+def init_shared_output_cache() -> bool:
+    """Attach the shared tier when configured; returns whether it is active."""
+    if config.output_cache_shared and exact_output_cache.shared is None:
+        try:
+            exact_output_cache.shared = get_shared_cache(
+                "output", ttl_seconds=config.output_cache_ttl_seconds,
+                max_entries=config.output_cache_shared_max_entries
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Shared output cache unavailable, using the per-worker tier only: {e}")
+    return exact_output_cache.shared is not None
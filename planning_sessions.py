@@ -0,0 +1,534 @@
+"""
+NeuroForge Planning Sessions
+
+Resumable, checkpointed SSE streams for multi-AI planning.
+
+A planning session runs in a background task owned by the server, not by the
+client connection. Every event it produces (stage start, streamed tokens,
+stage results) gets a sequence number, is appended to an in-memory buffer and
+is flushed in small batches to a SQLite checkpoint store under the session_id.
+Clients that drop (browser refresh, proxy timeout) reconnect with
+Last-Event-ID and get the rest of the buffer, then follow the live stream;
+completed sessions are served straight from the store.
+
+Completed stages are never recomputed: an interrupted session (worker restart,
+shutdown, or a session whose owner stopped heartbeating) is resumed with the
+stage results checkpointed so far, and only the unfinished stages run again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config import config
+from serialization import dumps, loads
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+SESSION_EVENTS = None
+if Counter is not None:
+    SESSION_EVENTS = Counter(
+        "planning_session_events_total", "Planning session lifecycle events",
+        ["event"]  # started, attached, resumed, replayed
+    )
+
+# (request, checkpoints: stage -> result) -> async iterator of (event, data).
+# A runner reports each finished stage as ("stage_complete", {"stage": ..., "result": ...})
+# and must skip stages already present in checkpoints.
+PlanningRunner = Callable[[Dict[str, Any], Dict[str, Any]], AsyncIterator[Tuple[str, Dict[str, Any]]]]
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_INTERRUPTED = "interrupted"
+
+_SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS planning_sessions (
+    session_id TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    request_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS planning_events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_planning_sessions_updated ON planning_sessions(updated_at);
+"""
+
+
+class SessionConflictError(ValueError):
+    """A session_id was reused for a different planning request."""
+
+
+def request_hash(request: Dict[str, Any]) -> str:
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class SessionEvent:
+    seq: int
+    event: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        return f"id: {self.seq}\nevent: {self.event}\ndata: {dumps(self.data).decode('utf-8')}\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID as a sequence number; anything unparseable replays from the start."""
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+def checkpoints_from_events(events: List[SessionEvent]) -> Dict[str, Any]:
+    return {e.data["stage"]: e.data.get("result") for e in events if e.event == "stage_complete"}
+
+
+# ----------------------------------------------------------------------
+# Checkpoint store
+# ----------------------------------------------------------------------
+
+class SessionCheckpointStore:
+    """SQLite-backed session events; every method is blocking (call via asyncio.to_thread)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SESSION_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def create(self, session_id: str, request: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Insert a new running session; False if the id already exists."""
+        now = now or time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO planning_sessions "
+                    "(session_id, request_hash, request_json, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, request_hash(request), json.dumps(request, default=str), STATUS_RUNNING, now, now)
+                )
+                return cursor.rowcount == 1
+            finally:
+                conn.close()
+
+    def append(
+        self,
+        session_id: str,
+        events: List[SessionEvent],
+        status: str,
+        now: Optional[float] = None
+    ) -> None:
+        """Persist new events and the session's status/heartbeat in one transaction."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO planning_events (session_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                    [(session_id, e.seq, e.event, dumps(e.data)) for e in events]
+                )
+                conn.execute(
+                    "UPDATE planning_sessions SET status = ?, updated_at = ? WHERE session_id = ?",
+                    (status, now or time.time(), session_id)
+                )
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+    def claim(self, session_id: str, stale_before: float, now: Optional[float] = None) -> bool:
+        """
+        Take over an interrupted or abandoned session. Conditional update, so
+        only one worker wins when several reconnects race.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    "UPDATE planning_sessions SET status = ?, updated_at = ? WHERE session_id = ? AND "
+                    "(status IN (?, ?) OR (status = ? AND updated_at < ?))",
+                    (STATUS_RUNNING, now or time.time(), session_id, STATUS_INTERRUPTED, STATUS_FAILED,
+                     STATUS_RUNNING, stale_before)
+                )
+                return cursor.rowcount == 1
+            finally:
+                conn.close()
+
+    def load(self, session_id: str, after_seq: int = 0) -> Tuple[Optional[Dict[str, Any]], List[SessionEvent]]:
+        """Session row and its events after a sequence number."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT request_hash, request_json, status, created_at, updated_at "
+                "FROM planning_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None, []
+            events = [
+                SessionEvent(seq, event, loads(data))
+                for seq, event, data in conn.execute(
+                    "SELECT seq, event, data FROM planning_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                    (session_id, after_seq)
+                )
+            ]
+        finally:
+            conn.close()
+        meta = {
+            "session_id": session_id,
+            "request_hash": row[0],
+            "request": json.loads(row[1]),
+            "status": row[2],
+            "created_at": row[3],
+            "updated_at": row[4],
+        }
+        return meta, events
+
+    def purge(self, before: float) -> int:
+        """Delete finished sessions last updated before a timestamp."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                ids = [r[0] for r in conn.execute(
+                    "SELECT session_id FROM planning_sessions WHERE updated_at < ? AND status != ?",
+                    (before, STATUS_RUNNING)
+                )]
+                conn.executemany("DELETE FROM planning_events WHERE session_id = ?", [(i,) for i in ids])
+                conn.executemany("DELETE FROM planning_sessions WHERE session_id = ?", [(i,) for i in ids])
+                conn.execute("COMMIT")
+                return len(ids)
+            finally:
+                conn.close()
+
+
+# ----------------------------------------------------------------------
+# Live sessions
+# ----------------------------------------------------------------------
+
+class PlanningSession:
+    """In-memory event buffer for a session generated by this worker."""
+
+    def __init__(self, session_id: str, request_hash: str, events: Optional[List[SessionEvent]] = None):
+        self.session_id = session_id
+        self.request_hash = request_hash
+        self.events: List[SessionEvent] = list(events or [])
+        self.checkpoints: Dict[str, Any] = checkpoints_from_events(self.events)
+        self.status = STATUS_RUNNING
+        self.task: Optional[asyncio.Task] = None
+        self.finished_at: Optional[float] = None
+        self._persisted = len(self.events)
+        self._changed = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self.events[-1].seq if self.events else 0
+
+    @property
+    def done(self) -> bool:
+        return self.status != STATUS_RUNNING
+
+    def append(self, event: str, data: Dict[str, Any]) -> SessionEvent:
+        item = SessionEvent(self.last_seq + 1, event, data)
+        self.events.append(item)
+        if event == "stage_complete":
+            self.checkpoints[data["stage"]] = data.get("result")
+        self._notify()
+        return item
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        self._notify()
+
+    def after(self, seq: int) -> List[SessionEvent]:
+        # Sequence numbers are contiguous from 1, so seq is also a list offset
+        return self.events[seq:]
+
+    def take_unpersisted(self) -> List[SessionEvent]:
+        pending = self.events[self._persisted:]
+        self._persisted = len(self.events)
+        return pending
+
+    def restore_unpersisted(self, count: int) -> None:
+        self._persisted -= count
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class PlanningSessionManager:
+    """Starts, checkpoints, resumes and streams planning sessions."""
+
+    def __init__(
+        self,
+        store: SessionCheckpointStore,
+        runner: Optional[PlanningRunner] = None,
+        flush_interval_seconds: float = 0.5,
+        heartbeat_seconds: float = 15.0,
+        orphan_seconds: float = 60.0,
+        memory_seconds: float = 300.0
+    ):
+        self.store = store
+        self.runner = runner
+        self.flush_interval_seconds = flush_interval_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.orphan_seconds = orphan_seconds
+        self.memory_seconds = memory_seconds
+
+        self._sessions: Dict[str, PlanningSession] = {}
+        self.started = 0
+        self.attached = 0
+        self.resumed = 0
+        self.replayed = 0
+
+    def configure(self, runner: Optional[PlanningRunner] = None) -> None:
+        """Attach the multi-AI planning executor."""
+        if runner is not None:
+            self.runner = runner
+
+    # ------------------------------------------------------------------
+    # Opening sessions
+    # ------------------------------------------------------------------
+
+    async def open(self, request: Dict[str, Any], session_id: Optional[str] = None) -> str:
+        """
+        Start a planning session, or attach to the one already under this id.
+
+        Running sessions are attached to, completed ones are left for
+        stream() to replay, and interrupted or failed ones resume from their
+        checkpoints. Raises SessionConflictError when the id belongs to a
+        different request.
+        """
+        if self.runner is None:
+            raise RuntimeError("No planning runner configured")
+        session_id = session_id or str(uuid.uuid4())
+        digest = request_hash(request)
+        live = self._sessions.get(session_id)
+        if live is not None:
+            if live.request_hash != digest:
+                raise SessionConflictError(f"Session {session_id} belongs to a different planning request")
+            self._count("attached")
+            return session_id
+
+        if await asyncio.to_thread(self.store.create, session_id, request):
+            self._launch(PlanningSession(session_id, digest), request)
+            self._count("started")
+            return session_id
+
+        meta, _ = await asyncio.to_thread(self.store.load, session_id, 0)
+        if meta["request_hash"] != digest:
+            raise SessionConflictError(f"Session {session_id} belongs to a different planning request")
+        if meta["status"] == STATUS_COMPLETED:
+            self._count("replayed")
+        elif not await self._resume(session_id):
+            self._count("attached")  # running on another worker; stream() tails the store
+        return session_id
+
+    async def _resume(self, session_id: str) -> bool:
+        """Claim an interrupted/abandoned session and continue it here."""
+        if self.runner is None or session_id in self._sessions:
+            return session_id in self._sessions
+        stale_before = time.time() - self.orphan_seconds
+        if not await asyncio.to_thread(self.store.claim, session_id, stale_before):
+            return False
+        meta, events = await asyncio.to_thread(self.store.load, session_id, 0)
+        session = PlanningSession(session_id, meta["request_hash"], events)
+        # Tokens after the last completed stage belong to a stage that will run again
+        session.append("resumed", {"completed_stages": list(session.checkpoints)})
+        self._launch(session, meta["request"])
+        self._count("resumed")
+        logger.info(f"Resumed planning session {session_id} with {len(session.checkpoints)} checkpointed stages")
+        return True
+
+    def _launch(self, session: PlanningSession, request: Dict[str, Any]) -> None:
+        self._sessions[session.session_id] = session
+        session.task = asyncio.create_task(self._run(session, request))
+
+    async def _run(self, session: PlanningSession, request: Dict[str, Any]) -> None:
+        flusher = asyncio.create_task(self._flush_loop(session))
+        status = STATUS_FAILED
+        try:
+            async for event, data in self.runner(request, dict(session.checkpoints)):
+                session.append(event, data)
+                if event == "stage_complete":
+                    await self._flush(session)  # a stage result is the expensive part; persist now
+            session.append("session_complete", {"session_id": session.session_id})
+            status = STATUS_COMPLETED
+        except asyncio.CancelledError:
+            status = STATUS_INTERRUPTED
+            raise
+        except Exception as e:
+            logger.error(f"Planning session {session.session_id} failed: {e}")
+            session.append("error", {"message": str(e)})
+        finally:
+            flusher.cancel()
+            session.finish(status)
+            try:
+                await asyncio.shield(self._flush(session))
+            except Exception as e:
+                logger.error(f"Failed to checkpoint planning session {session.session_id}: {e}")
+            asyncio.get_running_loop().call_later(self.memory_seconds, self._evict, session)
+
+    def _evict(self, session: PlanningSession) -> None:
+        if self._sessions.get(session.session_id) is session:
+            del self._sessions[session.session_id]
+
+    # ------------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------------
+
+    async def _flush(self, session: PlanningSession) -> None:
+        pending = session.take_unpersisted()
+        try:
+            await asyncio.to_thread(self.store.append, session.session_id, pending, session.status)
+        except Exception:
+            session.restore_unpersisted(len(pending))
+            raise
+
+    async def _flush_loop(self, session: PlanningSession) -> None:
+        # Tokens are coalesced into one write per interval; the write is also the owner's heartbeat
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self._flush(session)
+            except Exception as e:
+                logger.warning(f"Planning session checkpoint failed, will retry: {e}")
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    async def stream(self, session_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+        """SSE frames after last_event_id until the session ends."""
+        cursor = last_event_id
+        idle = 0.0
+        while True:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                async for frame in self._stream_live(session, cursor):
+                    yield frame
+                return
+
+            meta, events = await asyncio.to_thread(self.store.load, session_id, cursor)
+            if meta is None:
+                return
+            for item in events:
+                yield item.to_sse()
+                cursor = item.seq
+            if meta["status"] in (STATUS_COMPLETED, STATUS_FAILED):
+                return
+            abandoned = meta["status"] == STATUS_INTERRUPTED or meta["updated_at"] < time.time() - self.orphan_seconds
+            if abandoned and await self._resume(session_id):
+                continue  # now generating here; switch to the live buffer
+            if meta["status"] != STATUS_RUNNING:
+                return  # interrupted and no runner to resume it
+
+            # Generated by another worker: tail its checkpoints
+            idle = 0.0 if events else idle + self.flush_interval_seconds
+            if idle >= self.heartbeat_seconds:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(self.flush_interval_seconds)
+
+    async def _stream_live(self, session: PlanningSession, cursor: int) -> AsyncIterator[str]:
+        while True:
+            changed = session._changed
+            for item in session.after(cursor):
+                yield item.to_sse()
+                cursor = item.seq
+            if session.done and cursor >= session.last_seq:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"  # keeps proxies from timing out an idle stage
+
+    async def describe(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Status and checkpointed stage results for a session."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return {
+                "session_id": session_id,
+                "status": session.status,
+                "last_event_id": session.last_seq,
+                "checkpoints": session.checkpoints,
+                "live": True,
+            }
+        meta, events = await asyncio.to_thread(self.store.load, session_id, 0)
+        if meta is None:
+            return None
+        return {
+            "session_id": session_id,
+            "status": meta["status"],
+            "last_event_id": events[-1].seq if events else 0,
+            "checkpoints": checkpoints_from_events(events),
+            "live": False,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def purge(self, retention_hours: float) -> int:
+        return await asyncio.to_thread(self.store.purge, time.time() - retention_hours * 3600)
+
+    async def close(self) -> None:
+        """Interrupt running sessions (checkpointed, so they resume on next open)."""
+        tasks = [s.task for s in self._sessions.values() if s.task is not None and not s.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _count(self, event: str) -> None:
+        setattr(self, event, getattr(self, event) + 1)
+        if SESSION_EVENTS is not None:
+            SESSION_EVENTS.labels(event=event).inc()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "live_sessions": len(self._sessions),
+            "running": sum(1 for s in self._sessions.values() if not s.done),
+            "started": self.started,
+            "attached": self.attached,
+            "resumed": self.resumed,
+            "replayed": self.replayed,
+        }
+
+
+# Global instance
+planning_sessions = PlanningSessionManager(
+    SessionCheckpointStore(config.planning_session_db_path),
+    flush_interval_seconds=config.planning_session_flush_seconds,
+    heartbeat_seconds=config.planning_session_heartbeat_seconds,
+    orphan_seconds=config.planning_session_orphan_seconds,
+)
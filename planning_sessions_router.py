@@ -0,0 +1,51 @@
+"""
+NeuroForge Planning Sessions Router
+
+Reconnect to a planning SSE stream by session_id and inspect its checkpoints.
+"""
+
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from planning_sessions import parse_last_event_id, planning_sessions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/orchestrate/planning/sessions")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx would otherwise buffer the stream
+}
+
+
+def sse_response(frames: AsyncIterator[str], session_id: str) -> StreamingResponse:
+    """Streaming response for planning SSE frames; also used by the planning POST handler."""
+    return StreamingResponse(
+        frames, media_type="text/event-stream", headers={**SSE_HEADERS, "X-Session-ID": session_id}
+    )
+
+
+@router.get("/{session_id}/stream")
+async def resume_stream(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[int] = Query(None, ge=0, description="Alternative to Last-Event-ID for fetch-based clients")
+):
+    """Events after Last-Event-ID, then the live stream until the session ends."""
+    if await planning_sessions.describe(session_id) is None:
+        raise HTTPException(status_code=404, detail="Planning session not found")
+    cursor = after if after is not None else parse_last_event_id(last_event_id)
+    return sse_response(planning_sessions.stream(session_id, cursor), session_id)
+
+
+@router.get("/{session_id}")
+async def get_session(session_id: str):
+    """Session status, last event id and checkpointed stage results."""
+    session = await planning_sessions.describe(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Planning session not found")
+    return session
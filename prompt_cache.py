@@ -0,0 +1,403 @@
+"""
+NeuroForge Prompt Cache Assembly
+
+Provider prompt-cache-aware request assembly and cached-token accounting.
+
+Prompts are built from segments (system prompt, domain adapter instructions,
+context packs, planning scaffolding, user input). Stable segments are placed
+first in a fixed order so the provider sees an identical prefix across
+requests; Anthropic requests get explicit cache_control breakpoints at the
+end of the stable system and stable user parts, while OpenAI-compatible
+providers cache identical prefixes automatically. Volatile system text ends
+the cacheable prefix: the stable user part after it gets no breakpoint and
+is not part of the prefix hash.
+
+Cached vs. uncached input tokens are read back from provider usage blocks,
+exported to Prometheus, and persisted to a per prompt/version table that
+backs the prefix reuse report and the per-model cache totals.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import database
+from config import config
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+INPUT_TOKENS = None
+if Counter is not None:
+    INPUT_TOKENS = Counter(
+        "provider_input_tokens_total", "Provider input tokens by prompt cache outcome",
+        ["provider", "model", "cache"]  # cache = read | write | uncached
+    )
+
+# Smallest prefix each provider will cache (tokens)
+_MIN_CACHEABLE_TOKENS = {"anthropic": 1024, "openai": 1024}
+_ANTHROPIC_HAIKU_MIN_TOKENS = 2048
+_ANTHROPIC_MAX_BREAKPOINTS = 4
+
+
+def _estimate_tokens(text_: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text_) // 4)
+
+
+# ----------------------------------------------------------------------
+# Assembly
+# ----------------------------------------------------------------------
+
+@dataclass
+class PromptSegment:
+    """One piece of a prompt; `stable` segments repeat verbatim across requests."""
+    text: str
+    kind: str = "input"  # system, adapter, context, scaffold, history, input
+    stable: bool = False
+    role: str = "user"   # system or user
+
+
+@dataclass
+class AssembledPrompt:
+    """Provider-shaped system/messages plus what the cacheable prefix looks like."""
+    provider: str
+    system: Any
+    messages: List[Dict[str, Any]]
+    prefix_hash: str
+    stable_tokens: int
+    breakpoints: int = 0
+
+    def payload(self) -> Dict[str, Any]:
+        """Fields to merge into the provider request body."""
+        if self.provider == "anthropic":
+            body: Dict[str, Any] = {"messages": self.messages}
+            if self.system:
+                body["system"] = self.system
+            return body
+        messages = ([{"role": "system", "content": self.system}] if self.system else []) + self.messages
+        return {"messages": messages}
+
+
+def _min_cacheable(provider: str, model: str) -> int:
+    if provider == "anthropic" and "haiku" in model.lower():
+        return _ANTHROPIC_HAIKU_MIN_TOKENS
+    return _MIN_CACHEABLE_TOKENS.get(provider, 1024)
+
+
+def assemble_prompt(segments: List[PromptSegment], provider: str, model: str = "") -> AssembledPrompt:
+    """
+    Order segments stable-first and shape them for the provider.
+
+    Order: stable system, volatile system, stable user, volatile user; the
+    relative order of segments within each group is preserved. The cacheable
+    prefix stops at the first volatile segment, so with volatile system text
+    only the stable system part is cached.
+    """
+    def group(role: str, stable: bool) -> List[PromptSegment]:
+        return [s for s in segments if s.role == role and s.stable == stable and s.text]
+
+    stable_system, volatile_system = group("system", True), group("system", False)
+    stable_user, volatile_user = group("user", True), group("user", False)
+    prefix = stable_system if volatile_system else stable_system + stable_user
+
+    digest = hashlib.sha256()
+    for segment in prefix:
+        digest.update(segment.kind.encode())
+        digest.update(b"\x00")
+        digest.update(segment.text.encode("utf-8"))
+        digest.update(b"\x00")
+    stable_tokens = sum(_estimate_tokens(s.text) for s in prefix)
+
+    if provider != "anthropic":
+        system = "\n\n".join(s.text for s in stable_system + volatile_system)
+        user = "\n\n".join(s.text for s in stable_user + volatile_user)
+        return AssembledPrompt(
+            provider=provider,
+            system=system or None,
+            messages=[{"role": "user", "content": user}] if user else [],
+            prefix_hash=digest.hexdigest(),
+            stable_tokens=stable_tokens,
+        )
+
+    # Anthropic: breakpoints where the cumulative stable prefix is long enough to cache
+    min_tokens = _min_cacheable(provider, model)
+    breakpoints = 0
+    prefix_tokens = 0
+
+    def blocks(
+        stable: List[PromptSegment], volatile: List[PromptSegment], cacheable: bool
+    ) -> List[Dict[str, Any]]:
+        nonlocal breakpoints, prefix_tokens
+        out = [{"type": "text", "text": s.text} for s in stable]
+        prefix_tokens += sum(_estimate_tokens(s.text) for s in stable)
+        if cacheable and out and prefix_tokens >= min_tokens and breakpoints < _ANTHROPIC_MAX_BREAKPOINTS:
+            out[-1]["cache_control"] = {"type": "ephemeral"}
+            breakpoints += 1
+        out.extend({"type": "text", "text": s.text} for s in volatile)
+        return out
+
+    system_blocks = blocks(stable_system, volatile_system, cacheable=True)
+    # A breakpoint after volatile system text would be a fresh cache write on every request
+    user_blocks = blocks(stable_user, volatile_user, cacheable=not volatile_system)
+    return AssembledPrompt(
+        provider=provider,
+        system=system_blocks or None,
+        messages=[{"role": "user", "content": user_blocks}] if user_blocks else [],
+        prefix_hash=digest.hexdigest(),
+        stable_tokens=stable_tokens,
+        breakpoints=breakpoints,
+    )
+
+
+# ----------------------------------------------------------------------
+# Accounting
+# ----------------------------------------------------------------------
+
+@dataclass
+class CacheUsage:
+    """Input tokens split by prompt cache outcome."""
+    input_tokens: int = 0        # all input tokens, cached or not
+    cached_tokens: int = 0       # served from the provider's prompt cache
+    cache_write_tokens: int = 0  # written to the cache (Anthropic bills these at a premium)
+
+    @property
+    def uncached_tokens(self) -> int:
+        return self.input_tokens - self.cached_tokens - self.cache_write_tokens
+
+
+def extract_cache_usage(provider: str, usage: Optional[Dict[str, Any]]) -> CacheUsage:
+    """Read cached/uncached input tokens from a provider response's usage block."""
+    usage = usage or {}
+    if provider == "anthropic":
+        read = usage.get("cache_read_input_tokens") or 0
+        write = usage.get("cache_creation_input_tokens") or 0
+        return CacheUsage(
+            input_tokens=(usage.get("input_tokens") or 0) + read + write,
+            cached_tokens=read,
+            cache_write_tokens=write,
+        )
+    if provider == "ollama":
+        return CacheUsage(input_tokens=usage.get("prompt_eval_count") or 0)
+    details = usage.get("prompt_tokens_details") or {}
+    return CacheUsage(
+        input_tokens=usage.get("prompt_tokens") or 0,
+        cached_tokens=details.get("cached_tokens") or 0,
+    )
+
+
+PROMPT_CACHE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS prompt_cache_usage (
+        prompt_id VARCHAR(64) NOT NULL,
+        prompt_version VARCHAR(64) NOT NULL,
+        model_id VARCHAR(256) NOT NULL,
+        model_provider VARCHAR(50) NOT NULL,
+        prefix_hash VARCHAR(64) NOT NULL,
+        requests INTEGER NOT NULL DEFAULT 0,
+        input_tokens INTEGER NOT NULL DEFAULT 0,
+        cached_tokens INTEGER NOT NULL DEFAULT 0,
+        cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+        last_updated DATETIME,
+        PRIMARY KEY (prompt_id, prompt_version, model_id, model_provider, prefix_hash)
+    )
+    """,
+]
+
+_USAGE_COLUMNS = (
+    "prompt_id, prompt_version, model_id, model_provider, prefix_hash, "
+    "requests, input_tokens, cached_tokens, cache_write_tokens, last_updated"
+)
+
+_UsageKey = Tuple[str, str, str, str, str]  # prompt_id, version, model, provider, prefix_hash
+
+
+async def ensure_prompt_cache_schema(conn: AsyncConnection) -> None:
+    """Create the usage table (idempotent)."""
+    if conn.dialect.name == "sqlite":
+        await _rekey_usage_table(conn)
+    for statement in PROMPT_CACHE_SCHEMA:
+        await conn.execute(text(statement))
+
+
+async def _rekey_usage_table(conn: AsyncConnection) -> None:
+    """Rebuild a table created without model_provider in its primary key."""
+    pk_columns = {
+        row[1] for row in await conn.execute(text("PRAGMA table_info(prompt_cache_usage)")) if row[5]
+    }
+    if not pk_columns or "model_provider" in pk_columns:
+        return
+    await conn.execute(text("ALTER TABLE prompt_cache_usage RENAME TO prompt_cache_usage_old"))
+    for statement in PROMPT_CACHE_SCHEMA:
+        await conn.execute(text(statement))
+    # Rows already merged across providers cannot be split; they keep the provider they were stored under
+    await conn.execute(text(
+        f"INSERT INTO prompt_cache_usage ({_USAGE_COLUMNS}) SELECT {_USAGE_COLUMNS} FROM prompt_cache_usage_old"
+    ))
+    await conn.execute(text("DROP TABLE prompt_cache_usage_old"))
+
+
+async def persist_cache_usage(conn: AsyncConnection, deltas: Dict[_UsageKey, List[int]]) -> None:
+    """Add accumulated usage deltas to prompt_cache_usage."""
+    for (prompt_id, version, model, provider, prefix_hash), (requests, inputs, cached, writes) in deltas.items():
+        await conn.execute(text(
+            "INSERT INTO prompt_cache_usage (prompt_id, prompt_version, model_id, model_provider, prefix_hash, "
+            "requests, input_tokens, cached_tokens, cache_write_tokens, last_updated) "
+            "VALUES (:prompt_id, :version, :model, :provider, :prefix_hash, "
+            ":requests, :inputs, :cached, :writes, CURRENT_TIMESTAMP) "
+            "ON CONFLICT (prompt_id, prompt_version, model_id, model_provider, prefix_hash) DO UPDATE SET "
+            "requests = requests + excluded.requests, input_tokens = input_tokens + excluded.input_tokens, "
+            "cached_tokens = cached_tokens + excluded.cached_tokens, "
+            "cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens, "
+            "last_updated = excluded.last_updated"
+        ), {
+            "prompt_id": prompt_id, "version": version, "model": model, "provider": provider,
+            "prefix_hash": prefix_hash, "requests": requests, "inputs": inputs, "cached": cached, "writes": writes,
+        })
+
+
+async def fetch_model_cache_totals(conn: AsyncConnection) -> List[Dict[str, Any]]:
+    """
+    Cached vs. total input tokens per model, derived from prompt_cache_usage
+    at read time (model_metrics may hold several rows per model, or none yet).
+    """
+    result = await conn.execute(text(
+        "SELECT model_id, model_provider, SUM(requests) AS requests, "
+        "SUM(input_tokens) AS total_input_tokens, SUM(cached_tokens) AS cached_input_tokens, "
+        "SUM(cache_write_tokens) AS cache_write_tokens "
+        "FROM prompt_cache_usage GROUP BY model_id, model_provider ORDER BY model_provider, model_id"
+    ))
+    totals = []
+    for row in result:
+        item = dict(row._mapping)
+        inputs = item["total_input_tokens"] or 0
+        item["reuse_ratio"] = round(item["cached_input_tokens"] / inputs, 4) if inputs else 0.0
+        totals.append(item)
+    return totals
+
+
+async def fetch_reuse_report(conn: AsyncConnection, prompt_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Achieved prefix reuse per prompt/version, worst reuse first."""
+    where = "WHERE prompt_id = :prompt_id" if prompt_id else ""
+    result = await conn.execute(text(
+        "SELECT prompt_id, prompt_version, SUM(requests) AS requests, "
+        "SUM(input_tokens) AS input_tokens, SUM(cached_tokens) AS cached_tokens, "
+        "SUM(cache_write_tokens) AS cache_write_tokens, COUNT(DISTINCT prefix_hash) AS distinct_prefixes, "
+        "COUNT(DISTINCT model_id) AS models "
+        f"FROM prompt_cache_usage {where} GROUP BY prompt_id, prompt_version"
+    ), {"prompt_id": prompt_id} if prompt_id else {})
+    report = []
+    for row in result:
+        item = dict(row._mapping)
+        inputs = item["input_tokens"] or 0
+        item["reuse_ratio"] = round(item["cached_tokens"] / inputs, 4) if inputs else 0.0
+        report.append(item)
+    report.sort(key=lambda r: (r["reuse_ratio"], -r["input_tokens"]))
+    return report
+
+
+class PromptCacheLedger:
+    """Accumulates usage in memory and flushes it to the database periodically."""
+
+    def __init__(self, flush_interval_seconds: float = 30.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[_UsageKey, List[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_flush: Optional[float] = None
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        usage: CacheUsage,
+        prompt_id: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        prefix_hash: str = ""
+    ) -> None:
+        if INPUT_TOKENS is not None:
+            INPUT_TOKENS.labels(provider=provider, model=model, cache="read").inc(usage.cached_tokens)
+            INPUT_TOKENS.labels(provider=provider, model=model, cache="write").inc(usage.cache_write_tokens)
+            INPUT_TOKENS.labels(provider=provider, model=model, cache="uncached").inc(max(0, usage.uncached_tokens))
+        key = (prompt_id or "adhoc", str(prompt_version or "-"), model, provider, prefix_hash)
+        totals = self._pending.setdefault(key, [0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += usage.input_tokens
+        totals[2] += usage.cached_tokens
+        totals[3] += usage.cache_write_tokens
+
+    def record_response(
+        self,
+        assembled: AssembledPrompt,
+        model: str,
+        usage: Optional[Dict[str, Any]],
+        prompt_id: Optional[str] = None,
+        prompt_version: Optional[str] = None
+    ) -> CacheUsage:
+        """Convenience: extract usage from a provider response and record it."""
+        cache_usage = extract_cache_usage(assembled.provider, usage)
+        self.record(assembled.provider, model, cache_usage, prompt_id, prompt_version, assembled.prefix_hash)
+        return cache_usage
+
+    async def flush(self, engine) -> int:
+        if not self._pending or engine is None:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with engine.begin() as conn:
+                await persist_cache_usage(conn, pending)
+        except Exception:
+            for key, values in pending.items():
+                totals = self._pending.setdefault(key, [0, 0, 0, 0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+            raise
+        self.last_flush = time.time()
+        return len(pending)
+
+    def start(self, get_engine) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(get_engine))
+
+    async def stop(self, engine=None) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if engine is not None:
+            await self.flush(engine)
+
+    async def _run(self, get_engine) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush(get_engine())
+            except Exception as e:
+                logger.error(f"Failed to persist prompt cache usage: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"pending_keys": len(self._pending), "last_flush": self.last_flush}
+
+
+async def init_prompt_cache_store() -> None:
+    """Create the accounting schema and start periodic flushing."""
+    await database.init_db()
+    async with database.engine.begin() as conn:
+        await ensure_prompt_cache_schema(conn)
+    prompt_cache_ledger.start(lambda: database.engine)
+
+
+# Global instance
+prompt_cache_ledger = PromptCacheLedger(flush_interval_seconds=config.prompt_cache_flush_seconds)
@@ -0,0 +1,391 @@
+"""
+NeuroForge Prompt Version Store
+
+Delta-encoded prompt history with bounded-time materialization.
+
+Each prompt version is stored either as a full snapshot or as a compact delta
+against the previous version: line-level copy/insert/skip ops for text fields
+(base_prompt, system prompts) and set/unset for everything else (models,
+context_refs, parameters). A snapshot is forced every `snapshot_interval`
+versions, and whenever a delta would be larger than `max_delta_ratio` of a
+full copy, so materializing any version replays at most interval - 1 deltas
+from the nearest snapshot (or from a closer version already in the LRU).
+
+Listing reads metadata only; diffs materialize just the two endpoints;
+rollback appends a new version equal to an old one.
+"""
+
+import copy
+import difflib
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from output_cache import Compressor
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompt_versions (
+    prompt_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    content_hash TEXT NOT NULL,
+    stored_bytes INTEGER NOT NULL,
+    full_bytes INTEGER NOT NULL,
+    author TEXT,
+    message TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (prompt_id, version)
+) WITHOUT ROWID;
+"""
+
+KIND_SNAPSHOT = "snapshot"
+KIND_DELTA = "delta"
+
+# Fields diffed line by line; everything else is replaced wholesale when it changes
+TEXT_FIELDS = frozenset({"base_prompt", "system_prompt", "template", "description"})
+
+
+class PromptVersionNotFoundError(LookupError):
+    pass
+
+
+def content_hash(content: Dict[str, Any]) -> str:
+    return hashlib.sha256(dumps(_sorted(content))).hexdigest()
+
+
+def _sorted(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _sorted(value[k]) for k in sorted(value)}
+    if isinstance(value, list):
+        return [_sorted(v) for v in value]
+    return value
+
+
+# ----------------------------------------------------------------------
+# Delta encoding
+# ----------------------------------------------------------------------
+
+def _text_ops(old: str, new: str) -> List[list]:
+    """Line ops turning old into new: ["=", n] copy, ["-", n] skip, ["+", [lines]] insert."""
+    a, b = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    ops: List[list] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", b[j1:j2]])
+    return ops
+
+
+def _apply_text_ops(old: str, ops: List[list]) -> str:
+    lines = old.splitlines(keepends=True)
+    out, pos = [], 0
+    for op, arg in ops:
+        if op == "=":
+            out.extend(lines[pos:pos + arg])
+            pos += arg
+        elif op == "-":
+            pos += arg
+        else:
+            out.extend(arg)
+    return "".join(out)
+
+
+def encode_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    delta: Dict[str, Any] = {}
+    text, changed = {}, {}
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        if key in TEXT_FIELDS and isinstance(value, str) and isinstance(old.get(key), str):
+            text[key] = _text_ops(old[key], value)
+        else:
+            changed[key] = value
+    removed = [key for key in old if key not in new]
+    if text:
+        delta["text"] = text
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+    return delta
+
+
+def apply_delta(old: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    new = dict(old)
+    for key, ops in delta.get("text", {}).items():
+        new[key] = _apply_text_ops(old[key], ops)
+    new.update(delta.get("set", {}))
+    for key in delta.get("unset", []):
+        new.pop(key, None)
+    return new
+
+
+# ----------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------
+
+@dataclass
+class VersionInfo:
+    prompt_id: str
+    version: int
+    kind: str
+    content_hash: str
+    stored_bytes: int
+    full_bytes: int
+    author: Optional[str]
+    message: Optional[str]
+    created_at: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.__dict__.copy()
+
+
+_INFO_COLUMNS = "prompt_id, version, kind, content_hash, stored_bytes, full_bytes, author, message, created_at"
+
+
+class PromptVersionStore:
+    """SQLite-backed snapshot + delta chains; blocking (call via asyncio.to_thread)."""
+
+    def __init__(
+        self,
+        db_path: str,
+        snapshot_interval: int = 20,
+        max_delta_ratio: float = 0.5,
+        cache_size: int = 256
+    ):
+        self.db_path = db_path
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.max_delta_ratio = max_delta_ratio
+        self.cache_size = cache_size
+        self.compressor = Compressor()
+
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held across writes and calls _remember()
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self.cache_hits = 0
+        self.materializations = 0
+        self.deltas_replayed = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        if not self._schema_ready:
+            conn.executescript(_VERSION_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_version(
+        self,
+        prompt_id: str,
+        content: Dict[str, Any],
+        author: Optional[str] = None,
+        message: Optional[str] = None
+    ) -> VersionInfo:
+        """Append a version; unchanged content returns the current head instead."""
+        digest = content_hash(content)
+        full = dumps(content)
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                head = conn.execute(
+                    f"SELECT {_INFO_COLUMNS} FROM prompt_versions WHERE prompt_id = ? "
+                    "ORDER BY version DESC LIMIT 1", (prompt_id,)
+                ).fetchone()
+                if head is not None and head[3] == digest:
+                    conn.execute("COMMIT")
+                    return VersionInfo(*head)
+
+                version = head[1] + 1 if head else 1
+                kind, payload = KIND_SNAPSHOT, full
+                if head is not None and not self._snapshot_due(conn, prompt_id, version):
+                    delta = dumps(encode_delta(self._materialize(conn, prompt_id, head[1]), content))
+                    if len(delta) <= self.max_delta_ratio * len(full):
+                        kind, payload = KIND_DELTA, delta
+
+                stored = self.compressor.compress(payload)
+                info = VersionInfo(prompt_id, version, kind, digest, len(stored), len(full),
+                                   author, message, time.time())
+                conn.execute(
+                    f"INSERT INTO prompt_versions ({_INFO_COLUMNS}, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*info.__dict__.values(), stored)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+            self._remember((prompt_id, version), copy.deepcopy(content))
+        return info
+
+    def rollback(self, prompt_id: str, version: int, author: Optional[str] = None) -> VersionInfo:
+        """New head version whose content equals an earlier version."""
+        content = self.materialize(prompt_id, version)
+        return self.add_version(prompt_id, content, author, message=f"Rollback to version {version}")
+
+    def _snapshot_due(self, conn: sqlite3.Connection, prompt_id: str, version: int) -> bool:
+        last_snapshot = conn.execute(
+            "SELECT MAX(version) FROM prompt_versions WHERE prompt_id = ? AND kind = ?",
+            (prompt_id, KIND_SNAPSHOT)
+        ).fetchone()[0] or 0
+        return version - last_snapshot >= self.snapshot_interval
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def materialize(self, prompt_id: str, version: int) -> Dict[str, Any]:
+        """Full content of a version: nearest snapshot (or cached version) plus deltas."""
+        cached = self._cached((prompt_id, version))
+        if cached is None:
+            conn = self._connect()
+            try:
+                cached = self._materialize(conn, prompt_id, version)
+            finally:
+                conn.close()
+        # Cached versions share unchanged values with their neighbours; hand out a copy
+        return copy.deepcopy(cached)
+
+    def _materialize(self, conn: sqlite3.Connection, prompt_id: str, version: int) -> Dict[str, Any]:
+        cached = self._cached((prompt_id, version))
+        if cached is not None:
+            return cached
+        base = conn.execute(
+            "SELECT MAX(version) FROM prompt_versions WHERE prompt_id = ? AND kind = ? AND version <= ?",
+            (prompt_id, KIND_SNAPSHOT, version)
+        ).fetchone()[0]
+        if base is None:
+            raise PromptVersionNotFoundError(f"{prompt_id} v{version}")
+
+        # Start from the closest version we already hold, if it is past the snapshot
+        start, content = base, None
+        for candidate in range(version - 1, base - 1, -1):
+            content = self._cached((prompt_id, candidate))
+            if content is not None:
+                start = candidate
+                break
+
+        rows = conn.execute(
+            "SELECT version, kind, payload FROM prompt_versions "
+            "WHERE prompt_id = ? AND version BETWEEN ? AND ? ORDER BY version",
+            (prompt_id, start if content is None else start + 1, version)
+        ).fetchall()
+        if not rows or rows[-1][0] != version:
+            raise PromptVersionNotFoundError(f"{prompt_id} v{version}")
+        for row_version, kind, payload in rows:
+            data = loads(self.compressor.decompress(payload))
+            if kind == KIND_SNAPSHOT:
+                content = data
+            else:
+                content = apply_delta(content, data)
+                self.deltas_replayed += 1
+        self.materializations += 1
+        self._remember((prompt_id, version), content)
+        return content
+
+    def list_versions(
+        self,
+        prompt_id: str,
+        limit: int = 50,
+        before: Optional[int] = None
+    ) -> List[VersionInfo]:
+        """Version metadata, newest first (no content is loaded)."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {_INFO_COLUMNS} FROM prompt_versions WHERE prompt_id = ? AND version < ? "
+                "ORDER BY version DESC LIMIT ?",
+                (prompt_id, before if before is not None else 2 ** 62, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [VersionInfo(*row) for row in rows]
+
+    def diff(self, prompt_id: str, from_version: int, to_version: int) -> Dict[str, Any]:
+        """Field-level diff between two versions; text fields as unified diffs."""
+        old = self.materialize(prompt_id, from_version)
+        new = self.materialize(prompt_id, to_version)
+        changes: Dict[str, Any] = {}
+        for key in sorted(set(old) | set(new)):
+            before, after = old.get(key), new.get(key)
+            if before == after:
+                continue
+            if key in TEXT_FIELDS and isinstance(before, str) and isinstance(after, str):
+                changes[key] = {"unified_diff": "".join(difflib.unified_diff(
+                    before.splitlines(keepends=True), after.splitlines(keepends=True),
+                    fromfile=f"v{from_version}", tofile=f"v{to_version}"
+                ))}
+            else:
+                changes[key] = {"before": before, "after": after}
+        return {"prompt_id": prompt_id, "from_version": from_version, "to_version": to_version, "changes": changes}
+
+    def storage_stats(self, prompt_id: Optional[str] = None) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            where, params = ("WHERE prompt_id = ?", (prompt_id,)) if prompt_id else ("", ())
+            versions, snapshots, stored, full = conn.execute(
+                f"SELECT COUNT(*), SUM(kind = 'snapshot'), COALESCE(SUM(stored_bytes), 0), "
+                f"COALESCE(SUM(full_bytes), 0) FROM prompt_versions {where}", params
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            "versions": versions,
+            "snapshots": snapshots or 0,
+            "stored_bytes": stored,
+            "full_copy_bytes": full,
+            "compression_ratio": round(full / stored, 2) if stored else None,
+            "cache_entries": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "materializations": self.materializations,
+            "deltas_replayed": self.deltas_replayed,
+        }
+
+    # ------------------------------------------------------------------
+    # LRU of materialized versions
+    # ------------------------------------------------------------------
+
+    def _cached(self, key: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            content = self._cache.get(key)
+            if content is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        return content
+
+    def _remember(self, key: Tuple[str, int], content: Dict[str, Any]) -> None:
+        with self._cache_lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# Global instance
+prompt_version_store = PromptVersionStore(
+    config.prompt_version_db_path,
+    snapshot_interval=config.prompt_version_snapshot_interval,
+    max_delta_ratio=config.prompt_version_max_delta_ratio,
+    cache_size=config.prompt_version_cache_size,
+)
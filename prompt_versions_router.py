@@ -0,0 +1,79 @@
+"""
+NeuroForge Prompt Versions Router
+
+Version history, materialization, diff and rollback over the delta-encoded
+prompt version store.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Header, HTTPException, Query
+
+from prompt_versions import PromptVersionNotFoundError, prompt_version_store
+from serialization import json_response
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/workbench/prompts")
+
+
+@router.get("/{prompt_id}/versions")
+async def list_versions(
+    prompt_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None, ge=1, description="Return versions older than this one")
+):
+    """Version metadata, newest first; pass the last version back as `before` for the next page."""
+    versions = await asyncio.to_thread(prompt_version_store.list_versions, prompt_id, limit, before)
+    return json_response({
+        "versions": [v.to_dict() for v in versions],
+        "next_before": versions[-1].version if len(versions) == limit else None,
+    })
+
+
+@router.post("/{prompt_id}/versions")
+async def create_version(
+    prompt_id: str,
+    content: Dict[str, Any] = Body(..., embed=True),
+    message: Optional[str] = Body(None, embed=True),
+    x_user_id: Optional[str] = Header(None)
+):
+    """Record a new version (a no-op returning the head when content is unchanged)."""
+    info = await asyncio.to_thread(prompt_version_store.add_version, prompt_id, content, x_user_id, message)
+    return info.to_dict()
+
+
+@router.get("/{prompt_id}/versions/diff")
+async def diff_versions(
+    prompt_id: str,
+    from_version: int = Query(..., alias="from", ge=1),
+    to_version: int = Query(..., alias="to", ge=1)
+):
+    """Field-level diff between any two versions."""
+    try:
+        diff = await asyncio.to_thread(prompt_version_store.diff, prompt_id, from_version, to_version)
+    except PromptVersionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Version not found: {e}")
+    return json_response(diff)
+
+
+@router.get("/{prompt_id}/versions/{version}")
+async def get_version(prompt_id: str, version: int):
+    """Full content of one version."""
+    try:
+        content = await asyncio.to_thread(prompt_version_store.materialize, prompt_id, version)
+    except PromptVersionNotFoundError:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return json_response({"prompt_id": prompt_id, "version": version, "content": content})
+
+
+@router.post("/{prompt_id}/versions/{version}/rollback")
+async def rollback_version(prompt_id: str, version: int, x_user_id: Optional[str] = Header(None)):
+    """Make an earlier version the new head."""
+    try:
+        info = await asyncio.to_thread(prompt_version_store.rollback, prompt_id, version, x_user_id)
+    except PromptVersionNotFoundError:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return info.to_dict()
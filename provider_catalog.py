@@ -0,0 +1,316 @@
+"""
+NeuroForge Provider Catalog
+
+Background provider health and model catalog for GET /api/v1/models.
+
+Each provider is probed on its own schedule (interval with jitter, hard
+timeout) over the shared provider pools, so a slow provider only delays its
+own probe and never a request. Results are folded into an immutable
+CatalogSnapshot (models with status, context window and is_champion, plus
+per-provider status) whose JSON body and ETag are computed once per change.
+Circuit-breaker transitions and champion changes are pushed in and rebuild
+the snapshot immediately instead of waiting for the next probe.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import config
+from provider_pool import ProviderTransport, provider_transport
+
+logger = logging.getLogger(__name__)
+
+# Built-in models per provider: (model id, context window). Ollama models are
+# discovered from /api/tags on each probe.
+DEFAULT_MODELS: Dict[str, List[Tuple[str, Optional[int]]]] = {
+    "openai": [("gpt-4", 8192), ("gpt-4o", 128000), ("gpt-4o-mini", 128000)],
+    "anthropic": [
+        ("claude-3-5-sonnet-20241022", 200000),
+        ("claude-3-opus-20240229", 200000),
+        ("claude-3-haiku-20240307", 200000),
+    ],
+    "groq": [("llama3-70b-8192", 8192), ("mixtral-8x7b-32768", 32768)],
+    "ollama": [],
+}
+
+STATUS_AVAILABLE = "available"
+STATUS_DEGRADED = "degraded"
+STATUS_UNAVAILABLE = "unavailable"
+
+
+def configured_credentials() -> Dict[str, bool]:
+    """Which providers have an API key; providers without one are reported unavailable."""
+    return {
+        "openai": bool(config.openai_api_key),
+        "anthropic": bool(config.anthropic_api_key),
+        "groq": bool(config.groq_api_key),
+        "ollama": True,
+    }
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    id: str
+    provider: str
+    status: str
+    context_window: Optional[int]
+    is_champion: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "provider": self.provider,
+            "status": self.status,
+            "context_window": self.context_window,
+            "is_champion": self.is_champion,
+        }
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """One published view of the catalog; never mutated after construction."""
+    models: Tuple[ModelEntry, ...]
+    providers: Tuple[Tuple[str, str], ...]
+    etag: str
+    body: bytes
+    updated_at: float
+
+    def payload(self) -> Dict[str, Any]:
+        return json.loads(self.body)
+
+
+@dataclass
+class ProviderHealth:
+    """Mutable probe state for one provider (internal; not published as-is)."""
+    reachable: Optional[bool] = None
+    circuit_state: str = "closed"
+    discovered_models: Tuple[Tuple[str, Optional[int]], ...] = ()
+    last_probe_at: Optional[float] = None
+    last_latency_ms: Optional[float] = None
+    last_error: Optional[str] = None
+    probes: int = 0
+    failures: int = 0
+
+    @property
+    def status(self) -> str:
+        if self.circuit_state == "open" or self.reachable is False:
+            return STATUS_UNAVAILABLE
+        if self.circuit_state == "half_open":
+            return STATUS_DEGRADED
+        # Not probed yet: assume up rather than hide every model at startup
+        return STATUS_AVAILABLE
+
+
+class ProviderCatalog:
+    """Scheduled provider probes feeding an immutable, ETagged model catalog."""
+
+    def __init__(
+        self,
+        transport: ProviderTransport,
+        models: Optional[Dict[str, List[Tuple[str, Optional[int]]]]] = None,
+        interval_seconds: float = 30.0,
+        jitter: float = 0.2,
+        timeout_seconds: float = 3.0,
+        credentials: Optional[Dict[str, bool]] = None
+    ):
+        self.transport = transport
+        self.credentials = credentials if credentials is not None else configured_credentials()
+        self.models = models if models is not None else DEFAULT_MODELS
+        self.interval_seconds = interval_seconds
+        self.jitter = jitter
+        self.timeout_seconds = timeout_seconds
+
+        self.health: Dict[str, ProviderHealth] = {
+            name: ProviderHealth() if self.credentials.get(name, True)
+            else ProviderHealth(reachable=False, last_error="no API key configured")
+            for name in self.models
+        }
+        self._champions: Dict[str, str] = {}  # provider -> champion model id
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._snapshot: CatalogSnapshot = self._build()
+        self.rebuilds = 0
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current published snapshot (a plain attribute read; safe from any request)."""
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Push updates
+    # ------------------------------------------------------------------
+
+    def on_circuit_state(self, provider: str, state: str) -> None:
+        """Circuit-breaker hook: closed / open / half_open."""
+        health = self.health.get(provider)
+        if health is None or health.circuit_state == state:
+            return
+        health.circuit_state = state
+        logger.info(f"Catalog: {provider} circuit {state}")
+        self._publish()
+        if state == "closed":
+            # Connections were dropped while the circuit was open
+            self.transport.warm_in_background(provider)
+
+    def set_champion(self, provider: str, model_id: Optional[str]) -> None:
+        """Champion-model hook: the promoted model for a provider (None clears it)."""
+        if model_id is None:
+            self._champions.pop(provider, None)
+        else:
+            self._champions[provider] = model_id
+        self._publish()
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    async def probe(self, provider: str) -> bool:
+        """Probe one provider now and republish if anything visible changed."""
+        health = self.health[provider]
+        pool = self.transport.configs.get(provider)
+        start = time.perf_counter()
+        reachable, error, discovered = False, None, health.discovered_models
+        try:
+            if pool is None:
+                raise ValueError("no connection pool configured")
+            if not self.credentials.get(provider, True):
+                raise ValueError("no API key configured")
+            response = await asyncio.wait_for(
+                self.transport.client(provider).get(pool.warmup_path), self.timeout_seconds
+            )
+            # Probes carry no credentials, so 401/404 still mean the provider is up
+            reachable = response.status_code < 500
+            if not reachable:
+                error = f"HTTP {response.status_code}"
+            elif provider == "ollama" and response.status_code == 200:
+                discovered = tuple(
+                    (m["name"], None) for m in response.json().get("models", []) if m.get("name")
+                )
+        except asyncio.TimeoutError:
+            error = f"timeout after {self.timeout_seconds}s"
+        except (httpx.HTTPError, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+
+        health.probes += 1
+        health.last_probe_at = time.time()
+        health.last_latency_ms = (time.perf_counter() - start) * 1000
+        health.last_error = error
+        if not reachable:
+            health.failures += 1
+        if reachable != health.reachable or discovered != health.discovered_models:
+            if reachable != health.reachable and health.reachable is not None:
+                logger.info(f"Catalog: {provider} {'reachable' if reachable else 'unreachable'} ({error or 'ok'})")
+            health.reachable = reachable
+            health.discovered_models = discovered
+            self._publish()
+        return reachable
+
+    async def refresh(self) -> Dict[str, bool]:
+        """Probe every provider concurrently."""
+        names = list(self.health)
+        results = await asyncio.gather(*(self.probe(name) for name in names))
+        return dict(zip(names, results))
+
+    def start(self) -> None:
+        for provider in self.health:
+            task = self._tasks.get(provider)
+            if task is None or task.done():
+                self._tasks[provider] = asyncio.create_task(self._run(provider))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, provider: str) -> None:
+        # Spread the first probes so workers and providers do not fire together
+        await asyncio.sleep(random.uniform(0, self.interval_seconds * self.jitter))
+        while True:
+            try:
+                await self.probe(provider)
+            except Exception as e:
+                logger.error(f"Catalog probe for {provider} failed: {e}")
+            spread = self.interval_seconds * self.jitter
+            await asyncio.sleep(self.interval_seconds + random.uniform(-spread, spread))
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _publish(self) -> None:
+        snapshot = self._build()
+        if snapshot.etag != self._snapshot.etag:
+            self._snapshot = snapshot
+            self.rebuilds += 1
+
+    def _build(self) -> CatalogSnapshot:
+        models = []
+        providers = []
+        for provider, health in self.health.items():
+            status = health.status
+            providers.append((provider, status))
+            champion = self._champions.get(provider)
+            for model_id, context_window in list(self.models.get(provider, [])) + list(health.discovered_models):
+                models.append(ModelEntry(model_id, provider, status, context_window, model_id == champion))
+
+        content = {
+            "models": [m.to_dict() for m in models],
+            "providers": {name: {"status": status} for name, status in providers},
+        }
+        etag = '"' + hashlib.sha256(
+            json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()[:32] + '"'
+        updated_at = time.time()
+        body = json.dumps({**content, "updated_at": updated_at}, separators=(",", ":")).encode("utf-8")
+        return CatalogSnapshot(tuple(models), tuple(providers), etag, body, updated_at)
+
+    def status_detail(self) -> Dict[str, Any]:
+        """Per-provider probe detail for operators (changes every probe; not ETagged)."""
+        return {
+            "etag": self._snapshot.etag,
+            "updated_at": self._snapshot.updated_at,
+            "rebuilds": self.rebuilds,
+            "interval_seconds": self.interval_seconds,
+            "providers": {
+                name: {
+                    "status": health.status,
+                    "circuit_state": health.circuit_state,
+                    "reachable": health.reachable,
+                    "last_probe_at": health.last_probe_at,
+                    "last_latency_ms": round(health.last_latency_ms, 1) if health.last_latency_ms is not None else None,
+                    "last_error": health.last_error,
+                    "probes": health.probes,
+                    "failures": health.failures,
+                    "champion": self._champions.get(name),
+                }
+                for name, health in self.health.items()
+            },
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# Global instance
+provider_catalog = ProviderCatalog(
+    provider_transport,
+    interval_seconds=config.provider_probe_interval_seconds,
+    jitter=config.provider_probe_jitter,
+    timeout_seconds=config.provider_probe_timeout_seconds,
+)
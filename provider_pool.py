@@ -0,0 +1,245 @@
+"""
+NeuroForge Provider Transport
+
+Shared, pre-warmed HTTP connection pools for the LLM provider clients.
+
+Each provider gets one long-lived keep-alive httpx.AsyncClient (HTTP/2 where
+the provider supports it and `h2` is installed) whose pool size matches the
+provider's concurrency cap. Pools are warmed at startup and again when a
+provider's circuit breaker recovers, so the first request after idle does not
+pay for DNS, TCP and TLS setup.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+import httpx
+
+from config import config
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    Counter = Gauge = None
+
+logger = logging.getLogger(__name__)
+
+POOL_IN_FLIGHT = POOL_WAITING = POOL_SATURATED = None
+if Gauge is not None:
+    POOL_IN_FLIGHT = Gauge(
+        "provider_pool_in_flight", "Requests holding a provider connection", ["provider"],
+        multiprocess_mode="livesum"
+    )
+    POOL_WAITING = Gauge(
+        "provider_pool_waiting", "Requests queued for a provider connection", ["provider"],
+        multiprocess_mode="livesum"
+    )
+    POOL_SATURATED = Counter(
+        "provider_pool_saturated_total", "Requests that found the provider pool full", ["provider"]
+    )
+
+
+@dataclass
+class ProviderPoolConfig:
+    """Connection pool settings for one provider."""
+    name: str
+    base_url: str
+    max_concurrency: int
+    warmup_path: str = "/"
+    http2: bool = True
+    keepalive_seconds: float = 120.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+
+
+@dataclass
+class PoolStats:
+    """Live usage counters for one provider pool."""
+    in_flight: int = 0
+    waiting: int = 0
+    saturated_total: int = 0
+    requests_total: int = 0
+    last_warmed_at: Optional[float] = None
+
+
+def default_pool_configs() -> List[ProviderPoolConfig]:
+    """Pool settings for the built-in providers, from config."""
+    limits = config.provider_max_concurrency
+    keepalive = config.provider_keepalive_seconds
+    return [
+        ProviderPoolConfig("openai", config.openai_base_url, limits.get("openai", 32), "/models",
+                           keepalive_seconds=keepalive),
+        ProviderPoolConfig("anthropic", config.anthropic_base_url, limits.get("anthropic", 32), "/v1/models",
+                           keepalive_seconds=keepalive),
+        # Ollama serves plain HTTP/1.1 on localhost
+        ProviderPoolConfig("ollama", config.ollama_base_url, limits.get("ollama", 4), "/api/tags", http2=False,
+                           keepalive_seconds=keepalive),
+        ProviderPoolConfig("groq", config.groq_base_url, limits.get("groq", 16), "/models",
+                           keepalive_seconds=keepalive),
+    ]
+
+
+class ProviderTransport:
+    """Per-provider pooled HTTP clients with concurrency caps and saturation metrics."""
+
+    def __init__(self, pool_configs: Optional[List[ProviderPoolConfig]] = None):
+        self.configs: Dict[str, ProviderPoolConfig] = {
+            c.name: c for c in (pool_configs or default_pool_configs())
+        }
+        self.stats: Dict[str, PoolStats] = {name: PoolStats() for name in self.configs}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._warm_tasks: Set[asyncio.Task] = set()
+
+    def _pool_config(self, provider: str) -> ProviderPoolConfig:
+        try:
+            return self.configs[provider]
+        except KeyError:
+            raise ValueError(f"Unknown provider: {provider}")
+
+    def client(self, provider: str) -> httpx.AsyncClient:
+        """Shared client for a provider, created on first use."""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            pool = self._pool_config(provider)
+            client = httpx.AsyncClient(
+                base_url=pool.base_url,
+                http2=pool.http2 and config.provider_http2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=pool.max_concurrency,
+                    max_keepalive_connections=pool.max_concurrency,
+                    keepalive_expiry=pool.keepalive_seconds,
+                ),
+                timeout=httpx.Timeout(pool.read_timeout, connect=pool.connect_timeout),
+            )
+            self._clients[provider] = client
+        return client
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._pool_config(provider).max_concurrency)
+            self._semaphores[provider] = semaphore
+        return semaphore
+
+    def _update_gauges(self, provider: str) -> None:
+        if POOL_IN_FLIGHT is not None:
+            stats = self.stats[provider]
+            POOL_IN_FLIGHT.labels(provider=provider).set(stats.in_flight)
+            POOL_WAITING.labels(provider=provider).set(stats.waiting)
+
+    @asynccontextmanager
+    async def acquire(self, provider: str) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Reserve one of the provider's concurrency slots and yield its client.
+
+        Usage:
+            async with provider_transport.acquire("openai") as client:
+                response = await client.post("/chat/completions", json=payload)
+        """
+        semaphore = self._semaphore(provider)
+        stats = self.stats[provider]
+        if semaphore.locked():
+            stats.saturated_total += 1
+            if POOL_SATURATED is not None:
+                POOL_SATURATED.labels(provider=provider).inc()
+
+        stats.waiting += 1
+        self._update_gauges(provider)
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+
+        stats.in_flight += 1
+        stats.requests_total += 1
+        self._update_gauges(provider)
+        try:
+            yield self.client(provider)
+        finally:
+            stats.in_flight -= 1
+            semaphore.release()
+            self._update_gauges(provider)
+
+    async def warm(self, provider: str, connections: int = 2) -> bool:
+        """
+        Open keep-alive connections to a provider ahead of real traffic.
+
+        Any HTTP response (including 401/404) means the connection is up.
+        """
+        pool = self._pool_config(provider)
+        client = self.client(provider)
+        count = max(1, min(connections, pool.max_concurrency))
+        results = await asyncio.gather(
+            *(client.get(pool.warmup_path) for _ in range(count)),
+            return_exceptions=True
+        )
+        warmed = any(isinstance(r, httpx.Response) for r in results)
+        if warmed:
+            self.stats[provider].last_warmed_at = time.time()
+            logger.info(f"Warmed {provider} connection pool ({count} connections)")
+        else:
+            logger.warning(f"Failed to warm {provider} connection pool: {results[0]}")
+        return warmed
+
+    async def warm_all(self, connections: int = 2) -> Dict[str, bool]:
+        """Warm every configured provider concurrently."""
+        names = list(self.configs)
+        results = await asyncio.gather(*(self.warm(name, connections) for name in names))
+        return dict(zip(names, results))
+
+    async def on_circuit_recovered(self, provider: str) -> None:
+        """Circuit-breaker hook: re-warm the pool when a provider comes back."""
+        if provider in self.configs:
+            await self.warm(provider)
+
+    def warm_in_background(self, provider: Optional[str] = None) -> Optional[asyncio.Task]:
+        """Start warming one provider (or all) without waiting; close() cancels it."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        task = loop.create_task(self.warm_all() if provider is None else self.on_circuit_recovered(provider))
+        # The loop only holds a weak reference to tasks
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+        return task
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Pool limits and usage for each provider."""
+        return {
+            name: {
+                "max_concurrency": pool.max_concurrency,
+                "http2": pool.http2 and config.provider_http2 and HTTP2_AVAILABLE,
+                "in_flight": self.stats[name].in_flight,
+                "waiting": self.stats[name].waiting,
+                "saturated_total": self.stats[name].saturated_total,
+                "requests_total": self.stats[name].requests_total,
+                "last_warmed_at": self.stats[name].last_warmed_at,
+            }
+            for name, pool in self.configs.items()
+        }
+
+    async def close(self) -> None:
+        """Cancel pending warm-ups and close all provider clients."""
+        tasks = list(self._warm_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+# Global instance
+provider_transport = ProviderTransport()
@@ -0,0 +1,308 @@
+"""
+NeuroForge Provider Statistics
+
+Live, decaying latency/error/cost statistics per (provider, model) and a
+latency- and cost-aware routing strategy built on them.
+
+Latency is kept in a sliding-window sketch: a ring of time slots, each holding
+log-scale bucket counts. Recording a sample is a couple of integer increments
+and needs no lock; old slots are recycled as the window slides, so memory is
+fixed no matter how many samples arrive. Error rate, cost and throughput are
+exponentially decayed by elapsed time. The same statistics feed routing and
+the circuit breaker.
+"""
+
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+# Log-scale latency buckets: ~12% relative error from 1ms to ~10min
+_BUCKET_GROWTH = 1.25
+_BUCKET_COUNT = 60
+
+
+def _bucket_index(value_ms: float) -> int:
+    if value_ms <= 1.0:
+        return 0
+    return min(_BUCKET_COUNT - 1, int(math.log(value_ms) / math.log(_BUCKET_GROWTH)) + 1)
+
+
+def _bucket_value(index: int) -> float:
+    """Upper bound of a bucket in milliseconds."""
+    return _BUCKET_GROWTH ** index
+
+
+class SlidingLatencySketch:
+    """Latency quantiles over the last `window_seconds`, in fixed memory."""
+
+    def __init__(self, window_seconds: float = 300.0, slots: int = 10):
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self._counts = [[0] * _BUCKET_COUNT for _ in range(slots)]
+        self._epochs = [-1] * slots
+
+    def _slot(self, now: float) -> int:
+        epoch = int(now / self.slot_seconds)
+        index = epoch % self.slots
+        if self._epochs[index] != epoch:
+            # Recycle a slot that fell out of the window. Concurrent writers may
+            # both reset it; losing a sample or two at a boundary is harmless.
+            self._counts[index] = [0] * _BUCKET_COUNT
+            self._epochs[index] = epoch
+        return index
+
+    def record(self, value_ms: float, now: Optional[float] = None) -> None:
+        index = self._slot(time.time() if now is None else now)
+        self._counts[index][_bucket_index(value_ms)] += 1
+
+    def _merged(self, now: float) -> List[int]:
+        oldest = int(now / self.slot_seconds) - self.slots + 1
+        merged = [0] * _BUCKET_COUNT
+        for epoch, counts in zip(self._epochs, self._counts):
+            if epoch >= oldest:
+                for i, count in enumerate(counts):
+                    merged[i] += count
+        return merged
+
+    def count(self, now: Optional[float] = None) -> int:
+        return sum(self._merged(time.time() if now is None else now))
+
+    def quantile(self, q: float, now: Optional[float] = None) -> Optional[float]:
+        """Approximate latency quantile in ms, or None with no samples in window."""
+        merged = self._merged(time.time() if now is None else now)
+        total = sum(merged)
+        if total == 0:
+            return None
+        target = q * total
+        seen = 0
+        for index, count in enumerate(merged):
+            seen += count
+            if seen >= target:
+                return _bucket_value(index)
+        return _bucket_value(_BUCKET_COUNT - 1)
+
+
+class DecayingAverage:
+    """
+    Exponentially time-decayed average with a half-life in seconds.
+
+    With a `resting` value, reads through current() also decay toward it
+    while no samples arrive, so a provider that stops getting traffic (circuit
+    open, excluded by the router) does not keep its last error rate forever.
+    """
+
+    def __init__(
+        self,
+        half_life_seconds: float = 120.0,
+        initial: Optional[float] = None,
+        resting: Optional[float] = None
+    ):
+        self.half_life = half_life_seconds
+        self.value = initial
+        self.resting = resting
+        self.updated_at = time.time()
+
+    def current(self, now: Optional[float] = None) -> Optional[float]:
+        if self.value is None or self.resting is None:
+            return self.value
+        now = time.time() if now is None else now
+        idle = max(now - self.updated_at, 0.0)
+        return self.resting + (self.value - self.resting) * 0.5 ** (idle / self.half_life)
+
+    def update(self, sample: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if self.value is None:
+            self.value = sample
+        else:
+            alpha = 1.0 - 0.5 ** (max(now - self.updated_at, 0.0) / self.half_life)
+            # Always move at least a little, even for back-to-back samples
+            alpha = max(alpha, 0.05)
+            self.value += alpha * (sample - self.value)
+        self.updated_at = now
+
+
+class ProviderModelStats:
+    """Live statistics for one (provider, model) pair."""
+
+    def __init__(self, window_seconds: float = 300.0, half_life_seconds: float = 120.0):
+        self.latency = SlidingLatencySketch(window_seconds)
+        self.error_rate = DecayingAverage(half_life_seconds, initial=0.0, resting=0.0)
+        self.cost_per_request = DecayingAverage(half_life_seconds)
+        self.requests = 0
+
+    def record(
+        self,
+        latency_ms: float,
+        success: bool,
+        cost_usd: Optional[float] = None,
+        now: Optional[float] = None
+    ) -> None:
+        self.requests += 1
+        self.error_rate.update(0.0 if success else 1.0, now)
+        if success:
+            self.latency.record(latency_ms, now)
+            if cost_usd is not None:
+                self.cost_per_request.update(cost_usd, now)
+
+    def expected_time_ms(self, default_ms: float, now: Optional[float] = None) -> float:
+        """
+        Expected time to a successful completion.
+
+        Median latency plus a retry penalty: each failure costs a p95 wait.
+        """
+        p50 = self.latency.quantile(0.5, now)
+        p95 = self.latency.quantile(0.95, now)
+        if p50 is None:
+            return default_ms
+        error_rate = min(self.error_rate.current(now) or 0.0, 0.99)
+        return p50 + (error_rate / (1.0 - error_rate)) * (p95 or p50)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Optional[float]]:
+        return {
+            "requests": self.requests,
+            "window_samples": self.latency.count(now),
+            "p50_ms": self.latency.quantile(0.5, now),
+            "p95_ms": self.latency.quantile(0.95, now),
+            "error_rate": self.error_rate.current(now),
+            "cost_per_request": self.cost_per_request.value,
+        }
+
+
+class ProviderStatsRegistry:
+    """Statistics for every (provider, model) seen by the router."""
+
+    def __init__(self, window_seconds: float = 300.0, half_life_seconds: float = 120.0):
+        self.window_seconds = window_seconds
+        self.half_life_seconds = half_life_seconds
+        self._stats: Dict[Tuple[str, str], ProviderModelStats] = {}
+        self._listeners: List[Callable[[str, str, float, bool], None]] = []
+
+    def add_listener(self, listener: Callable[[str, str, float, bool], None]) -> None:
+        """Call listener(provider, model, latency_ms, success) for every recorded call."""
+        self._listeners.append(listener)
+
+    def get(self, provider: str, model: str) -> ProviderModelStats:
+        key = (provider, model)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats.setdefault(
+                key, ProviderModelStats(self.window_seconds, self.half_life_seconds)
+            )
+        return stats
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        latency_ms: float,
+        success: bool,
+        cost_usd: Optional[float] = None
+    ) -> None:
+        self.get(provider, model).record(latency_ms, success, cost_usd)
+        for listener in self._listeners:
+            listener(provider, model, latency_ms, success)
+
+    def should_open_circuit(
+        self,
+        provider: str,
+        model: str,
+        error_threshold: float = 0.5,
+        min_requests: int = 10,
+        now: Optional[float] = None
+    ) -> bool:
+        """
+        Circuit-breaker input: decayed error rate over threshold with enough
+        traffic. The rate keeps decaying while the provider gets no traffic,
+        so an open circuit closes again after a few half-lives.
+        """
+        stats = self._stats.get((provider, model))
+        if stats is None or stats.requests < min_requests:
+            return False
+        return (stats.error_rate.current(now) or 0.0) >= error_threshold
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {f"{p}/{m}": s.snapshot() for (p, m), s in self._stats.items()}
+
+
+@dataclass
+class RouteCandidate:
+    """A model the router may choose, with its known quality and list price."""
+    provider: str
+    model: str
+    quality_score: float
+    cost_per_request: Optional[float] = None
+    is_champion: bool = False
+
+
+class LatencyCostStrategy:
+    """
+    Choose the candidate with the lowest expected time and cost, among those
+    whose quality is within `quality_floor` of the champion's.
+
+    score = expected_ms / latency_scale_ms + cost_weight * cost / cost_scale
+    """
+
+    def __init__(
+        self,
+        registry: ProviderStatsRegistry,
+        quality_floor: float = 0.95,
+        cost_weight: float = 0.5,
+        latency_scale_ms: float = 1000.0,
+        cost_scale: float = 0.01,
+        default_latency_ms: float = 2000.0,
+        explore_rate: float = 0.02
+    ):
+        self.registry = registry
+        self.quality_floor = quality_floor
+        self.cost_weight = cost_weight
+        self.latency_scale_ms = latency_scale_ms
+        self.cost_scale = cost_scale
+        self.default_latency_ms = default_latency_ms
+        self.explore_rate = explore_rate
+
+    def eligible(self, candidates: List[RouteCandidate]) -> List[RouteCandidate]:
+        champions = [c for c in candidates if c.is_champion]
+        floor = champions[0].quality_score * self.quality_floor if champions else 0.0
+        return [
+            c for c in candidates
+            if c.quality_score >= floor
+            and not self.registry.should_open_circuit(c.provider, c.model)
+        ]
+
+    def score(self, candidate: RouteCandidate) -> float:
+        stats = self.registry.get(candidate.provider, candidate.model)
+        expected_ms = stats.expected_time_ms(self.default_latency_ms)
+        cost = stats.cost_per_request.value
+        if cost is None:
+            cost = candidate.cost_per_request or 0.0
+        return expected_ms / self.latency_scale_ms + self.cost_weight * cost / self.cost_scale
+
+    def choose(self, candidates: List[RouteCandidate]) -> Optional[RouteCandidate]:
+        """Best eligible candidate; falls back to the champion if none qualify."""
+        pool = self.eligible(candidates)
+        if not pool:
+            champions = [c for c in candidates if c.is_champion]
+            return champions[0] if champions else None
+
+        # Occasionally probe a candidate with no recent samples so stale
+        # statistics can recover after a provider incident.
+        cold = [c for c in pool if self.registry.get(c.provider, c.model).latency.count() == 0]
+        if cold and random.random() < self.explore_rate:
+            return random.choice(cold)
+        return min(pool, key=self.score)
+
+
+# Global instances
+provider_stats = ProviderStatsRegistry(
+    window_seconds=config.routing_stats_window_seconds,
+    half_life_seconds=config.routing_stats_half_life_seconds,
+)
+latency_cost_strategy = LatencyCostStrategy(
+    provider_stats,
+    quality_floor=config.routing_quality_floor,
+    cost_weight=config.routing_cost_weight,
+)
@@ -0,0 +1,192 @@
+"""
+NeuroForge Serialization
+
+Fast JSON path for routers, caches and DataForge payloads.
+
+dumps()/loads() use the fastest available backend: orjson when installed,
+otherwise pydantic-core's Rust encoder (always present alongside FastAPI),
+otherwise the stdlib. Output is compact UTF-8 bytes; datetimes, UUIDs,
+dataclasses and Pydantic models are handled natively, anything else falls
+back to str().
+
+Trusted internal data (rows we wrote, DataForge records) is passed around as
+plain dicts: json_response()/json_list_response() send it without a
+response_model / jsonable_encoder pass, and large lists are streamed as a
+JSON array in chunks instead of being rendered into one string. Where a typed
+model is really needed, validate_json() parses and validates raw bytes in a
+single pydantic-core pass.
+"""
+
+import dataclasses
+import functools
+import json
+import logging
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterable, Dict, Iterable, Optional, Type, TypeVar, Union
+
+from config import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pydantic_core
+    from pydantic import BaseModel
+except ImportError:
+    pydantic_core = None
+    BaseModel = None
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT")
+
+
+def _select_backend(name: str) -> str:
+    available = {"orjson": orjson is not None, "pydantic": pydantic_core is not None, "json": True}
+    if name == "auto":
+        return next(backend for backend, ok in available.items() if ok)
+    if not available.get(name, False):
+        logger.warning(f"JSON backend {name!r} not available, using the best installed one")
+        return _select_backend("auto")
+    return name
+
+
+BACKEND = _select_backend(config.json_backend)
+
+
+def _default(value: Any) -> Any:
+    if BaseModel is not None and isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(value: Any, backend: Optional[str] = None) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    backend = backend or BACKEND
+    if backend == "orjson":
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    if backend == "pydantic":
+        return pydantic_core.to_json(value, serialize_unknown=True)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str], backend: Optional[str] = None) -> Any:
+    backend = backend or BACKEND
+    if backend == "orjson":
+        return orjson.loads(data)
+    if backend == "pydantic":
+        return pydantic_core.from_json(data)
+    return json.loads(data)
+
+
+# ----------------------------------------------------------------------
+# Typed decoding
+# ----------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=256)
+def _adapter(type_: Any):
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(type_)
+
+
+def validate_json(type_: Type[ModelT], raw: Union[bytes, str]) -> ModelT:
+    """
+    Parse and validate raw JSON into a model (or List[Model], ...) in one
+    pydantic-core pass, instead of json.loads() followed by model_validate().
+    Trusted internal payloads that are only passed through should skip models
+    and use loads().
+    """
+    if isinstance(type_, type) and BaseModel is not None and issubclass(type_, BaseModel):
+        return type_.model_validate_json(raw)
+    return _adapter(type_).validate_json(raw)
+
+
+# ----------------------------------------------------------------------
+# Responses
+# ----------------------------------------------------------------------
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None):
+    """JSONResponse equivalent for trusted data: no response_model pass, fast encoder."""
+    from fastapi.responses import Response
+
+    return Response(content=dumps(content), status_code=status_code, headers=headers, media_type="application/json")
+
+
+async def iter_json_array(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    key: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    chunk_items: int = 100
+):
+    """
+    Encode items as a JSON array (or {key: [...], **extra}) in chunks of
+    chunk_items, so a large list is never held as one string.
+    """
+    if key is None and extra:
+        raise ValueError("extra fields need a key to wrap the array in")
+    yield b'{' + dumps(key) + b':[' if key is not None else b'['
+
+    buffer = []
+    first = True
+
+    def flush() -> bytes:
+        nonlocal first
+        chunk = b",".join(buffer)
+        if not first:
+            chunk = b"," + chunk
+        first = False
+        buffer.clear()
+        return chunk
+
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            buffer.append(dumps(item))
+            if len(buffer) >= chunk_items:
+                yield flush()
+    else:
+        for item in items:
+            buffer.append(dumps(item))
+            if len(buffer) >= chunk_items:
+                yield flush()
+    if buffer:
+        yield flush()
+
+    if key is None:
+        yield b']'
+    elif extra:
+        yield b'],' + dumps(extra)[1:]
+    else:
+        yield b']}'
+
+
+def json_list_response(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    key: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+):
+    """Stream a large list response as a chunked JSON array."""
+    from fastapi.responses import StreamingResponse
+
+    return StreamingResponse(
+        iter_json_array(items, key, extra), status_code=status_code, headers=headers, media_type="application/json"
+    )
@@ -0,0 +1,164 @@
+"""
+NeuroForge Shared Cache
+
+Host-local cache shared by every worker process.
+
+Entries live in a SQLite database on tmpfs (/dev/shm by default) opened in
+WAL mode with memory-mapped I/O, so reads are served from shared pages and a
+value cached by one worker is visible to all others. Each cache namespace
+has its own TTL and entry bound.
+
+In use: the exact output cache ("output" namespace, output_cache.py). The
+embedding LRU, deployment cache and chain memo cache are per-process. The
+dedup/metadata/context caches live in neuroforge_backend and are not moved
+onto this store yet.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import config
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (namespace, created_at);
+"""
+
+
+class SharedCacheStore:
+    """One mmap-backed SQLite file; a connection per thread per process."""
+
+    def __init__(self, path: str, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._pid = os.getpid()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")  # cache data; tmpfs is not durable anyway
+        conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Connections must not cross fork(); reopen in each worker
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            conn = self._local.conn = self._connect()
+        return conn
+
+
+class SharedCache:
+    """A namespaced view of the shared store with TTL and an entry bound."""
+
+    def __init__(
+        self,
+        store: SharedCacheStore,
+        namespace: str,
+        ttl_seconds: Optional[float] = 3600.0,
+        max_entries: int = 10000
+    ):
+        self.store = store
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sets_since_trim = 0
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        row = self.store.conn.execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set_bytes(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.store.conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, value, now, now + ttl if ttl else None)
+        )
+        self._sets_since_trim += 1
+        # Trim lazily; exact bounds are not worth a COUNT(*) on every write
+        if self._sets_since_trim >= max(1, self.max_entries // 10):
+            self._sets_since_trim = 0
+            self.trim()
+
+    def get(self, key: str) -> Optional[Any]:
+        """JSON-decoded value, or None."""
+        raw = self.get_bytes(key)
+        return loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a JSON-serializable value."""
+        self.set_bytes(key, dumps(value), ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        self.store.conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+
+    def clear(self) -> None:
+        self.store.conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def trim(self) -> int:
+        """Drop expired entries, then the oldest beyond max_entries."""
+        conn = self.store.conn
+        deleted = conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time())
+        ).rowcount
+        deleted += conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM entries WHERE namespace = ?"
+            " ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        ).rowcount
+        return deleted
+
+    def size(self) -> int:
+        return self.store.conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+
+_store: Optional[SharedCacheStore] = None
+_caches: Dict[str, SharedCache] = {}
+
+
+def get_shared_cache(namespace: str, ttl_seconds: Optional[float] = 3600.0, max_entries: int = 10000) -> SharedCache:
+    """Shared cache for a namespace, backed by the host-wide store."""
+    global _store
+    if _store is None:
+        _store = SharedCacheStore(config.shared_cache_path)
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches[namespace] = SharedCache(_store, namespace, ttl_seconds, max_entries)
+    return cache
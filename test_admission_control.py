@@ -0,0 +1,262 @@
+"""
+Tests for admission control, priority queues and load shedding.
+"""
+
+import asyncio
+
+import pytest
+
+from admission_control import (
+    AdmissionController, AdmissionMiddleware, AdmissionRejected, GradientLimit, route_matcher
+)
+
+
+def _fixed(limit):
+    return GradientLimit(initial=limit, min_limit=limit, max_limit=limit)
+
+
+def test_interactive_is_admitted_before_batch_and_tenants_round_robin():
+    controller = AdmissionController(limit=_fixed(1))
+    order = []
+
+    async def request(tenant, priority):
+        async with controller.slot(tenant, priority, timeout=5):
+            order.append((tenant, priority))
+            await asyncio.sleep(0.01)
+
+    async def run():
+        blocker = asyncio.create_task(request("t0", "standard"))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(request("a", "batch")),
+            asyncio.create_task(request("a", "interactive")),
+            asyncio.create_task(request("a", "interactive")),
+            asyncio.create_task(request("b", "interactive")),
+        ]
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(run())
+    assert order == [
+        ("t0", "standard"),
+        ("a", "interactive"),
+        ("b", "interactive"),  # b is not stuck behind a's second request
+        ("a", "interactive"),
+        ("a", "batch"),
+    ]
+
+
+def test_rejects_early_when_wait_exceeds_deadline():
+    controller = AdmissionController(limit=_fixed(1))
+
+    async def run():
+        async with controller.slot("t", timeout=5):
+            await asyncio.sleep(0.05)
+        holder = asyncio.create_task(_hold(controller, 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot("t", timeout=0.01):
+                pass
+        await holder
+        return excinfo.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after >= 1
+
+
+async def _hold(controller, seconds, tenant="holder"):
+    async with controller.slot(tenant, timeout=5):
+        await asyncio.sleep(seconds)
+
+
+def test_tenant_over_queue_share_gets_429():
+    controller = AdmissionController(limit=_fixed(1), max_queue_per_tenant=1)
+
+    async def run():
+        holder = asyncio.create_task(_hold(controller, 0.05))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_hold(controller, 0, tenant="noisy"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot("noisy", timeout=5):
+                pass
+        await asyncio.gather(holder, queued)
+        return excinfo.value
+
+    assert asyncio.run(run()).status_code == 429
+
+
+def test_gradient_limit_grows_when_healthy_and_shrinks_under_latency():
+    limit = GradientLimit(initial=10, min_limit=1, max_limit=100)
+    for _ in range(20):
+        limit.on_sample(0.1, in_flight=int(limit.limit))
+    grown = limit.limit
+    assert grown > 10
+
+    for _ in range(20):
+        limit.on_sample(1.0, in_flight=int(limit.limit))
+    assert limit.limit < grown
+
+    before = limit.limit
+    limit.on_sample(0.0, in_flight=1, dropped=True)
+    assert limit.limit == pytest.approx(before * 0.9)
+
+
+def test_gradient_limit_ignores_fast_outlier():
+    limit = GradientLimit(initial=500, min_limit=2, max_limit=500)
+    for _ in range(30):
+        limit.on_sample(2.0, in_flight=500)
+    limit.on_sample(0.003, in_flight=500)
+    for _ in range(50):
+        limit.on_sample(2.0, in_flight=500)
+    assert limit.limit == pytest.approx(500)
+
+    # Same outlier as the very first sample
+    cold = GradientLimit(initial=500, min_limit=2, max_limit=500)
+    cold.on_sample(0.003, in_flight=500)
+    for _ in range(50):
+        cold.on_sample(2.0, in_flight=500)
+    assert cold.limit == pytest.approx(500)
+
+
+def test_gradient_limit_shrink_per_sample_is_bounded():
+    limit = GradientLimit(initial=100, min_limit=1, max_limit=100, warmup_samples=1)
+    limit.on_sample(0.01, in_flight=100)
+    before = limit.limit
+    limit.on_sample(10.0, in_flight=100)
+    assert limit.limit >= before * 0.95
+
+
+def test_route_matcher_uses_whole_segments():
+    matches = route_matcher([
+        "/api/v1/inference", "/api/v1/orchestrate/planning/stream",
+        "/api/v1/workbench/chains/{chain_id}/execute",
+    ])
+    assert matches("/api/v1/inference")
+    assert matches("/api/v1/orchestrate/planning/stream")
+    assert matches("/api/v1/workbench/chains/abc/execute")
+    assert not matches("/api/v1/inference/history")
+    assert not matches("/api/v1/inference/history/export")
+    assert not matches("/api/v1/inferences")
+    assert not matches("/api/v1/workbench/chains/abc/executions")
+
+
+def test_middleware_passes_preflight_through():
+    controller = AdmissionController(limit=_fixed(1))
+    controller.in_flight = 1  # saturated: anything queued would wait
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/api/v1/execute", "method": "OPTIONS",
+             "headers": [(b"x-request-timeout", b"0.01")]}
+    asyncio.run(AdmissionMiddleware(app, controller, ["/api/v1/execute"])(scope, None, send))
+    assert sent[0]["status"] == 200
+    assert controller.snapshot()["rejected"] == {}
+
+
+def test_middleware_sheds_with_retry_after():
+    controller = AdmissionController(limit=_fixed(1))
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionMiddleware(app, controller, ["/api/v1/execute"])
+
+    async def call(timeout):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": "/api/v1/execute", "method": "POST",
+                 "headers": [(b"x-request-timeout", timeout.encode())]}
+        await middleware(scope, None, send)
+        return dict(sent[0]["headers"]), sent[0]["status"]
+
+    async def run():
+        # Warm up the service-time estimate, then overload
+        await call("5")
+        return await asyncio.gather(call("5"), call("0.01"))
+
+    (first_headers, first_status), (shed_headers, shed_status) = asyncio.run(run())
+    assert first_status == 200 and b"server-timing" in first_headers
+    assert shed_status == 503
+    assert int(shed_headers[b"retry-after"]) >= 1
+
+
+def test_provider_latency_drives_the_limit_per_model():
+    controller = AdmissionController(
+        limit=GradientLimit(initial=50, min_limit=1, max_limit=100, warmup_samples=5), provider_feedback=True
+    )
+    controller.in_flight = 50
+    for _ in range(20):
+        controller.observe_provider_call("openai", "gpt-4o-mini", 200.0, True)
+        controller.observe_provider_call("anthropic", "claude-3-opus", 4000.0, True)
+    healthy = controller.limiter.limit
+    assert healthy > 50  # a slow model's normal latency is not congestion
+
+    for _ in range(10):
+        controller.observe_provider_call("openai", "gpt-4o-mini", 2000.0, True)
+    assert controller.limiter.limit < healthy
+    assert set(controller.snapshot()["baseline_latency_s"]) == {"openai/gpt-4o-mini", "anthropic/claude-3-opus"}
+
+    limit = controller.limiter.limit
+    controller.observe_provider_call("openai", "gpt-4o-mini", 0.0, False)
+    assert controller.limiter.limit < limit
+
+
+def test_slot_time_does_not_feed_the_gradient_with_provider_feedback():
+    controller = AdmissionController(limit=GradientLimit(initial=10, warmup_samples=0), provider_feedback=True)
+    controller._release(600.0, dropped=False)  # a ten-minute request
+    assert controller.limiter.limit == 10
+    assert controller.limiter.baselines == {}
+
+
+def test_provider_stats_notifies_listeners():
+    from provider_stats import ProviderStatsRegistry
+
+    calls = []
+    registry = ProviderStatsRegistry()
+    registry.add_listener(lambda *args: calls.append(args))
+    registry.record("groq", "llama3-70b", 120.0, True)
+    assert calls == [("groq", "llama3-70b", 120.0, True)]
+
+
+@pytest.mark.parametrize("client, expected", [
+    ("10.1.2.3", ("acme", "interactive")),
+    ("203.0.113.9", ("203.0.113.9", "standard")),
+])
+def test_tenant_and_priority_headers_need_a_trusted_client(client, expected):
+    seen = []
+
+    class Recorder(AdmissionController):
+        def slot(self, tenant="default", priority="standard", timeout=None):
+            seen.append((tenant, priority))
+            return super().slot(tenant, priority, timeout)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        pass
+
+    middleware = AdmissionMiddleware(app, Recorder(), ["/api/v1/execute"], trusted_clients=["10.0.0.0/8"])
+    scope = {"type": "http", "path": "/api/v1/execute", "method": "POST", "client": (client, 5000),
+             "headers": [(b"x-tenant-id", b"acme"), (b"x-priority", b"interactive")]}
+    asyncio.run(middleware(scope, None, send))
+    assert seen == [expected]
+
+
+def test_untrusted_clients_may_lower_their_priority():
+    middleware = AdmissionMiddleware(None, AdmissionController(), [], trusted_clients=[])
+    scope = {"client": ("203.0.113.9", 5000)}
+    assert middleware._tenant_and_priority(scope, {"x-priority": "batch"}) == ("203.0.113.9", "batch")
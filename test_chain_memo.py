@@ -0,0 +1,151 @@
+"""
+Tests for chain node memoization.
+"""
+
+import asyncio
+
+import pytest
+
+from chain_memo import NodeMemoCache, downstream_nodes, execute_chain, node_memo_key, topological_order
+
+
+def _chain(memoize=True, version_b=1):
+    return {
+        "id": "chain-1",
+        "memoize": memoize,
+        "nodes": [
+            {"id": "c", "prompt_id": "p-c", "prompt_version": 1, "model": "gpt-4", "inputs": {}},
+            {"id": "a", "prompt_id": "p-a", "prompt_version": 1, "model": "gpt-4", "inputs": {"topic": "dragons"}},
+            {"id": "b", "prompt_id": "p-b", "prompt_version": version_b, "model": "gpt-4", "inputs": {}},
+        ],
+        "connections": [
+            {"from": "a", "to": "b", "input": "outline"},
+            {"source": "b", "target": "c"},
+        ],
+    }
+
+
+class Executor:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, node, inputs):
+        self.calls.append(node["id"])
+        return f"{node['id']}@v{node['prompt_version']}({sorted(inputs.items())})"
+
+
+def test_graph_helpers():
+    chain = _chain()
+    assert topological_order(chain["nodes"], chain["connections"]) == ["a", "b", "c"]
+    assert downstream_nodes(chain["connections"], ["b"]) == {"b", "c"}
+    with pytest.raises(ValueError):
+        topological_order(chain["nodes"], chain["connections"] + [{"from": "c", "to": "a"}])
+
+
+def test_memo_key_is_content_addressed():
+    base = node_memo_key("p", 1, "gpt-4", {"temperature": 0}, {"x": 1, "y": [1, 2]})
+    assert base == node_memo_key("p", 1, "gpt-4", {"temperature": 0}, {"y": [1, 2], "x": 1})
+    assert base != node_memo_key("p", 2, "gpt-4", {"temperature": 0}, {"x": 1, "y": [1, 2]})
+    assert base != node_memo_key("p", 1, "gpt-4", {"temperature": 0}, {"x": 2, "y": [1, 2]})
+
+
+def test_changing_one_node_reruns_it_and_downstream_only():
+    memo, executor = NodeMemoCache(), Executor()
+
+    async def run():
+        first = await execute_chain(_chain(), executor, memo)
+        executor.calls.clear()
+        second = await execute_chain(_chain(version_b=2), executor, memo)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.reused == []
+    assert executor.calls == ["b", "c"]
+    assert second.reused == ["a"]
+    assert second.outputs["a"] == first.outputs["a"]
+
+
+def test_disabled_per_run_and_forced_rerun():
+    memo, executor = NodeMemoCache(), Executor()
+
+    async def run():
+        await execute_chain(_chain(), executor, memo)
+        executor.calls.clear()
+        await execute_chain(_chain(), executor, memo, memoize=False)
+        disabled = list(executor.calls)
+        executor.calls.clear()
+        await execute_chain(_chain(), executor, memo, rerun=["b"])
+        return disabled
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert executor.calls == ["b", "c"]
+
+
+def test_results_come_from_stored_history_and_lru_is_bounded():
+    executor = Executor()
+
+    async def run():
+        recorded = await execute_chain(_chain(), executor, NodeMemoCache())
+        history = [{"execution_id": "e1", "node_results": recorded.node_results}]
+        loads = []
+
+        async def loader(chain_id):
+            loads.append(chain_id)
+            return history
+
+        executor.calls.clear()
+        memo = NodeMemoCache(history_loader=loader)
+        replay = await execute_chain(_chain(), executor, memo)
+        await execute_chain(_chain(), executor, memo)
+
+        small = NodeMemoCache(history_loader=loader, max_entries=2)
+        await small.lookup("chain-1", "missing")
+        return replay, loads, small.snapshot()
+
+    replay, loads, small = asyncio.run(run())
+    assert executor.calls == []
+    assert replay.reused == ["a", "b", "c"]
+    assert loads == ["chain-1", "chain-1"]  # once per cache, not per run
+    assert small["entries"] == 2
+
+
+def test_eviction_does_not_reload_history():
+    def history(chain_id):
+        return [{"node_results": {
+            f"n{i}": {"memo_key": f"{chain_id}-{i}", "output": i} for i in range(30)
+        }}]
+
+    loads = []
+
+    async def loader(chain_id):
+        loads.append(chain_id)
+        return history(chain_id)
+
+    async def run():
+        memo = NodeMemoCache(history_loader=loader, max_entries=20)
+        for i in range(10):
+            await memo.lookup("chain-1", f"chain-1-{i}")  # evicted while loading
+        for i in range(10):
+            for chain_id in ("chain-1", "chain-2"):
+                await memo.lookup(chain_id, f"{chain_id}-{i}")
+        return memo.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert loads == ["chain-1", "chain-2"]
+    assert snapshot["entries"] == 20
+
+
+def test_history_is_reloaded_after_ttl():
+    loads = []
+
+    async def loader(chain_id):
+        loads.append(chain_id)
+        return []
+
+    async def run():
+        memo = NodeMemoCache(history_loader=loader, history_ttl_seconds=0.0)
+        await memo.lookup("chain-1", "k")
+        await memo.lookup("chain-1", "k")
+
+    asyncio.run(run())
+    assert loads == ["chain-1", "chain-1"]
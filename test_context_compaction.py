@@ -0,0 +1,45 @@
+"""
+Tests for near-duplicate elimination in context compaction.
+"""
+
+from context_compaction import ContextCompactor, MinHasher, truncate_to_budget
+
+PARAGRAPH = (
+    "The ingestion service batches incoming documents, computes embeddings "
+    "and writes chunks to DataForge with a freshness score that decays over time."
+)
+
+
+def test_near_duplicates_are_dropped_and_tokens_reported():
+    chunks = [
+        {"chunk_id": "v1", "text": PARAGRAPH, "score": 0.9},
+        {"chunk_id": "v2", "text": PARAGRAPH.replace("DataForge", "DataForge v2"), "score": 0.85},
+        {"chunk_id": "other", "text": "Champion rotation happens when the challenger wins ten rounds.", "score": 0.5},
+    ]
+    result = ContextCompactor(similarity_threshold=0.6).compact(chunks)
+
+    assert [c["chunk_id"] for c in result.chunks] == ["v1", "other"]
+    assert result.dropped_ids == ["v2"]
+    assert result.tokens_saved > 0
+
+
+def test_fingerprints_cached_by_chunk_id():
+    hasher = MinHasher()
+    first = hasher.signature(PARAGRAPH, "chunk-1")
+    second = hasher.signature("ignored text", "chunk-1")
+    assert first == second
+    assert hasher.cache_hits == 1
+
+
+def test_pinned_chunks_keep_their_order():
+    chunks = [
+        {"chunk_id": "primary", "text": "alpha beta gamma delta epsilon", "score": 0.1},
+        {"chunk_id": "support", "text": "zeta eta theta iota kappa", "score": 0.9},
+    ]
+    result = ContextCompactor().compact(chunks, pinned=1)
+    assert [c["chunk_id"] for c in result.chunks] == ["primary", "support"]
+
+
+def test_truncate_to_budget():
+    chunks = [{"text": "x" * 40}, {"text": "y" * 40}, {"text": "z" * 40}]
+    assert len(truncate_to_budget(chunks, max_tokens=25)) == 2
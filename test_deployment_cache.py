@@ -0,0 +1,123 @@
+"""
+Tests for the deployment resolution cache.
+"""
+
+import asyncio
+
+import pytest
+
+from deployment_cache import (
+    CompiledTemplate,
+    DeploymentNotFoundError,
+    DeploymentResolver,
+    adapter_for_model,
+)
+
+
+def _record(deployment_id="dep-1", version=1, template="Hello {name}, write about {topic}."):
+    return {
+        "deployment_id": deployment_id,
+        "prompt_id": "prompt-1",
+        "version": version,
+        "base_prompt": template,
+        "models": ["claude-3-5-sonnet", "gpt-4"],
+        "parameters": {"temperature": 0.2},
+    }
+
+
+class FakeDataForge:
+    def __init__(self):
+        self.records = {"dep-1": _record()}
+        self.loads = 0
+        self.probes = 0
+
+    async def load(self, deployment_id):
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return self.records.get(deployment_id)
+
+    async def versions(self):
+        self.probes += 1
+        return {d: r["version"] for d, r in self.records.items()}
+
+
+def test_template_compiles_once_and_renders():
+    template = CompiledTemplate("Hello {name}, write about {topic}.")
+    assert template.variables == {"name", "topic"}
+    assert template.render({"name": "Ada", "topic": "engines"}) == "Hello Ada, write about engines."
+    with pytest.raises(ValueError):
+        template.render({"name": "Ada"})
+
+
+def test_template_keeps_literal_json_braces():
+    source = 'Summarize {topic}. Reply as JSON: {"key": "value", "items": [{"id": 1}]} or {}.'
+    template = CompiledTemplate(source)
+    assert template.variables == {"topic"}
+    assert template.render({"topic": "tides"}) == (
+        'Summarize tides. Reply as JSON: {"key": "value", "items": [{"id": 1}]} or {}.'
+    )
+
+
+def test_adapter_resolution():
+    assert adapter_for_model("gpt-4") == "openai"
+    assert adapter_for_model("claude-3-opus") == "anthropic"
+    assert adapter_for_model("llama3:8b") == "ollama"
+    assert adapter_for_model("llama3-70b", provider="groq") == "groq"
+
+
+def test_warm_resolve_makes_no_dataforge_calls():
+    dataforge = FakeDataForge()
+    resolver = DeploymentResolver(loader=dataforge.load, version_probe=dataforge.versions)
+
+    async def run():
+        first = await asyncio.gather(*(resolver.resolve("dep-1") for _ in range(10)))
+        for _ in range(100):
+            await resolver.resolve("dep-1")
+        return first
+
+    first = asyncio.run(run())
+    assert dataforge.loads == 1  # concurrent cold misses share one load
+    assert all(d is first[0] for d in first)
+    assert first[0].adapter == "anthropic"
+    assert first[0].render({"name": "A", "topic": "B"}) == "Hello A, write about B."
+    assert resolver.hits == 100
+
+
+def test_push_and_poll_refresh():
+    dataforge = FakeDataForge()
+    resolver = DeploymentResolver(loader=dataforge.load, version_probe=dataforge.versions)
+
+    async def run():
+        await resolver.resolve("dep-1")
+
+        # Push: a new deployment is served without a load
+        dataforge.records["dep-2"] = _record("dep-2")
+        resolver.on_deploy(dataforge.records["dep-2"])
+        assert (await resolver.resolve("dep-2")).deployment_id == "dep-2"
+        assert dataforge.loads == 1
+
+        # Poll: version bump reloads, removal evicts
+        dataforge.records["dep-1"] = _record(version=2, template="Hi {name}")
+        del dataforge.records["dep-2"]
+        assert await resolver.refresh() == {"reloaded": 1, "removed": 1}
+        assert (await resolver.resolve("dep-1")).render({"name": "A"}) == "Hi A"
+
+        with pytest.raises(DeploymentNotFoundError):
+            await resolver.resolve("dep-2")
+
+    asyncio.run(run())
+
+
+def test_undeploy_during_load_is_not_resurrected():
+    dataforge = FakeDataForge()
+    resolver = DeploymentResolver(loader=dataforge.load)
+
+    async def run():
+        task = asyncio.create_task(resolver.resolve("dep-1"))
+        await asyncio.sleep(0)
+        resolver.on_undeploy("dep-1")
+        with pytest.raises(DeploymentNotFoundError):
+            await task
+
+    asyncio.run(run())
+    assert resolver.snapshot()["deployments"] == {}
@@ -0,0 +1,132 @@
+"""
+Tests for the micro-batched embedding service.
+"""
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embedding_service import EmbeddingService, HashingBackend, normalize_for_embedding  # noqa: E402
+
+
+class RecordingBackend(HashingBackend):
+    def __init__(self, fail=False):
+        super().__init__(dimension=32)
+        self.calls = []
+        self.fail = fail
+
+    async def embed_batch(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("provider down")
+        return await super().embed_batch(texts)
+
+
+def test_concurrent_calls_share_one_backend_batch():
+    backend = RecordingBackend()
+    service = EmbeddingService(backend, max_batch_size=64, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(service.embed(f"text number {i}") for i in range(10)))
+
+    vectors = asyncio.run(run())
+    assert len(backend.calls) == 1 and len(backend.calls[0]) == 10
+    assert all(v.dtype == np.float32 and v.shape == (32,) for v in vectors)
+    assert service.snapshot()["avg_batch_size"] == 10
+
+
+def test_full_batch_flushes_without_waiting():
+    backend = RecordingBackend()
+    service = EmbeddingService(backend, max_batch_size=4, max_wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(service.embed(f"t{i}") for i in range(8))), 1)
+
+    asyncio.run(run())
+    assert [len(c) for c in backend.calls] == [4, 4]
+
+
+def test_duplicates_dedupe_and_normalized_text_hits_cache():
+    backend = RecordingBackend()
+    service = EmbeddingService(backend, max_wait_ms=1)
+
+    async def run():
+        first = await service.embed_many(["the quick fox", "the quick fox", "lazy dog"])
+        again = await service.embed("  the   quick fox\n")
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert backend.calls == [["the quick fox", "lazy dog"]]
+    assert first.shape == (3, 32)
+    assert again is not None and np.array_equal(again, first[0])
+    assert service.cache_hits == 1
+    assert normalize_for_embedding(" a \t b ") == "a b"
+
+
+def test_vectors_are_read_only_and_cache_is_bounded():
+    service = EmbeddingService(RecordingBackend(), max_wait_ms=1, cache_size=2)
+
+    async def run():
+        return [await service.embed(t) for t in ("one", "two", "three")]
+
+    vectors = asyncio.run(run())
+    with pytest.raises(ValueError):
+        vectors[0][0] = 1.0
+    assert service.snapshot()["cache_entries"] == 2
+
+
+def test_backend_error_reaches_every_waiter_and_is_not_cached():
+    backend = RecordingBackend(fail=True)
+    service = EmbeddingService(backend, max_wait_ms=1)
+
+    async def run():
+        results = await asyncio.gather(service.embed("a"), service.embed("a"), return_exceptions=True)
+        backend.fail = False
+        return results, await service.embed("a")
+
+    results, vector = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert vector.shape == (32,)
+    assert len(backend.calls) == 2
+
+
+def test_backend_base_is_abstract():
+    from embedding_service import EmbeddingBackend
+
+    with pytest.raises(TypeError):
+        EmbeddingBackend()
+
+
+def test_provider_backend_sends_api_key(monkeypatch):
+    pytest.importorskip("httpx")
+    import contextlib
+
+    import provider_pool
+    from embedding_service import ProviderBackend
+
+    posted = {}
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": [{"index": 0, "embedding": [0.5, 0.5]}]}
+
+    class FakeClient:
+        async def post(self, path, json=None, headers=None):
+            posted.update(path=path, headers=headers)
+            return FakeResponse()
+
+    class FakeTransport:
+        @contextlib.asynccontextmanager
+        async def acquire(self, provider):
+            yield FakeClient()
+
+    monkeypatch.setattr(provider_pool, "provider_transport", FakeTransport())
+    backend = ProviderBackend("openai", "text-embedding-3-small", 2, api_key="sk-test")
+    matrix = asyncio.run(backend.embed_batch(["hi"]))
+    assert posted == {"path": "/embeddings", "headers": {"Authorization": "Bearer sk-test"}}
+    assert matrix.shape == (1, 2)
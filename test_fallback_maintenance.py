@@ -0,0 +1,130 @@
+"""
+Tests for RAG fallback store maintenance.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from fallback_maintenance import FallbackStoreMaintainer, decayed_freshness
+
+SCHEMA = """
+CREATE TABLE chunks (
+    chunk_id TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    embedding TEXT,
+    title TEXT,
+    source TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    freshness_score REAL DEFAULT 1.0,
+    PRIMARY KEY (chunk_id, project_id),
+    UNIQUE(chunk_id)
+);
+CREATE INDEX idx_chunks_project ON chunks(project_id);
+CREATE TABLE cache_stats (
+    project_id TEXT PRIMARY KEY,
+    chunk_count INTEGER DEFAULT 0,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    hits INTEGER DEFAULT 0,
+    misses INTEGER DEFAULT 0
+);
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "fallback.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    rows = [
+        (f"{project}-{i}", project, "x" * 1000, 1.0 - i / 100)
+        for project in ("alpha", "beta") for i in range(50)
+    ]
+    conn.executemany("INSERT INTO chunks (chunk_id, project_id, text, freshness_score) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _query(path, sql, *args):
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(sql, args).fetchall()
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def test_usage_is_buffered_until_flush(db_path):
+    maintainer = FallbackStoreMaintainer(db_path)
+    _query(db_path, "UPDATE chunks SET freshness_score = 0.5")
+    for _ in range(100):
+        maintainer.record_use("alpha", "alpha-49")
+        maintainer.record_lookup("alpha", hit=True)
+    maintainer.record_lookup("alpha", hit=False)
+
+    assert _query(db_path, "SELECT hits FROM cache_stats") == []
+    assert len(maintainer.usage) == 2  # coalesced
+
+    assert maintainer.flush_usage() == 2
+    assert _query(db_path, "SELECT hits, misses FROM cache_stats WHERE project_id = 'alpha'") == [(100, 1)]
+    assert _query(db_path, "SELECT freshness_score FROM chunks WHERE chunk_id = 'alpha-49'") == [(1.0,)]
+
+
+def test_freshness_decays_by_half_life_at_read_time(db_path):
+    maintainer = FallbackStoreMaintainer(db_path, half_life_days=10)
+    _query(db_path, "UPDATE chunks SET last_used_at = '2024-01-01 00:00:00'")
+    jan_11 = 1704931200  # 2024-01-11 00:00:00 UTC
+
+    freshness = maintainer.freshness("alpha", now=jan_11)
+    assert freshness["alpha-0"] == pytest.approx(0.5)
+    assert freshness["alpha-10"] == pytest.approx(0.45)
+    assert decayed_freshness(1.0, 20, half_life_days=10) == pytest.approx(0.25)
+    # Aging never rewrites rows
+    assert _query(db_path, "SELECT freshness_score FROM chunks WHERE chunk_id = 'alpha-0'") == [(1.0,)]
+
+
+def test_eviction_ranks_by_decayed_freshness(db_path):
+    maintainer = FallbackStoreMaintainer(db_path, project_budget_bytes=20 * 1024, half_life_days=10)
+    # alpha-0 has the best stored score but has not been used for a month
+    _query(db_path, "UPDATE chunks SET last_used_at = '2024-01-01 00:00:00' WHERE chunk_id = 'alpha-0'")
+    _query(db_path, "UPDATE chunks SET last_used_at = '2024-01-31 00:00:00' WHERE chunk_id != 'alpha-0'")
+
+    maintainer.evict_cold_chunks(now=1706659200)  # 2024-01-31 00:00:00 UTC
+    kept = {row[0] for row in _query(db_path, "SELECT chunk_id FROM chunks WHERE project_id = 'alpha'")}
+    assert "alpha-0" not in kept and "alpha-1" in kept
+
+
+def test_eviction_keeps_freshest_chunks_under_budget(db_path):
+    maintainer = FallbackStoreMaintainer(db_path, project_budget_bytes=20 * 1024)
+    maintainer.record_use("alpha", "alpha-49")  # least fresh, but just used
+    maintainer.flush_usage()
+
+    evicted = maintainer.evict_cold_chunks()
+    assert set(evicted) == {"alpha", "beta"}
+
+    kept = {row[0] for row in _query(db_path, "SELECT chunk_id FROM chunks WHERE project_id = 'alpha'")}
+    assert "alpha-49" in kept and "alpha-0" in kept and "alpha-48" not in kept
+    assert len(kept) == 20  # 20 KiB of ~1 KB chunks
+    assert _query(db_path, "SELECT chunk_count FROM cache_stats WHERE project_id = 'alpha'") == [(len(kept),)]
+
+
+def test_run_once_vacuums_after_eviction(db_path):
+    maintainer = FallbackStoreMaintainer(db_path, project_budget_bytes=5 * 1024)
+    size_before = os.path.getsize(db_path)
+    result = maintainer.run_once()
+
+    assert result["vacuumed"] is True
+    assert result["size_after"] < size_before
+    assert maintainer.snapshot()["last_run"] is result
+
+
+def test_run_once_reports_a_missing_store(tmp_path):
+    maintainer = FallbackStoreMaintainer(str(tmp_path / "missing.db"))
+    with pytest.raises(FileNotFoundError):
+        maintainer.run_once()
+    assert not os.path.exists(tmp_path / "missing.db")
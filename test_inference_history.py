@@ -0,0 +1,148 @@
+"""
+Tests for keyset pagination and streaming export of inference history.
+"""
+
+import asyncio
+import itertools
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from inference_history import (  # noqa: E402
+    HISTORY_COLUMNS,
+    KEYSET_INDEXES,
+    SUPERSEDED_INDEXES,
+    HistoryFilters,
+    _build_query,
+    decode_cursor,
+    encode_cursor,
+    ensure_keyset_indexes,
+    export_csv,
+    export_ndjson,
+    fetch_history_page,
+)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    path = tmp_path / "inferences.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE inferences (inference_id VARCHAR(36) PRIMARY KEY, domain TEXT, task_type TEXT,"
+        " context_pack_id TEXT, user_query TEXT, model_id TEXT, model_provider TEXT, output TEXT,"
+        " tokens_used INTEGER, evaluation_score FLOAT, evaluation_passed BOOLEAN, created_at DATETIME,"
+        " completed_at DATETIME, latency_ms INTEGER, status TEXT, error_message TEXT)"
+    )
+    rows = [
+        (f"inf-{i:03d}", "writing", "draft", "pack", f"query {i}",
+         "gpt-4" if i % 2 else "claude-3", "openai", f"out {i}",
+         10, 0.9, True, f"2025-11-{1 + i // 10:02d} 00:00:00", None, 100, "completed", None)
+        for i in range(45)
+    ]
+    conn.executemany("INSERT INTO inferences VALUES (" + ",".join("?" * 16) + ")", rows)
+    conn.execute("CREATE INDEX idx_model_created ON inferences (model_id, created_at)")
+    conn.execute("CREATE INDEX idx_status_created ON inferences (status, created_at)")
+    conn.execute("CREATE INDEX idx_domain_task_created ON inferences (domain, task_type, created_at)")
+    conn.commit()
+    conn.close()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2025-11-01 00:00:00", "inf-001")
+    assert decode_cursor(cursor) == ("2025-11-01 00:00:00", "inf-001")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+_FILTER_COMBINATIONS = [
+    combo
+    for size in range(5)
+    for combo in itertools.combinations(("model_id", "status", "domain", "task_type"), size)
+]
+
+
+@pytest.mark.parametrize("combo", _FILTER_COMBINATIONS, ids=lambda c: "+".join(c) or "none")
+@pytest.mark.parametrize("with_range", [False, True], ids=["all-time", "range"])
+@pytest.mark.parametrize("with_cursor", [False, True], ids=["first-page", "next-page"])
+def test_every_filter_combination_uses_a_keyset_index_without_sorting(db_url, combo, with_range, with_cursor):
+    conn = sqlite3.connect(db_url.split("///", 1)[1])
+    for name, columns in KEYSET_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON inferences {columns}")
+    for name in SUPERSEDED_INDEXES:
+        conn.execute(f"DROP INDEX {name}")
+
+    values = {name: "x" for name in combo}
+    if with_range:
+        values.update(since=datetime(2025, 11, 1), until=datetime(2025, 12, 1))
+    after = ("2025-11-03 00:00:00", "inf-020") if with_cursor else None
+    sql, params = _build_query(HISTORY_COLUMNS, HistoryFilters(**values), after, 50)
+    params = {k: v.isoformat(" ") if isinstance(v, datetime) else v for k, v in params.items()}
+    plan = " / ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    conn.close()
+
+    assert "TEMP B-TREE" not in plan
+    assert "USING INDEX idx_" in plan
+
+
+def test_keyset_pages_cover_every_row_once(db_url):
+    async def run():
+        engine = create_async_engine(db_url)
+        async with engine.begin() as conn:
+            await ensure_keyset_indexes(conn)
+            seen, cursor = [], None
+            while True:
+                items, cursor = await fetch_history_page(conn, limit=10, cursor=cursor)
+                seen.extend(item["inference_id"] for item in items)
+                if cursor is None:
+                    break
+            filtered, _ = await fetch_history_page(conn, HistoryFilters(model_id="gpt-4"), limit=100)
+        await engine.dispose()
+        return seen, filtered
+
+    seen, filtered = asyncio.run(run())
+    assert len(seen) == 45 and len(set(seen)) == 45
+    assert seen[0] == "inf-044"
+    assert len(filtered) == 22
+    assert all(item["model_id"] == "gpt-4" for item in filtered)
+
+
+def test_exports_stream_in_batches(db_url):
+    async def run():
+        engine = create_async_engine(db_url)
+        async with engine.connect() as conn:
+            ndjson = [chunk async for chunk in export_ndjson(conn, batch_size=20)]
+            csv_chunks = [chunk async for chunk in export_csv(conn, batch_size=20)]
+        await engine.dispose()
+        return ndjson, csv_chunks
+
+    ndjson, csv_chunks = asyncio.run(run())
+    assert len(ndjson) == 3
+    lines = "".join(ndjson).splitlines()
+    assert len(lines) == 45
+    assert json.loads(lines[-1])["inference_id"] == "inf-000"
+    assert csv_chunks[0].startswith("inference_id,")
+    assert "".join(csv_chunks).count("\n") == 46
+
+
+def test_superseded_indexes_are_dropped(db_url):
+    async def run():
+        engine = create_async_engine(db_url)
+        async with engine.begin() as conn:
+            await ensure_keyset_indexes(conn)
+            await ensure_keyset_indexes(conn)  # idempotent
+        await engine.dispose()
+
+    asyncio.run(run())
+    conn = sqlite3.connect(db_url.split("///", 1)[1])
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert set(KEYSET_INDEXES) <= names
+    assert names.isdisjoint(SUPERSEDED_INDEXES)
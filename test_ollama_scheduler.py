@@ -0,0 +1,96 @@
+"""
+Tests for the Ollama scheduler's batching and residency ordering.
+"""
+
+import asyncio
+
+from ollama_scheduler import OllamaScheduler, ResidencyBudget
+
+
+class FakeOllama:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, endpoint, payload):
+        self.calls.append((payload["model"], payload.get("keep_alive")))
+        await asyncio.sleep(0.001)
+        return {"model": payload["model"], "response": "ok"}
+
+
+def test_drains_resident_model_before_switching():
+    fake = FakeOllama()
+    scheduler = OllamaScheduler(call=fake, budget=ResidencyBudget(max_models=1), batch_size=2)
+
+    async def run():
+        # Interleaved arrivals for two models
+        tasks = [
+            asyncio.create_task(scheduler.submit(model, {"prompt": "hi"}))
+            for model in ["llama3", "mistral", "llama3", "mistral", "llama3"]
+        ]
+        results = await asyncio.gather(*tasks)
+        await scheduler.close()
+        return results
+
+    results = asyncio.run(run())
+    assert [r["model"] for r in results] == ["llama3", "mistral", "llama3", "mistral", "llama3"]
+
+    served = [model for model, keep_alive in fake.calls if keep_alive != 0]
+    assert served == ["llama3", "llama3", "llama3", "mistral", "mistral"]
+    assert scheduler.swap_count == 1
+    assert ("llama3", 0) in fake.calls  # evicted with keep_alive=0
+
+
+def test_memory_budget_allows_multiple_residents():
+    budget = ResidencyBudget(max_models=3, max_bytes=10, model_sizes={"a": 4, "b": 4, "c": 4})
+    assert budget.fits(["a", "b"])
+    assert not budget.fits(["a", "b", "c"])
+
+
+def test_spill_when_queue_is_long():
+    scheduler = OllamaScheduler(call=FakeOllama(), spill_queue_depth=4)
+    scheduler.resident["llama3"] = 0.0
+    scheduler.queues["llama3"] = [object()] * 3
+    assert not scheduler.should_spill("llama3")
+    assert scheduler.should_spill("mistral")
+
+
+def test_requests_are_not_streamed():
+    seen = []
+
+    async def call(endpoint, payload):
+        seen.append(payload)
+        return {"model": payload["model"]}
+
+    scheduler = OllamaScheduler(call=call)
+
+    async def run():
+        await scheduler.submit("llama3", {"prompt": "hi", "stream": True})
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert seen[0]["stream"] is False
+
+
+def test_memory_budget_uses_sizes_reported_by_ollama():
+    fake = FakeOllama()
+
+    async def fetch(endpoint):
+        if endpoint == "/api/ps":
+            return {"models": [{"name": "small:latest", "size": 3}]}
+        return {"models": [{"name": "small:latest", "size": 2}, {"name": "big:latest", "size": 8}]}
+
+    scheduler = OllamaScheduler(
+        call=fake, fetch=fetch, budget=ResidencyBudget(max_models=3, max_bytes=10), batch_size=1
+    )
+
+    async def run():
+        for model in ("small", "big"):
+            await scheduler.submit(model, {"prompt": "hi"})
+        await scheduler.close()
+
+    asyncio.run(run())
+    # /api/ps (loaded) wins over /api/tags (on disk)
+    assert scheduler.budget.model_sizes["small"] == 3
+    assert scheduler.budget.model_sizes["big"] == 8
+    assert list(scheduler.resident) == ["big"]
+    assert ("small", 0) in fake.calls
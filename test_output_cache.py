@@ -0,0 +1,120 @@
+"""
+Tests for the exact-match output cache tier.
+"""
+
+import os
+import subprocess
+import sys
+
+from output_cache import Compressor, ExactOutputCache, request_key
+from shared_cache import SharedCache, SharedCacheStore
+
+_REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _request(prompt, **overrides):
+    return {"model": "gpt-4", "prompt": prompt, "temperature": 0, **overrides}
+
+
+def test_canonical_key_ignores_order_and_volatile_fields():
+    a = {"prompt": "hi", "model": "gpt-4", "temperature": 0.0, "request_id": "r1"}
+    b = {"temperature": 0, "model": "gpt-4", "prompt": "hi", "request_id": "r2", "stream": True}
+    assert request_key(a, "v1") == request_key(b, "v1")
+    assert request_key(a, "v1") != request_key(a, "v2")
+    assert request_key(a, "v1") != request_key({**a, "prompt": "hello"}, "v1")
+
+
+def test_volatile_names_inside_the_request_body_stay_in_the_key():
+    def request(user_id):
+        return {
+            "model": "gpt-4", "temperature": 0, "user_id": "caller",
+            "messages": [{"role": "user", "content": "show my orders"}],
+            "tools": [{"name": "lookup_orders", "arguments": {"user_id": user_id}}],
+        }
+
+    assert request_key(request("alice"), "v1") != request_key(request("bob"), "v1")
+    assert request_key(request("alice"), "v1") == request_key({**request("alice"), "user_id": "other"}, "v1")
+
+
+def test_only_deterministic_requests_are_cached():
+    cache = ExactOutputCache(max_bytes=1 << 20)
+    assert cache.store(_request("x", temperature=0.7), {"text": "y"}) is False
+    assert cache.store(_request("x"), {"text": "y"}, prompt_version="v1") is True
+
+    assert cache.lookup(_request("x"), prompt_version="v1") == {"text": "y"}
+    assert cache.lookup(_request("x"), prompt_version="v2") is None
+    assert cache.snapshot()["hits"] == 1
+
+
+def test_outputs_round_trip_compressed():
+    cache = ExactOutputCache(max_bytes=1 << 20, compressor=Compressor(codec="gzip"))
+    output = {"text": "lorem ipsum " * 500}
+    cache.store(_request("long"), output, cost=0.01)
+
+    stats = cache.snapshot()
+    assert stats["compression_ratio"] > 5
+    assert cache.lookup(_request("long")) == output
+    assert cache.bytes_saved == len('{"text":"' + "lorem ipsum " * 500 + '"}')
+
+
+def test_eviction_is_bounded_by_bytes_and_keeps_costly_entries():
+    compressor = Compressor(codec="none")
+    cache = ExactOutputCache(max_bytes=3000, compressor=compressor)
+
+    cache.put("expensive", "e" * 900, cost=1.0)
+    cache.put("cheap-1", "c" * 900, cost=0.001)
+    cache.put("cheap-2", "d" * 900, cost=0.001)
+    cache.put("new", "n" * 900, cost=0.01)
+
+    assert cache.stored_bytes <= 3000
+    assert cache.get("expensive") == "e" * 900
+    assert cache.get("cheap-1") is None  # lowest cost per byte went first
+    assert cache.evictions == 1
+
+
+def test_frequently_hit_entries_outlive_one_off_entries():
+    cache = ExactOutputCache(max_bytes=2000, compressor=Compressor(codec="none"))
+    cache.put("hot", "h" * 900, cost=0.01)
+    for _ in range(5):
+        cache.get("hot")
+    cache.put("cold", "c" * 900, cost=0.01)
+    cache.put("newer", "n" * 900, cost=0.01)
+
+    assert cache.get("hot") is not None
+    assert cache.get("cold") is None
+
+
+def test_workers_reuse_outputs_through_the_shared_tier(tmp_path):
+    store = SharedCacheStore(str(tmp_path / "shared.db"))
+    worker_a = ExactOutputCache(shared=SharedCache(store, "output"))
+    worker_b = ExactOutputCache(shared=SharedCache(store, "output"))
+    request = _request("Summarize the report")
+
+    worker_a.store(request, {"text": "summary"}, cost=0.02)
+    assert worker_b.lookup(request) == {"text": "summary"}
+    assert worker_b.shared_hits == 1
+    assert worker_b.hits == 1 and worker_b.snapshot()["entries"] == 1
+
+    worker_b.invalidate(request_key(request))
+    assert worker_a.shared.get_bytes(request_key(request)) is None
+
+
+def test_shared_tier_is_opened_at_startup_not_import(tmp_path):
+    path = tmp_path / "cache.db"
+    env = {**os.environ, "OUTPUT_CACHE_SHARED": "true", "SHARED_CACHE_PATH": str(path)}
+    script = (
+        "import os, sys, output_cache\n"
+        "assert not os.path.exists(sys.argv[1])\n"
+        "assert output_cache.init_shared_output_cache()\n"
+        "assert os.path.exists(sys.argv[1])\n"
+    )
+    subprocess.run([sys.executable, "-c", script, str(path)], env=env, cwd=_REPO, check=True)
+
+
+def test_auto_mode_treats_unset_web_concurrency_as_one_worker():
+    env = {k: v for k, v in os.environ.items() if k not in ("WEB_CONCURRENCY", "OUTPUT_CACHE_SHARED")}
+    script = "from config import config; print(config.output_cache_shared)"
+    single = subprocess.run([sys.executable, "-c", script], env=env, cwd=_REPO, capture_output=True, text=True, check=True)
+    multi = subprocess.run([sys.executable, "-c", script], env={**env, "WEB_CONCURRENCY": "4"}, cwd=_REPO,
+                           capture_output=True, text=True, check=True)
+    assert (single.stdout.strip(), multi.stdout.strip()) == ("False", "True")
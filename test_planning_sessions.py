@@ -0,0 +1,141 @@
+"""
+Tests for resumable, checkpointed planning sessions.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from planning_sessions import (
+    PlanningSessionManager,
+    SessionCheckpointStore,
+    SessionConflictError,
+    parse_last_event_id,
+)
+
+STAGES = ["initial", "review", "refinement", "final"]
+REQUEST = {"task_description": "Add auth", "task_type": "feature", "complexity": "medium"}
+
+
+class FakeExecutor:
+    """Four stages, three streamed tokens each; records which stages actually ran."""
+
+    def __init__(self, delay=0.0):
+        self.ran = []
+        self.delay = delay
+
+    async def __call__(self, request, checkpoints):
+        for stage in STAGES:
+            if stage in checkpoints:
+                continue
+            self.ran.append(stage)
+            yield "stage_start", {"stage": stage}
+            for i in range(3):
+                await asyncio.sleep(self.delay)
+                yield "token", {"stage": stage, "text": f"{stage}-{i} "}
+            yield "stage_complete", {"stage": stage, "result": f"{stage} plan"}
+
+
+def _manager(tmp_path, runner, **kwargs):
+    store = SessionCheckpointStore(str(tmp_path / "sessions.db"))
+    return PlanningSessionManager(store, runner, flush_interval_seconds=0.01, heartbeat_seconds=1, **kwargs)
+
+
+def _parse(frames):
+    events = []
+    for frame in frames:
+        if frame.startswith(":"):
+            continue
+        fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def _collect(manager, session_id, after=0, limit=None):
+    frames = []
+    async for frame in manager.stream(session_id, after):
+        frames.append(frame)
+        if limit is not None and len(frames) >= limit:
+            break
+    return _parse(frames)
+
+
+def test_reconnect_with_last_event_id_gets_the_rest_without_recomputing(tmp_path):
+    executor = FakeExecutor(delay=0.005)
+    manager = _manager(tmp_path, executor)
+
+    async def run():
+        session_id = await manager.open(REQUEST, "s1")
+        first = await _collect(manager, session_id, limit=5)  # client drops here
+        await asyncio.sleep(0.03)  # generation continues without a client
+        assert await manager.open(REQUEST, "s1") == "s1"  # re-POST attaches
+        rest = await _collect(manager, session_id, after=first[-1][0])
+        return first, rest
+
+    first, rest = asyncio.run(run())
+    ids = [e[0] for e in first + rest]
+    assert ids == list(range(1, len(ids) + 1))
+    assert rest[-1][1] == "session_complete"
+    assert executor.ran == STAGES
+    assert manager.snapshot()["attached"] == 1
+
+
+def test_completed_session_is_replayed_from_the_store(tmp_path):
+    async def run():
+        manager = _manager(tmp_path, FakeExecutor())
+        await manager.open(REQUEST, "s1")
+        live = await _collect(manager, "s1")
+
+        executor = FakeExecutor()
+        fresh = _manager(tmp_path, executor)  # another worker, or after a restart
+        assert await fresh.open(REQUEST, "s1") == "s1"
+        replayed = await _collect(fresh, "s1", after=10)
+        described = await fresh.describe("s1")
+        return live, replayed, executor, described
+
+    live, replayed, executor, described = asyncio.run(run())
+    assert replayed == live[10:]
+    assert executor.ran == []
+    assert described["status"] == "completed"
+    assert described["checkpoints"] == {stage: f"{stage} plan" for stage in STAGES}
+
+
+def test_interrupted_session_resumes_from_checkpoints(tmp_path):
+    async def run():
+        first = FakeExecutor(delay=0.01)
+        manager = _manager(tmp_path, first)
+        await manager.open(REQUEST, "s1")
+        await asyncio.sleep(0.08)  # a couple of stages in
+        await manager.close()  # shutdown: checkpoint and interrupt
+
+        second = FakeExecutor()
+        restarted = _manager(tmp_path, second)
+        events = await _collect(restarted, "s1")  # reconnect resumes the session
+        return first.ran, second.ran, events
+
+    first_ran, second_ran, events = asyncio.run(run())
+    completed_before = [s for s in first_ran if s not in second_ran]
+    assert completed_before and first_ran[-1] in second_ran  # the cut stage runs again
+    assert second_ran == STAGES[len(completed_before):]
+    resumed = [data for _, name, data in events if name == "resumed"]
+    assert resumed == [{"completed_stages": completed_before}]
+    assert events[-1][1] == "session_complete"
+
+
+def test_session_id_reuse_for_another_request_is_rejected(tmp_path):
+    manager = _manager(tmp_path, FakeExecutor())
+
+    async def run():
+        await manager.open(REQUEST, "s1")
+        await _collect(manager, "s1")
+        with pytest.raises(SessionConflictError):
+            await manager.open({**REQUEST, "complexity": "high"}, "s1")
+
+    asyncio.run(run())
+
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("42") == 42
+    assert parse_last_event_id(None) == 0
+    assert parse_last_event_id("garbage") == 0
@@ -0,0 +1,191 @@
+"""
+Tests for prompt-cache-aware assembly and cached-token accounting.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from prompt_cache import (  # noqa: E402
+    PromptCacheLedger,
+    PromptSegment,
+    assemble_prompt,
+    ensure_prompt_cache_schema,
+    extract_cache_usage,
+    fetch_model_cache_totals,
+    fetch_reuse_report,
+)
+
+SYSTEM = "You are a careful literary editor. " * 200  # ~1700 tokens
+CONTEXT = "Context pack: style guide and character bible. " * 150
+
+
+def _segments(question, today="Today is Tuesday."):
+    # Deliberately out of order: volatile input first
+    segments = [
+        PromptSegment(question, kind="input"),
+        PromptSegment(CONTEXT, kind="context", stable=True),
+        PromptSegment(SYSTEM, kind="system", stable=True, role="system"),
+    ]
+    if today:
+        segments.append(PromptSegment(today, kind="adapter", role="system"))
+    return segments
+
+
+def test_anthropic_assembly_is_stable_first_with_breakpoints():
+    first = assemble_prompt(_segments("Edit chapter 1", today=None), "anthropic", "claude-3-5-sonnet")
+    second = assemble_prompt(_segments("Edit chapter 2", today=None), "anthropic", "claude-3-5-sonnet")
+
+    assert first.prefix_hash == second.prefix_hash
+    assert first.breakpoints == 2
+    assert first.system == [{"type": "text", "text": SYSTEM, "cache_control": {"type": "ephemeral"}}]
+    content = first.messages[0]["content"]
+    assert content[0]["text"] == CONTEXT and "cache_control" in content[0]
+    assert content[-1] == {"type": "text", "text": "Edit chapter 1"}
+    assert first.payload()["system"] is first.system
+
+
+def test_volatile_system_text_ends_the_cacheable_prefix():
+    tuesday = assemble_prompt(_segments("Edit chapter 1"), "anthropic", "claude-3-5-sonnet")
+    wednesday = assemble_prompt(_segments("Edit chapter 1", "Today is Wednesday."), "anthropic", "claude-3-5-sonnet")
+
+    # Only the stable system part is cached; a breakpoint on the user context
+    # would cover the changing date and be rewritten on every request
+    assert tuesday.breakpoints == 1
+    assert tuesday.system[0]["cache_control"] == {"type": "ephemeral"}
+    assert tuesday.system[1] == {"type": "text", "text": "Today is Tuesday."}
+    assert all("cache_control" not in block for block in tuesday.messages[0]["content"])
+
+    assert tuesday.prefix_hash == wednesday.prefix_hash
+    assert tuesday.prefix_hash != assemble_prompt(_segments("x", today=None), "anthropic").prefix_hash
+    assert tuesday.stable_tokens < assemble_prompt(_segments("x", today=None), "anthropic").stable_tokens
+
+
+def test_short_prefixes_get_no_breakpoint_and_openai_is_plain_messages():
+    short = [PromptSegment("Be brief.", kind="system", stable=True, role="system"), PromptSegment("Hi")]
+    assert assemble_prompt(short, "anthropic", "claude-3-haiku").breakpoints == 0
+
+    assembled = assemble_prompt(_segments("Edit chapter 1"), "openai", "gpt-4o")
+    messages = assembled.payload()["messages"]
+    assert messages[0] == {"role": "system", "content": SYSTEM + "\n\nToday is Tuesday."}
+    assert messages[1]["content"].startswith(CONTEXT) and messages[1]["content"].endswith("Edit chapter 1")
+
+
+def test_extract_cache_usage_per_provider():
+    anthropic = extract_cache_usage("anthropic", {
+        "input_tokens": 50, "cache_read_input_tokens": 1800, "cache_creation_input_tokens": 0,
+    })
+    assert (anthropic.input_tokens, anthropic.cached_tokens, anthropic.uncached_tokens) == (1850, 1800, 50)
+
+    openai = extract_cache_usage("openai", {"prompt_tokens": 2000, "prompt_tokens_details": {"cached_tokens": 1920}})
+    assert (openai.input_tokens, openai.cached_tokens) == (2000, 1920)
+    assert extract_cache_usage("ollama", {"prompt_eval_count": 300}).cached_tokens == 0
+
+
+def test_ledger_persists_usage_and_reports_reuse_and_model_totals(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    path = tmp_path / "neuroforge.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE model_metrics (metric_id TEXT PRIMARY KEY, model_id TEXT, model_provider TEXT)")
+    # Several metric rows for one model must not multiply the totals
+    conn.execute("INSERT INTO model_metrics VALUES ('m1', 'claude-3-5-sonnet', 'anthropic')")
+    conn.execute("INSERT INTO model_metrics VALUES ('m2', 'claude-3-5-sonnet', 'anthropic')")
+    conn.commit()
+    conn.close()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as db:
+            await ensure_prompt_cache_schema(db)
+            await ensure_prompt_cache_schema(db)  # idempotent
+
+        ledger = PromptCacheLedger()
+        assembled = assemble_prompt(_segments("q"), "anthropic", "claude-3-5-sonnet")
+        ledger.record_response(assembled, "claude-3-5-sonnet", {
+            "input_tokens": 100, "cache_creation_input_tokens": 1900}, "prompt-1", "v1")
+        for _ in range(3):
+            ledger.record_response(assembled, "claude-3-5-sonnet", {
+                "input_tokens": 100, "cache_read_input_tokens": 1900}, "prompt-1", "v1")
+        assert await ledger.flush(engine) == 1
+
+        async with engine.connect() as db:
+            report = await fetch_reuse_report(db)
+            totals = await fetch_model_cache_totals(db)
+        await engine.dispose()
+        return report, totals
+
+    (row,), (model,) = asyncio.run(run())
+    assert row["prompt_id"] == "prompt-1" and row["requests"] == 4
+    assert row["reuse_ratio"] == pytest.approx(5700 / 8000)
+    assert row["distinct_prefixes"] == 1
+
+    assert (model["model_id"], model["model_provider"]) == ("claude-3-5-sonnet", "anthropic")
+    assert (model["cached_input_tokens"], model["total_input_tokens"]) == (5700, 8000)
+
+    conn = sqlite3.connect(path)
+    columns = [c[1] for c in conn.execute("PRAGMA table_info(model_metrics)")]
+    conn.close()
+    assert columns == ["metric_id", "model_id", "model_provider"]
+
+
+def test_same_model_on_two_providers_is_kept_apart(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'neuroforge.db'}")
+        async with engine.begin() as db:
+            await ensure_prompt_cache_schema(db)
+
+        ledger = PromptCacheLedger()
+        ledger.record("groq", "llama3-70b", extract_cache_usage("groq", {
+            "prompt_tokens": 1000, "prompt_tokens_details": {"cached_tokens": 800}}), "prompt-1", "v1")
+        ledger.record("ollama", "llama3-70b", extract_cache_usage("ollama", {"prompt_eval_count": 300}),
+                      "prompt-1", "v1")
+        assert await ledger.flush(engine) == 2
+
+        async with engine.connect() as db:
+            totals = await fetch_model_cache_totals(db)
+        await engine.dispose()
+        return totals
+
+    groq, ollama = asyncio.run(run())
+    assert (groq["model_provider"], groq["requests"], groq["total_input_tokens"]) == ("groq", 1, 1000)
+    assert (ollama["model_provider"], ollama["requests"], ollama["total_input_tokens"]) == ("ollama", 1, 300)
+
+
+def test_usage_table_without_provider_in_key_is_rebuilt(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    path = tmp_path / "neuroforge.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE prompt_cache_usage (prompt_id VARCHAR(64) NOT NULL, prompt_version VARCHAR(64) NOT NULL, "
+        "model_id VARCHAR(256) NOT NULL, model_provider VARCHAR(50) NOT NULL, prefix_hash VARCHAR(64) NOT NULL, "
+        "requests INTEGER NOT NULL DEFAULT 0, input_tokens INTEGER NOT NULL DEFAULT 0, "
+        "cached_tokens INTEGER NOT NULL DEFAULT 0, cache_write_tokens INTEGER NOT NULL DEFAULT 0, "
+        "last_updated DATETIME, PRIMARY KEY (prompt_id, prompt_version, model_id, prefix_hash))"
+    )
+    conn.execute("INSERT INTO prompt_cache_usage VALUES ('p', 'v1', 'm', 'groq', 'h', 2, 100, 50, 0, NULL)")
+    conn.commit()
+    conn.close()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as db:
+            await ensure_prompt_cache_schema(db)
+        await engine.dispose()
+
+    asyncio.run(run())
+    conn = sqlite3.connect(path)
+    pk = [c[1] for c in sorted(conn.execute("PRAGMA table_info(prompt_cache_usage)"), key=lambda c: c[5]) if c[5]]
+    rows = conn.execute("SELECT model_provider, requests FROM prompt_cache_usage").fetchall()
+    conn.close()
+    assert pk == ["prompt_id", "prompt_version", "model_id", "model_provider", "prefix_hash"]
+    assert rows == [("groq", 2)]
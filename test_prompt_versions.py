@@ -0,0 +1,125 @@
+"""
+Tests for the delta-encoded prompt version store.
+"""
+
+import sqlite3
+
+import pytest
+
+from prompt_versions import PromptVersionNotFoundError, PromptVersionStore, apply_delta, encode_delta
+
+BASE = "\n".join(f"Rule {i}: keep the narrator's voice consistent." for i in range(60)) + "\n"
+
+
+def _content(i):
+    lines = BASE.splitlines(keepends=True)
+    lines[i % 60] = f"Rule {i % 60}: revised in edit {i}.\n"
+    return {
+        "name": "Character Creator",
+        "base_prompt": "".join(lines),
+        "context_refs": [{"id": "ctx_1", "label": "Background"}],
+        "models": ["gpt-4", "claude-3-5-sonnet"] if i % 2 else ["gpt-4"],
+    }
+
+
+def _store(tmp_path, **kwargs):
+    return PromptVersionStore(str(tmp_path / "versions.db"), **kwargs)
+
+
+def test_delta_round_trip():
+    old, new = _content(1), _content(2)
+    new["temperature"] = 0.4
+    del new["context_refs"]
+    delta = encode_delta(old, new)
+    assert set(delta) == {"text", "set", "unset"}
+    assert apply_delta(old, delta) == new
+
+
+def test_periodic_snapshots_and_bounded_replay(tmp_path):
+    store = _store(tmp_path, snapshot_interval=10, cache_size=0)
+    for i in range(1, 36):
+        store.add_version("p1", _content(i))
+
+    kinds = {v.version: v.kind for v in store.list_versions("p1", limit=100)}
+    assert [v for v, k in sorted(kinds.items()) if k == "snapshot"] == [1, 11, 21, 31]
+
+    for version in (1, 10, 20, 35):
+        before = store.deltas_replayed
+        assert store.materialize("p1", version) == _content(version)
+        assert store.deltas_replayed - before <= 9
+
+    stats = store.storage_stats("p1")
+    assert stats["versions"] == 35 and stats["snapshots"] == 4
+    assert stats["stored_bytes"] * 3 < stats["full_copy_bytes"]
+
+
+def test_lru_shortcuts_replay_and_returns_copies(tmp_path):
+    store = _store(tmp_path, snapshot_interval=50)
+    for i in range(1, 21):
+        store.add_version("p1", _content(i))
+    fresh = _store(tmp_path, snapshot_interval=50)
+
+    fresh.materialize("p1", 15)
+    replayed = fresh.deltas_replayed
+    assert fresh.materialize("p1", 17) == _content(17)
+    assert fresh.deltas_replayed - replayed == 2  # continued from cached v15, not from v1
+
+    content = fresh.materialize("p1", 17)
+    content["models"].append("mutated")
+    assert fresh.materialize("p1", 17) == _content(17)
+
+
+def test_unchanged_content_is_not_a_new_version_and_rollback(tmp_path):
+    store = _store(tmp_path)
+    first = store.add_version("p1", _content(1), author="alice")
+    assert store.add_version("p1", _content(1)).version == first.version
+    store.add_version("p1", _content(2))
+
+    rolled = store.rollback("p1", 1, author="bob")
+    assert rolled.version == 3 and rolled.message == "Rollback to version 1"
+    assert store.materialize("p1", 3) == _content(1)
+
+
+def test_diff_between_arbitrary_versions(tmp_path):
+    store = _store(tmp_path, snapshot_interval=5)
+    for i in range(1, 13):
+        store.add_version("p1", _content(i))
+
+    diff = store.diff("p1", 2, 11)
+    assert set(diff["changes"]) == {"base_prompt", "models"}
+    unified = diff["changes"]["base_prompt"]["unified_diff"]
+    assert "-Rule 2: revised in edit 2." in unified and "+Rule 11: revised in edit 11." in unified
+    assert diff["changes"]["models"] == {"before": ["gpt-4"], "after": ["gpt-4", "claude-3-5-sonnet"]}
+
+    with pytest.raises(PromptVersionNotFoundError):
+        store.materialize("p1", 99)
+
+
+def test_large_rewrite_is_stored_as_snapshot(tmp_path):
+    store = _store(tmp_path, snapshot_interval=100)
+    store.add_version("p1", _content(1))
+    store.add_version("p1", _content(2))
+    rewritten = dict(_content(3), base_prompt="Entirely new instructions.\n" * 80)
+    info = store.add_version("p1", rewritten)
+    assert info.kind == "snapshot"
+
+    conn = sqlite3.connect(tmp_path / "versions.db")
+    kinds = [k for (k,) in conn.execute("SELECT kind FROM prompt_versions ORDER BY version")]
+    conn.close()
+    assert kinds == ["snapshot", "delta", "snapshot"]
+
+
+def test_concurrent_reads_share_a_small_cache(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = _store(tmp_path, snapshot_interval=5, cache_size=2)
+    for i in range(1, 11):
+        store.add_version("p1", _content(i))
+
+    def read(n):
+        version = n % 10 + 1
+        return store.materialize("p1", version) == _content(version)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(read, range(400)))
+    assert store.storage_stats("p1")["cache_entries"] <= 2
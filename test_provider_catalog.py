@@ -0,0 +1,112 @@
+"""
+Tests for the background provider health and model catalog.
+"""
+
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from provider_catalog import ProviderCatalog, etag_matches  # noqa: E402
+from provider_pool import ProviderPoolConfig, ProviderTransport  # noqa: E402
+
+MODELS = {"openai": [("gpt-4", 8192)], "ollama": []}
+
+
+def _catalog(handler, credentials=None, timeout=1.0):
+    transport = ProviderTransport([
+        ProviderPoolConfig("openai", "http://openai.test", 4, "/models"),
+        ProviderPoolConfig("ollama", "http://ollama.test", 2, "/api/tags", http2=False),
+    ])
+    mock = httpx.MockTransport(handler)
+    for name, pool in transport.configs.items():
+        transport._clients[name] = httpx.AsyncClient(base_url=pool.base_url, transport=mock)
+    return ProviderCatalog(transport, models=MODELS, timeout_seconds=timeout,
+                           credentials=credentials or {"openai": True, "ollama": True})
+
+
+def _ok(request):
+    if request.url.path == "/api/tags":
+        return httpx.Response(200, json={"models": [{"name": "llama3:8b"}]})
+    return httpx.Response(401)  # no credentials on probes; still reachable
+
+
+def test_probe_builds_snapshot_with_discovered_models():
+    catalog = _catalog(_ok)
+    asyncio.run(catalog.refresh())
+    payload = catalog.snapshot.payload()
+    models = {m["id"]: m for m in payload["models"]}
+    assert models["gpt-4"] == {"id": "gpt-4", "provider": "openai", "status": "available",
+                               "context_window": 8192, "is_champion": False}
+    assert models["llama3:8b"]["provider"] == "ollama"
+    assert payload["providers"] == {"openai": {"status": "available"}, "ollama": {"status": "available"}}
+
+
+def test_etag_only_changes_when_content_changes():
+    catalog = _catalog(_ok)
+
+    async def run():
+        await catalog.refresh()
+        first = catalog.snapshot
+        await catalog.refresh()
+        return first, catalog.snapshot
+
+    first, second = asyncio.run(run())
+    assert first is second
+    catalog.set_champion("openai", "gpt-4")
+    assert catalog.snapshot.etag != first.etag
+    assert catalog.snapshot.payload()["models"][0]["is_champion"] is True
+
+
+def test_circuit_transitions_update_immediately():
+    catalog = _catalog(_ok)
+    catalog.on_circuit_state("openai", "open")
+    assert catalog.snapshot.payload()["providers"]["openai"]["status"] == "unavailable"
+    catalog.on_circuit_state("openai", "half_open")
+    assert catalog.snapshot.payload()["providers"]["openai"]["status"] == "degraded"
+
+
+def test_slow_or_failing_provider_is_marked_unavailable():
+    async def handler(request):
+        if request.url.path == "/models":
+            await asyncio.sleep(1)
+        return httpx.Response(500)
+
+    catalog = _catalog(handler, credentials={"openai": True, "ollama": True}, timeout=0.05)
+    results = asyncio.run(catalog.refresh())
+    assert results == {"openai": False, "ollama": False}
+    detail = catalog.status_detail()["providers"]
+    assert detail["openai"]["last_error"].startswith("timeout")
+    assert detail["ollama"]["last_error"] == "HTTP 500"
+
+
+def test_missing_api_key_is_unavailable_without_probing():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        return _ok(request)
+
+    catalog = _catalog(handler, credentials={"openai": False, "ollama": True})
+    assert catalog.snapshot.payload()["providers"]["openai"]["status"] == "unavailable"
+    asyncio.run(catalog.refresh())
+    assert calls == ["ollama.test"]
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False), ('"abc"', True), ('W/"abc"', True), ('"x", "abc"', True), ("*", True), ('"x"', False),
+])
+def test_etag_matching(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_recovered_circuit_rewarms_the_pool():
+    catalog = _catalog(_ok)
+    warmed = []
+    catalog.transport.warm_in_background = warmed.append
+    catalog.on_circuit_state("openai", "open")
+    catalog.on_circuit_state("openai", "half_open")
+    assert warmed == []
+    catalog.on_circuit_state("openai", "closed")
+    assert warmed == ["openai"]
@@ -0,0 +1,96 @@
+"""
+Tests for the shared provider transport against a local stub server.
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from provider_pool import ProviderPoolConfig, ProviderTransport  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"models": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_warm_and_saturation(stub_url):
+    transport = ProviderTransport([
+        ProviderPoolConfig("stub", stub_url, max_concurrency=1, warmup_path="/api/tags", http2=False)
+    ])
+
+    async def call():
+        async with transport.acquire("stub") as client:
+            response = await client.get("/api/tags")
+            await asyncio.sleep(0.01)
+            return response.status_code
+
+    async def run():
+        assert await transport.warm("stub")
+        codes = await asyncio.gather(call(), call(), call())
+        await transport.close()
+        return codes
+
+    assert asyncio.run(run()) == [200, 200, 200]
+    snapshot = transport.snapshot()["stub"]
+    assert snapshot["requests_total"] == 3
+    assert snapshot["saturated_total"] >= 1
+    assert snapshot["in_flight"] == 0
+    assert snapshot["last_warmed_at"] is not None
+
+
+def test_unknown_provider_rejected():
+    transport = ProviderTransport([])
+    with pytest.raises(ValueError):
+        transport.client("missing")
+
+
+def test_keepalive_comes_from_config(monkeypatch):
+    from config import config
+    from provider_pool import default_pool_configs
+
+    monkeypatch.setattr(config, "provider_keepalive_seconds", 30.0)
+    assert {pool.keepalive_seconds for pool in default_pool_configs()} == {30.0}
+
+
+def test_close_cancels_background_warmup():
+    transport = ProviderTransport([ProviderPoolConfig("slow", "http://slow.test", 1)])
+    started = asyncio.Event()
+
+    async def slow_warm(*args):
+        started.set()
+        await asyncio.sleep(60)
+
+    transport.warm = slow_warm
+
+    async def run():
+        assert transport.warm_in_background("slow") is not None
+        await started.wait()
+        await transport.close()
+        return transport._warm_tasks
+
+    assert asyncio.run(run()) == set()
+    assert transport.warm_in_background() is None  # no running loop
@@ -0,0 +1,74 @@
+"""
+Tests for sliding-window provider statistics and latency/cost routing.
+"""
+
+from provider_stats import (
+    LatencyCostStrategy,
+    ProviderStatsRegistry,
+    RouteCandidate,
+    SlidingLatencySketch,
+)
+
+
+def test_sketch_quantiles_and_window_expiry():
+    sketch = SlidingLatencySketch(window_seconds=100, slots=10)
+    for i in range(100):
+        sketch.record(100.0 if i < 90 else 1000.0, now=1000.0)
+
+    p50 = sketch.quantile(0.5, now=1000.0)
+    p95 = sketch.quantile(0.95, now=1000.0)
+    assert 90 <= p50 <= 130
+    assert 900 <= p95 <= 1300
+
+    # Samples fall out once the window has slid past them
+    assert sketch.quantile(0.5, now=1200.0) is None
+
+
+def test_strategy_prefers_fast_provider_within_quality_floor():
+    registry = ProviderStatsRegistry()
+    for _ in range(20):
+        registry.record("openai", "gpt-4", 3000.0, True, cost_usd=0.03)
+        registry.record("anthropic", "claude-3-sonnet", 800.0, True, cost_usd=0.01)
+        registry.record("ollama", "llama3", 200.0, True, cost_usd=0.0)
+
+    strategy = LatencyCostStrategy(registry, quality_floor=0.95, explore_rate=0.0)
+    candidates = [
+        RouteCandidate("openai", "gpt-4", quality_score=0.90, is_champion=True),
+        RouteCandidate("anthropic", "claude-3-sonnet", quality_score=0.88),
+        RouteCandidate("ollama", "llama3", quality_score=0.70),  # below the floor
+    ]
+    assert strategy.choose(candidates).model == "claude-3-sonnet"
+
+
+def test_error_rate_opens_circuit_and_excludes_candidate():
+    registry = ProviderStatsRegistry()
+    for _ in range(20):
+        registry.record("groq", "llama3-70b", 100.0, False)
+        registry.record("openai", "gpt-4", 2000.0, True)
+
+    assert registry.should_open_circuit("groq", "llama3-70b")
+    strategy = LatencyCostStrategy(registry, explore_rate=0.0)
+    chosen = strategy.choose([
+        RouteCandidate("groq", "llama3-70b", quality_score=0.9),
+        RouteCandidate("openai", "gpt-4", quality_score=0.9, is_champion=True),
+    ])
+    assert chosen.provider == "openai"
+
+
+def test_open_circuit_recovers_without_traffic():
+    registry = ProviderStatsRegistry(half_life_seconds=120.0)
+    stats = registry.get("groq", "llama3-70b")
+    for _ in range(20):
+        stats.record(100.0, False, now=1000.0)
+
+    assert registry.should_open_circuit("groq", "llama3-70b", now=1010.0)
+    stored = stats.error_rate.value
+    # No samples arrive while the circuit is open; the error rate still decays
+    assert not registry.should_open_circuit("groq", "llama3-70b", now=1000.0 + 4 * 120.0)
+    assert stats.snapshot(now=1000.0 + 4 * 120.0)["error_rate"] < 0.1
+    assert stats.error_rate.value == stored
+
+    # Long after the incident the router considers the provider again
+    strategy = LatencyCostStrategy(registry, explore_rate=0.0)
+    pool = strategy.eligible([RouteCandidate("groq", "llama3-70b", quality_score=0.9)])
+    assert [c.provider for c in pool] == ["groq"]
@@ -0,0 +1,93 @@
+"""
+Tests for the fast serialization layer.
+"""
+
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import serialization
+from serialization import dumps, iter_json_array, loads
+
+BACKENDS = ["json"] + [b for b in ("pydantic", "orjson") if serialization._select_backend(b) == b]
+
+
+@dataclass
+class Node:
+    id: str
+    inputs: dict
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_agree_on_common_payloads(backend):
+    payload = {
+        "chain": {"id": "c1", "nodes": [{"id": "n1", "outputs": ["draft"]}], "connections": []},
+        "text": "naïve café — 東京",
+        "score": 0.92,
+        "count": 3,
+        "nested": [None, True, {"k": []}],
+    }
+    encoded = dumps(payload, backend=backend)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == payload
+    assert loads(encoded, backend=backend) == payload
+    assert loads(encoded.decode(), backend=backend) == payload
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_non_json_types_are_encoded(backend):
+    ident = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    decoded = json.loads(dumps({
+        "at": datetime(2024, 5, 1, 12, 30), "id": ident, "node": Node("n1", {"a": 1}),
+        "amount": Decimal("1.50"), "tags": {"x"},
+    }, backend=backend))
+    assert decoded["at"].startswith("2024-05-01T12:30")
+    assert decoded["id"] == str(ident)
+    assert decoded["node"] == {"id": "n1", "inputs": {"a": 1}}
+    assert decoded["amount"] == "1.50"
+    assert decoded["tags"] == ["x"]
+
+
+def _collect(gen):
+    async def run():
+        return b"".join([chunk async for chunk in gen])
+    return asyncio.run(run())
+
+
+def test_iter_json_array_streams_valid_json_in_chunks():
+    items = [{"id": i, "name": f"prompt {i}"} for i in range(250)]
+
+    async def chunks():
+        return [c async for c in iter_json_array(items, key="prompts", extra={"total": 250}, chunk_items=100)]
+
+    parts = asyncio.run(chunks())
+    assert len(parts) == 5  # head, three item chunks, tail
+    assert json.loads(b"".join(parts)) == {"prompts": items, "total": 250}
+
+    async def agen():
+        for i in range(3):
+            yield i
+
+    assert json.loads(_collect(iter_json_array(agen()))) == [0, 1, 2]
+    assert json.loads(_collect(iter_json_array([], key="runs"))) == {"runs": []}
+
+
+def test_validate_json_builds_models_and_lists():
+    pydantic = pytest.importorskip("pydantic")
+    from typing import List
+
+    class Step(pydantic.BaseModel):
+        name: str
+        score: float = 0.0
+
+    raw = dumps([{"name": "a", "score": 1}, {"name": "b"}])
+    steps = serialization.validate_json(List[Step], raw)
+    assert [s.name for s in steps] == ["a", "b"] and steps[0].score == 1.0
+    assert serialization.validate_json(Step, dumps({"name": "c"})).score == 0.0
+    with pytest.raises(pydantic.ValidationError):
+        serialization.validate_json(Step, b'{"score": 2}')
@@ -0,0 +1,54 @@
+"""
+Tests for the cross-worker shared cache and metrics exposition.
+"""
+
+import multiprocessing
+import time
+
+from metrics import render_metrics
+from shared_cache import SharedCache, SharedCacheStore
+
+
+def _write_from_child(path):
+    cache = SharedCache(SharedCacheStore(path), "dedup")
+    cache.set("doc-1", {"chunk_ids": [1, 2, 3]})
+
+
+def test_value_written_by_one_process_is_visible_to_another(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SharedCache(SharedCacheStore(path), "dedup")
+    assert cache.get("doc-1") is None
+
+    child = multiprocessing.get_context("spawn").Process(target=_write_from_child, args=(path,))
+    child.start()
+    child.join(timeout=30)
+    assert child.exitcode == 0
+
+    assert cache.get("doc-1") == {"chunk_ids": [1, 2, 3]}
+
+
+def test_namespaces_ttl_and_trim(tmp_path):
+    store = SharedCacheStore(str(tmp_path / "cache.db"))
+    metadata = SharedCache(store, "metadata", ttl_seconds=0.05, max_entries=1000)
+    context = SharedCache(store, "context", ttl_seconds=None, max_entries=5)
+
+    metadata.set("k", "meta")
+    context.set("k", "ctx")
+    assert metadata.get("k") == "meta"
+    assert context.get("k") == "ctx"
+
+    time.sleep(0.1)
+    assert metadata.get("k") is None  # expired
+    assert context.get("k") == "ctx"  # no TTL
+
+    for i in range(20):
+        context.set(f"extra-{i}", i)
+    context.trim()
+    assert context.size() == 5
+    assert context.get("extra-19") == 19  # newest entries survive
+
+
+def test_render_metrics_returns_exposition():
+    payload, content_type = render_metrics()
+    assert isinstance(payload, bytes)
+    assert content_type.startswith("text/plain")
@@ -0,0 +1,77 @@
+"""
+Tests for single-pass normalization and streaming equivalence.
+"""
+
+import random
+
+import text_normalizer
+from text_normalizer import (
+    CONFORMANCE_CORPUS,
+    StreamingNormalizer,
+    normalize_text,
+    normalize_text_legacy,
+    normalize_text_python,
+)
+
+
+def test_html_cleaning():
+    assert normalize_text_python("<p>Hello&nbsp;<b>world</b></p><p>Bye</p>") == "Hello world\n\nBye"
+    assert normalize_text_python("<ul><li>one</li><li>two</li></ul>") == "- one\n- two"
+    assert normalize_text_python("<script>alert('<p>')</script>safe<!-- x -->") == "safe"
+
+
+def test_whitespace_and_typography():
+    assert normalize_text_python("  a   b \n\n\n\n c  ") == "a b\n\nc"
+    assert normalize_text_python("“x” — y…") == '"x" - y...'
+    assert normalize_text_python("a < b && c > d") == "a < b && c > d"
+
+
+def test_one_shot_uses_the_faster_sweep_cleaner_without_the_accelerated_backend():
+    text = "<p>Hello <b>world</b></p><script>x()</script><ul><li>one</li></ul>"
+    if text_normalizer.BACKEND == "python":
+        assert normalize_text(text) == normalize_text_legacy(text) == "Hello world\n\n- one"
+
+
+def test_streaming_matches_one_shot_for_any_split():
+    rng = random.Random(7)
+    corpus = CONFORMANCE_CORPUS + [
+        "<div>Intro &amp; <em>emphasis</em></div>\n\n<pre>code   block</pre>" * 3,
+        "<style>.a{}</style><p>x</p><script src='a.js'></script>&#x263A; end",
+        "before<!-- a <!-- b --> after <!-- c",
+        "<script>if (a < b && c > d) { x = '<p>'; }</script>kept <a href='x'>link</a> &amp",
+    ]
+    for text in corpus:
+        expected = normalize_text_python(text)
+        for _ in range(25):
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text), 5)))
+            pieces = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+            normalizer = StreamingNormalizer()
+            streamed = "".join(normalizer.feed(p) for p in pieces) + normalizer.flush()
+            assert streamed == expected, (text, pieces)
+
+
+def test_streaming_emits_before_end_of_stream():
+    normalizer = StreamingNormalizer()
+    assert normalizer.feed("<p>First paragraph</p><p>Sec") == "First paragraph\n\nSec"
+    assert normalizer.feed("ond</p><b") == "ond"
+    assert normalizer.flush() == "\n\n<b"  # never closed, so literal text
+
+
+def test_unclosed_block_is_scanned_incrementally_and_capped(monkeypatch):
+    full_scans = []
+    safe_cut = text_normalizer._safe_cut
+    monkeypatch.setattr(text_normalizer, "_safe_cut", lambda buffer: full_scans.append(len(buffer)) or safe_cut(buffer))
+
+    normalizer = StreamingNormalizer(max_held_back=4096)
+    normalizer.feed("<p>start</p><script>")
+    for _ in range(200):
+        normalizer.feed("var a = b > c;" * 4)
+        assert len(normalizer._buffer) <= 4096 + 64
+    # While the block is open only new text is searched; the whole held-back
+    # buffer is never rescanned
+    assert max(full_scans) < 128
+
+    text = "<script>" + "x > y; " * 500 + "</script>after"
+    closed = StreamingNormalizer()
+    streamed = "".join(closed.feed(text[i:i + 16]) for i in range(0, len(text), 16)) + closed.flush()
+    assert streamed == normalize_text_python(text) == "after"
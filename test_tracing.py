@@ -0,0 +1,108 @@
+"""
+Tests for span sampling, histograms and the sampling profiler.
+"""
+
+import asyncio
+import threading
+import time
+
+from tracing import SamplingProfiler, Tracer, TracingMiddleware
+
+
+def test_unsampled_request_records_nothing():
+    tracer = Tracer(sample_rate=0.0)
+    token = tracer.start_trace("corr-1")
+    assert token is None
+
+    with tracer.span("dataforge.list_runs") as span:
+        span.set("ignored", True)
+
+    assert tracer.end_trace(token) is None
+    assert tracer.histograms == {}
+
+
+def test_nested_spans_keep_parent_and_exemplar():
+    tracer = Tracer(sample_rate=0.0)
+    token = tracer.start_trace("corr-2", force=True)
+
+    with tracer.span("pipeline"):
+        with tracer.span("prompt_engine.render", template="default"):
+            pass
+
+    trace = tracer.end_trace(token)
+    names = {span.name: span for span in trace.spans}
+    assert names["prompt_engine.render"].parent == "pipeline"
+    assert names["pipeline"].parent is None
+
+    snapshot = tracer.snapshot()
+    buckets = snapshot["histograms"]["pipeline"]["buckets"]
+    exemplars = [b["exemplar"] for b in buckets if b["exemplar"]]
+    assert exemplars[0]["correlation_id"] == "corr-2"
+    assert snapshot["recent_traces"][0]["correlation_id"] == "corr-2"
+
+
+def test_traced_decorator_wraps_async_functions():
+    tracer = Tracer(sample_rate=0.0)
+
+    @tracer.traced("count_tokens")
+    async def count_tokens(text):
+        return len(text.split())
+
+    async def run():
+        token = tracer.start_trace("corr-3", force=True)
+        result = await count_tokens("a b c")
+        return result, tracer.end_trace(token)
+
+    result, trace = asyncio.run(run())
+    assert result == 3
+    assert [span.name for span in trace.spans] == ["count_tokens"]
+
+
+def test_profiler_returns_folded_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    worker = threading.Thread(target=busy_worker)
+    worker.start()
+    try:
+        stacks = SamplingProfiler().profile(duration_s=0.05, interval_s=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    folded = SamplingProfiler.to_folded(stacks)
+    assert "busy_worker" in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+def _serve(tracer, headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/execute", "headers": list(headers)}
+    asyncio.run(TracingMiddleware(app, tracer)(scope, None, send))
+    return dict(sent[0]["headers"]).get(b"x-correlation-id")
+
+
+def test_middleware_only_generates_ids_for_sampled_requests():
+    unsampled = Tracer(sample_rate=0.0)
+    assert _serve(unsampled) is None
+    assert _serve(unsampled, [(b"x-correlation-id", b"corr-3")]) == b"corr-3"
+    assert not unsampled.recent_traces
+
+    sampled = Tracer(sample_rate=1.0)
+    generated = _serve(sampled)
+    assert generated and _serve(sampled, [(b"x-correlation-id", b"corr-4")]) == b"corr-4"
+    first, second = sampled.recent_traces
+    assert first.correlation_id == generated.decode()
+    assert first.spans[0].name == "http.request"
+    assert first.spans[0].attributes == {"method": "POST", "path": "/api/v1/execute", "status_code": 201}
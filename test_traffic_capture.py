@@ -0,0 +1,158 @@
+"""
+Tests for traffic capture and replay scheduling.
+"""
+
+import asyncio
+import glob
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+from traffic_capture import (
+    TrafficCaptureMiddleware,
+    TrafficRecorder,
+    load_capture,
+    replay_schedule,
+    sanitize,
+    sanitize_query,
+)
+
+
+def test_sanitize_redacts_secrets_and_text_but_keeps_identifiers():
+    body = {
+        "api_key": "sk-123",
+        "model": "gpt-4",
+        "prompt_id": "p-1",
+        "messages": [{"role": "user", "content": "my ssn is 123"}],
+        "temperature": 0.2,
+    }
+    clean = sanitize(body)
+    assert clean["api_key"] == "[REDACTED]"
+    assert clean["model"] == "gpt-4" and clean["prompt_id"] == "p-1"
+    assert clean["messages"][0] == {"role": "user", "content": "x" * len("my ssn is 123")}
+    assert clean["temperature"] == 0.2
+    assert sanitize(body, redact_text=False)["messages"][0]["content"] == "my ssn is 123"
+
+
+def test_sanitize_matches_whole_secret_keys_only():
+    body = {
+        "max_tokens": 256,
+        "usage": {"tokens_used": 10},
+        "access_token": "t",
+        "token": "t",
+        "openai_api_key": "sk",
+        "X-API-Key": "sk",
+        "client_secret": "s",
+        "clientSecret": "s",
+        "privateKey": "k",
+        "idToken": "t",
+        "APIKey": "k",
+        "tokenizer": "cl100k",
+        "cache_key": "abc",
+    }
+    clean = sanitize(body, redact_text=False)
+    assert clean["max_tokens"] == 256 and clean["usage"] == {"tokens_used": 10}
+    assert clean["tokenizer"] == "cl100k" and clean["cache_key"] == "abc"
+    for key in ("access_token", "token", "openai_api_key", "X-API-Key", "client_secret",
+                "clientSecret", "privateKey", "idToken", "APIKey"):
+        assert clean[key] == "[REDACTED]", key
+
+
+def test_structural_keys_only_pass_scalars_through():
+    clean = sanitize({"model": {"name": "secret text", "api_key": "sk"}, "user_id": ["private"]})
+    assert clean["model"] == {"name": "x" * 11, "api_key": "[REDACTED]"}
+    assert clean["user_id"] == ["x" * 7]
+
+
+def test_query_string_is_sanitized():
+    query = sanitize_query("api_key=sk-123&model=gpt-4&q=hello&limit=10", redact_text=True)
+    assert "sk-123" not in query and "hello" not in query
+    assert "model=gpt-4" in query and "limit=10" in query
+
+
+def test_recorder_rotates_segments_and_keeps_newest(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path), max_segment_bytes=500, max_segments=3)
+    for i in range(60):
+        recorder.record("POST", "/api/v1/execute", arrival_ts=1000.0 + i, body=json.dumps({"i": i}).encode())
+    recorder.close()
+
+    segments = glob.glob(os.path.join(str(tmp_path), "capture-*.ndjson.gz"))
+    assert len(segments) == 3
+    records = load_capture(str(tmp_path))
+    assert records and records[-1]["body"] == {"i": 59}
+    assert [r["ts"] for r in records] == sorted(r["ts"] for r in records)
+
+
+def test_flushed_segment_is_readable_while_still_open(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path))
+    for i in range(2000):
+        recorder.record("POST", "/api/v1/execute", arrival_ts=1000.0 + i, body=json.dumps({"i": i}).encode())
+    recorder.flush()
+
+    records = load_capture(str(tmp_path))
+    assert len(records) == 2000 and records[-1]["body"] == {"i": 1999}
+    recorder.close()
+
+
+def test_rotation_only_removes_own_and_orphaned_segments(tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    for pid in (os.getppid(), dead.pid):
+        for index in range(3):
+            with gzip.open(tmp_path / f"capture-20240101-000000-{pid}-{index:04d}.ndjson.gz", "wb") as f:
+                f.write(b'{"ts": 1}\n')
+
+    recorder = TrafficRecorder(str(tmp_path), max_segment_bytes=200, max_segments=2)
+    for i in range(20):
+        recorder.record("POST", "/api/v1/execute", arrival_ts=2000.0 + i)
+    recorder.close()
+
+    names = [os.path.basename(p) for p in glob.glob(os.path.join(str(tmp_path), "capture-*"))]
+    assert sum(f"-{os.getppid()}-" in n for n in names) == 3  # another live worker's files are untouched
+    assert sum(f"-{dead.pid}-" in n for n in names) == 0
+    assert sum(f"-{os.getpid()}-" in n for n in names) == 2
+
+
+def test_middleware_tees_body_and_records_response(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path))
+
+    async def app(scope, receive, send):
+        message = await receive()
+        assert json.loads(message["body"]) == {"prompt": "hello"}
+        await send({"type": "http.response.start", "status": 201,
+                    "headers": [(b"x-correlation-id", b"cid-42")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def run():
+        middleware = TrafficCaptureMiddleware(app, recorder)
+        scope = {"type": "http", "method": "POST", "path": "/api/v1/execute", "query_string": b"",
+                 "headers": [(b"authorization", b"Bearer secret"), (b"x-tenant-id", b"acme"),
+                             (b"x-priority", b"batch")]}
+        messages = [{"type": "http.request", "body": b'{"prompt": "hello"}', "more_body": False}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            pass
+
+        await middleware(scope, receive, send)
+
+    asyncio.run(run())
+    recorder.close()
+
+    (record,) = load_capture(str(tmp_path))
+    assert record["cid"] == "cid-42"
+    assert record["status"] == 201
+    assert record["body"] == {"prompt": "xxxxx"}
+    assert "authorization" not in record["headers"]
+    assert record["headers"] == {"x-tenant-id": "acme", "x-priority": "batch"}
+
+
+def test_replay_schedule_scales_or_fixes_rate():
+    records = [{"ts": 100.0}, {"ts": 101.0}, {"ts": 104.0}]
+    assert [o for o, _ in replay_schedule(records)] == [0.0, 1.0, 4.0]
+    assert [o for o, _ in replay_schedule(records, speed=4)] == [0.0, 0.25, 1.0]
+    assert [o for o, _ in replay_schedule(records, rps=10)] == [0.0, 0.1, 0.2]
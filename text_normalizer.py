@@ -0,0 +1,360 @@
+"""
+NeuroForge Text Normalizer
+
+Single-pass HTML cleaning and text normalization for model output and context.
+
+Markup is tokenized once with a precompiled combined pattern, and one state
+machine handles tags, entities and whitespace. The machine backs the
+incremental `StreamingNormalizer` and `normalize_text_python()`, so
+normalizing a streamed response chunk by chunk gives exactly the same text as
+normalize_text_python() on the whole response (up to max_held_back, see
+StreamingNormalizer).
+
+One-shot `normalize_text()` uses the accelerated backend (the
+`neuroforge_perf` PyO3 extension) if it reproduces normalize_text_python() on
+the conformance corpus at import time, and otherwise the multi-sweep re.sub
+cleaner (normalize_text_legacy). The pure-Python single pass is slower than
+that chain (benchmarks/bench_text_normalizer.py: 0.76x on markup-dense
+synthetic HTML, 0.92x on docs/), because per-token dispatch in Python costs
+more than the extra C-level sweeps, so it is only used where a sweep chain
+cannot run: on partial chunks.
+"""
+
+import html
+import logging
+import re
+from typing import Callable, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# One combined pass: comments, script/style blocks, tags, entities, text
+_TOKEN_RE = re.compile(
+    r"(?P<comment><!--.*?-->)"
+    r"|(?P<block><(?P<block_name>script|style)\b[^>]*>.*?</(?P=block_name)\s*>)"
+    r"|(?P<tag></?(?P<tag_name>[a-zA-Z][a-zA-Z0-9]*)\b[^<>]*>)"
+    r"|(?P<entity>&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{1,31});)"
+    r"|(?P<text>[^<&]+|[<&])",
+    re.DOTALL | re.IGNORECASE,
+)
+_TEXT_GROUP = _TOKEN_RE.groupindex["text"]
+_ENTITY_GROUP = _TOKEN_RE.groupindex["entity"]
+_TAG_GROUP = _TOKEN_RE.groupindex["tag"]
+_SPACE_RUN_RE = re.compile(r"[^\S\n]{2,}|[^\S \n]")
+_BLANK_LINES_RE = re.compile(r" ?\n(?: ?\n)+ ?")
+_LINE_BREAK_RE = re.compile(r" \n ?|\n ")
+_OPEN_BLOCK_RE = re.compile(r"<(script|style)\b", re.IGNORECASE)
+_MAX_ENTITY_LENGTH = 40
+# Longest unterminated construct (comment, script/style block, tag) a stream
+# holds back before giving up on it and emitting it as text
+_MAX_HELD_BACK = 64 * 1024
+
+# Whitespace implied by a tag: paragraph-level tags leave a blank line,
+# line-level tags break the line, table cells are separated by a space
+_TAG_WHITESPACE = {
+    **dict.fromkeys(["br", "tr", "dt", "dd", "hr"], "\n"),
+    **dict.fromkeys([
+        "p", "div", "section", "article", "header", "footer", "blockquote", "pre",
+        "ul", "ol", "table", "h1", "h2", "h3", "h4", "h5", "h6",
+    ], "\n\n"),
+    **dict.fromkeys(["td", "th"], " "),
+}
+
+# Typographic characters mapped to plain text; invisible and control
+# characters removed (str.replace on a few literals beats a translate table)
+_REPLACEMENTS = (
+    ("\u2018", "'"), ("\u2019", "'"), ("\u201c", '"'), ("\u201d", '"'),
+    ("\u2013", "-"), ("\u2014", "-"), ("\u2026", "..."), ("\u00a0", " "),
+)
+_REMOVED_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f-\x9f\u200b-\u200d\ufeff]+")
+
+
+def _translate(text: str) -> str:
+    for source, target in _REPLACEMENTS:
+        if source in text:
+            text = text.replace(source, target)
+    if _REMOVED_RE.search(text):
+        text = _REMOVED_RE.sub("", text)
+    return text
+
+
+class _NormalizerState:
+    """Token-driven state machine shared by one-shot and streaming modes."""
+
+    __slots__ = ("out", "pending_newlines", "pending_space", "started", "prefix")
+
+    def __init__(self):
+        self.out: List[str] = []
+        self.pending_newlines = 0
+        self.pending_space = False
+        self.started = False
+        self.prefix = ""
+
+    def _separator(self) -> str:
+        if not self.started:
+            return ""
+        if self.pending_newlines:
+            return "\n" if self.pending_newlines == 1 else "\n\n"
+        return " " if self.pending_space else ""
+
+    def _pend(self, whitespace: str) -> None:
+        newlines = whitespace.count("\n")
+        if newlines:
+            self.pending_newlines += newlines
+        elif whitespace:
+            self.pending_space = True
+
+    def text(self, text: str) -> None:
+        text = _translate(text)
+        stripped = text.lstrip()
+        if not stripped:
+            self._pend(text)
+            return
+        core = stripped.rstrip()
+        self._pend(text[:len(text) - len(stripped)])
+
+        # Collapse inner whitespace in bulk: runs with 2+ newlines become a
+        # blank line, runs with one newline a line break, the rest a space
+        body = _SPACE_RUN_RE.sub(" ", core)
+        if "\n" in body:
+            body = _LINE_BREAK_RE.sub("\n", _BLANK_LINES_RE.sub("\n\n", body))
+
+        self.out.append(self._separator() + self.prefix + body)
+        self.prefix = ""
+        self.started = True
+        self.pending_newlines = 0
+        self.pending_space = False
+        self._pend(stripped[len(core):])
+
+    def list_item(self) -> None:
+        self.pending_newlines = max(self.pending_newlines, 1)
+        self.prefix = "- "
+
+    def feed_tokens(self, text: str) -> None:
+        """
+        Tokenize once; tags become the whitespace they imply, so each run of
+        text between list items is normalized with a few C-level passes.
+        """
+        pieces: List[str] = []
+        append = pieces.append
+        for match in _TOKEN_RE.finditer(text):
+            kind = match.lastindex
+            if kind == _TEXT_GROUP:
+                append(match.group())
+            elif kind == _ENTITY_GROUP:
+                append(html.unescape(match.group()))
+            elif kind == _TAG_GROUP:
+                name = match.group("tag_name").lower()
+                if name == "li":
+                    if not match.group("tag").startswith("</"):
+                        self.text("".join(pieces))
+                        pieces.clear()
+                        self.list_item()
+                else:
+                    replacement = _TAG_WHITESPACE.get(name)
+                    if replacement:
+                        append(replacement)
+            # comments and script/style blocks are dropped
+        if pieces:
+            self.text("".join(pieces))
+
+    def take(self) -> str:
+        chunk = "".join(self.out)
+        self.out.clear()
+        return chunk
+
+
+def _safe_cut(buffer: str) -> int:
+    """
+    Length of the buffer prefix that can be tokenized now.
+
+    Holds back anything that could still become a tag, comment, script/style
+    block or entity once more input arrives.
+    """
+    cut = len(buffer)
+
+    lt = buffer.rfind("<")
+    if lt != -1 and ">" not in buffer[lt:]:
+        # A "<" followed by anything but a tag start is literal text
+        following = buffer[lt + 1:lt + 2]
+        if not following or following.isalpha() or following in "/!":
+            cut = lt
+    # The first comment left open, not the last "<!--": one nested inside an
+    # open comment is part of it
+    comment = buffer.find("<!--")
+    while comment != -1 and comment < cut:
+        end = buffer.find("-->", comment + 4)
+        if end == -1:
+            cut = comment
+            break
+        comment = buffer.find("<!--", end + 3)
+    for match in _OPEN_BLOCK_RE.finditer(buffer):
+        closing = re.compile(rf"</{match.group(1)}\s*>", re.IGNORECASE)
+        if not closing.search(buffer, match.end()):
+            cut = min(cut, match.start())
+            break
+    amp = buffer.rfind("&")
+    if amp != -1 and ";" not in buffer[amp:] and len(buffer) - amp <= _MAX_ENTITY_LENGTH:
+        cut = min(cut, amp)
+    return cut
+
+
+def _pending_closer(buffer: str) -> Optional[Callable[[str, int], bool]]:
+    """
+    For a held-back buffer that starts with an unterminated comment, block or
+    tag: a check whether the buffer now terminates it, given how much of the
+    buffer was already searched. Resuming from there keeps a long unclosed
+    construct from being rescanned on every chunk.
+    """
+    if buffer.startswith("<!--"):
+        if "-->" in buffer[4:]:
+            return None
+        return lambda buf, scanned: buf.find("-->", max(4, scanned - 2)) != -1
+    block = _OPEN_BLOCK_RE.match(buffer)
+    if block:
+        closing = re.compile(rf"</{block.group(1)}\s*>", re.IGNORECASE)
+        if closing.search(buffer, block.end()):
+            return None
+        start = block.end()
+
+        def closes(buf: str, scanned: int) -> bool:
+            # A closing tag straddling the old end starts at its last "<"
+            resume = buf.rfind("<", start, scanned)
+            return closing.search(buf, max(start, resume if resume != -1 else scanned)) is not None
+
+        return closes
+    following = buffer[1:2]
+    if buffer[:1] == "<" and following and (following.isalpha() or following in "/!"):
+        if "<" in buffer[1:] or ">" in buffer:
+            return None
+        return lambda buf, scanned: buf.find(">", scanned) != -1 or buf.find("<", scanned) != -1
+    return None
+
+
+def normalize_text_python(text: str) -> str:
+    """Pure-Python single pass; the reference the other backends are checked against."""
+    state = _NormalizerState()
+    state.feed_tokens(text)
+    return state.take()
+
+
+# Multi-sweep cleaner: one regex pass per concern. Coarser rules than the
+# single pass (e.g. table cells, typography), but faster in pure Python.
+_LEGACY_STEPS = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    (re.compile(r"<script\b.*?</script\s*>", re.S | re.I), ""),
+    (re.compile(r"<style\b.*?</style\s*>", re.S | re.I), ""),
+    (re.compile(r"<br\s*/?>", re.I), "\n"),
+    (re.compile(r"</?(p|div|h[1-6]|ul|ol|table|pre|blockquote)\b[^>]*>", re.I), "\n\n"),
+    (re.compile(r"<li\b[^>]*>", re.I), "\n- "),
+    (re.compile(r"<[^>]+>"), ""),
+    (re.compile(r"[\u2018\u2019]"), "'"),
+    (re.compile(r"[\u201c\u201d]"), '"'),
+    (re.compile(r"[\u2013\u2014]"), "-"),
+    (re.compile(r"[ \t]+"), " "),
+    (re.compile(r" *\n *"), "\n"),
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+
+def normalize_text_legacy(text: str) -> str:
+    """Multi-sweep re.sub cleaner; the one-shot path without the accelerated backend."""
+    for pattern, replacement in _LEGACY_STEPS:
+        text = pattern.sub(replacement, text)
+    return html.unescape(text).strip()
+
+
+class StreamingNormalizer:
+    """
+    Incremental normalizer for streamed model output.
+
+    Usage:
+        normalizer = StreamingNormalizer()
+        for chunk in stream:
+            yield normalizer.feed(chunk)
+        yield normalizer.flush()
+    """
+
+    def __init__(self, max_held_back: int = _MAX_HELD_BACK):
+        self.max_held_back = max_held_back
+        self._state = _NormalizerState()
+        self._buffer = ""
+        self._closer: Optional[Callable[[str, int], bool]] = None  # see _pending_closer
+        self._scanned = 0
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; returns the normalized text that is now final."""
+        self._buffer += chunk
+        if self._closer is None or self._closer(self._buffer, self._scanned):
+            cut = _safe_cut(self._buffer)
+            if cut:
+                self._consume(cut)
+            self._closer = _pending_closer(self._buffer)
+        # else: still unterminated, and only the new text was searched
+        if len(self._buffer) > self.max_held_back:
+            # Give up on a construct that never closes; from here on the output
+            # may differ from normalizing the whole text at once
+            self._consume(len(self._buffer))
+            self._closer = None
+        self._scanned = len(self._buffer)
+        return self._state.take()
+
+    def _consume(self, cut: int) -> None:
+        self._state.feed_tokens(self._buffer[:cut])
+        self._buffer = self._buffer[cut:]
+
+    def flush(self) -> str:
+        """End of stream: normalize whatever is still held back."""
+        if self._buffer:
+            self._consume(len(self._buffer))
+        self._closer = None
+        self._scanned = 0
+        return self._state.take()
+
+
+# Inputs the accelerated backend must reproduce exactly before it is enabled
+CONFORMANCE_CORPUS = [
+    "",
+    "  plain   text \n\n\n\n with   gaps  ",
+    "<p>Hello&nbsp;<b>world</b></p><p>Second&amp;para</p>",
+    "<ul><li>one</li><li>two</li></ul>trailing",
+    "<script>var x = '<p>';</script>kept<!-- dropped --> text",
+    "a < b && c > d; &unknown; &#169; &#x263A;",
+    "“Quoted” — dash… zero​width\r\nline",
+    "<table><tr><td>a</td><td>b</td></tr></table>",
+    "<STYLE>p {}</STYLE><BR>Caps<br/>tags",
+]
+
+
+def _load_accelerated() -> Optional[Callable[[str], str]]:
+    if config.text_normalizer_backend == "python":
+        return None
+    try:
+        from neuroforge_perf import normalize_text as accelerated
+    except ImportError:
+        return None
+    try:
+        mismatches = [s for s in CONFORMANCE_CORPUS if accelerated(s) != normalize_text_python(s)]
+    except Exception as e:
+        logger.warning(f"Accelerated text normalizer failed conformance check: {e}")
+        return None
+    if mismatches:
+        logger.warning(
+            f"Accelerated text normalizer disagrees on {len(mismatches)} conformance "
+            "inputs; using pure-Python backend"
+        )
+        return None
+    logger.info("Using accelerated text normalizer backend")
+    return accelerated
+
+
+_accelerated = _load_accelerated()
+BACKEND = "accelerated" if _accelerated else "python"
+
+
+def normalize_text(text: str) -> str:
+    """Clean markup and normalize whitespace and typography (fastest available one-shot backend)."""
+    if _accelerated is not None:
+        return _accelerated(text)
+    return normalize_text_legacy(text)
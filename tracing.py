@@ -0,0 +1,352 @@
+"""
+NeuroForge Tracing
+
+Low-overhead span instrumentation and on-demand profiling for the hot path.
+
+Traces are sampled once per request and keyed by the request's correlation_id.
+Spans opened inside an unsampled request cost a single context variable lookup,
+so the default 1% sample rate adds no measurable latency.
+"""
+
+import functools
+import inspect
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+try:
+    from prometheus_client import Histogram
+except ImportError:  # prometheus_client is optional for the workbench app
+    Histogram = None
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")
+)
+
+SPAN_LATENCY = None
+if Histogram is not None:
+    SPAN_LATENCY = Histogram(
+        "neuroforge_span_latency_ms",
+        "Latency of traced spans (sampled requests only)",
+        ["span"],
+        buckets=LATENCY_BUCKETS_MS,
+    )
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("neuroforge_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("neuroforge_span", default=None)
+
+
+@dataclass
+class SpanRecord:
+    """A finished span inside a sampled trace."""
+    name: str
+    parent: Optional[str]
+    start_offset_ms: float
+    duration_ms: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    """All spans recorded for one sampled request."""
+    correlation_id: str
+    started_at: float = field(default_factory=time.time)
+    started_perf: float = field(default_factory=time.perf_counter)
+    spans: List[SpanRecord] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "correlation_id": self.correlation_id,
+            "started_at": self.started_at,
+            "spans": [span.__dict__ for span in self.spans],
+        }
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram keeping the latest exemplar per bucket."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.exemplars: List[Optional[Dict[str, Any]]] = [None] * len(buckets)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float, correlation_id: Optional[str] = None) -> None:
+        index = next(i for i, bound in enumerate(self.buckets) if value_ms <= bound)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value_ms
+            if correlation_id:
+                self.exemplars[index] = {
+                    "correlation_id": correlation_id,
+                    "value_ms": round(value_ms, 3),
+                    "timestamp": time.time(),
+                }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = 0
+            buckets = []
+            for bound, count, exemplar in zip(self.buckets, self.counts, self.exemplars):
+                cumulative += count
+                buckets.append({
+                    "le": "+Inf" if bound == float("inf") else bound,
+                    "count": cumulative,
+                    "exemplar": exemplar,
+                })
+            return {"count": cumulative, "sum_ms": round(self.total, 3), "buckets": buckets}
+
+
+class _NoopSpan:
+    """Shared span returned when the current request is not sampled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    async def __aenter__(self) -> "_NoopSpan":
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """Active span inside a sampled trace; usable with `with` and `async with`."""
+
+    __slots__ = ("tracer", "trace", "name", "attributes", "_start", "_token", "_parent")
+
+    def __init__(self, tracer: "Tracer", trace: Trace, name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> "_Span":
+        self._parent = _current_span.get()
+        self._token = _current_span.set(self.name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer._finish_span(self.trace, SpanRecord(
+            name=self.name,
+            parent=self._parent,
+            start_offset_ms=(self._start - self.trace.started_perf) * 1000,
+            duration_ms=(end - self._start) * 1000,
+            attributes=self.attributes,
+        ))
+        return False
+
+    async def __aenter__(self) -> "_Span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return self.__exit__(exc_type, exc, tb)
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Tracer:
+    """Sampling tracer with per-span latency histograms and a recent-trace buffer."""
+
+    def __init__(self, sample_rate: float = 0.01, max_traces: int = 200):
+        self.sample_rate = sample_rate
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.recent_traces: deque = deque(maxlen=max_traces)
+        self._histogram_lock = threading.Lock()
+
+    def start_trace(self, correlation_id: Optional[str] = None, force: bool = False):
+        """
+        Decide sampling for the current request and bind the trace to the context.
+
+        Returns a token for `end_trace`, or None when the request is not sampled.
+        """
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        trace = Trace(correlation_id=correlation_id or str(uuid.uuid4()))
+        return _current_trace.set(trace)
+
+    def end_trace(self, token) -> Optional[Trace]:
+        """Unbind the trace started by `start_trace` and keep it for inspection."""
+        if token is None:
+            return None
+        trace = _current_trace.get()
+        _current_trace.reset(token)
+        if trace is not None:
+            self.recent_traces.append(trace)
+        return trace
+
+    def current_correlation_id(self) -> Optional[str]:
+        trace = _current_trace.get()
+        return trace.correlation_id if trace else None
+
+    def span(self, name: str, **attributes):
+        """Open a span; a shared no-op object is returned for unsampled requests."""
+        trace = _current_trace.get()
+        if trace is None:
+            return _NOOP_SPAN
+        return _Span(self, trace, name, attributes)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator wrapping a sync or async function in a span."""
+        def decorator(func: Callable) -> Callable:
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish_span(self, trace: Trace, record: SpanRecord) -> None:
+        trace.spans.append(record)
+        histogram = self.histograms.get(record.name)
+        if histogram is None:
+            with self._histogram_lock:
+                histogram = self.histograms.setdefault(record.name, LatencyHistogram())
+        histogram.observe(record.duration_ms, trace.correlation_id)
+        if SPAN_LATENCY is not None:
+            try:
+                SPAN_LATENCY.labels(span=record.name).observe(
+                    record.duration_ms,
+                    exemplar={"correlation_id": trace.correlation_id},
+                )
+            except Exception as e:
+                logger.debug(f"Failed to export span latency: {e}")
+
+    def snapshot(self, trace_limit: int = 20) -> Dict[str, Any]:
+        """Histograms and the most recent sampled traces."""
+        return {
+            "sample_rate": self.sample_rate,
+            "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            "recent_traces": [t.to_dict() for t in list(self.recent_traces)[-trace_limit:]],
+        }
+
+
+class SamplingProfiler:
+    """Time-boxed wall-clock sampling profiler over every thread of the live process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+    def profile(self, duration_s: float, interval_s: float = 0.005) -> Dict[str, int]:
+        """
+        Sample all thread stacks for `duration_s` seconds.
+
+        Returns collapsed stacks ("root;...;leaf" -> samples), the input format
+        for flamegraph.pl and speedscope. Raises RuntimeError if a profile is
+        already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profiling session is already running")
+        try:
+            own_thread = threading.get_ident()
+            stacks: Dict[str, int] = {}
+            deadline = time.monotonic() + duration_s
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(self._frame_label(frame))
+                        frame = frame.f_back
+                    key = ";".join(reversed(labels))
+                    stacks[key] = stacks.get(key, 0) + 1
+                time.sleep(interval_s)
+            return stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def to_folded(stacks: Dict[str, int]) -> str:
+        """Render collapsed stacks as flamegraph-ready text."""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(stacks.items()))
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware sampling a trace per request.
+
+    The trace is keyed by the X-Correlation-ID request header; a sampled
+    request without one gets a generated id. The id, when there is one, is
+    echoed in the response's X-Correlation-ID header.
+    """
+
+    def __init__(self, app, tracer: "Tracer"):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next(
+            (v.decode("latin-1") for k, v in scope.get("headers", []) if k.lower() == b"x-correlation-id"), None
+        )
+        token = self.tracer.start_trace(incoming)
+        correlation_id = self.tracer.current_correlation_id() if token is not None else incoming
+        try:
+            with self.tracer.span("http.request", method=scope.get("method"), path=scope["path"]) as span:
+
+                async def traced_send(message):
+                    if message["type"] == "http.response.start":
+                        span.set("status_code", message["status"])
+                        if correlation_id:
+                            message = dict(message)
+                            message["headers"] = list(message.get("headers", [])) + [
+                                (b"x-correlation-id", correlation_id.encode("latin-1"))
+                            ]
+                    await send(message)
+
+                await self.app(scope, receive, traced_send)
+        finally:
+            self.tracer.end_trace(token)
+
+
+# Global instances
+tracer = Tracer(sample_rate=config.trace_sample_rate)
+profiler = SamplingProfiler()
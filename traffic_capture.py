@@ -0,0 +1,394 @@
+"""
+NeuroForge Traffic Capture
+
+Records sanitized production requests for replay and capacity planning.
+
+Each request is written as one compact JSON line (arrival time, correlation
+id, method, path, route template, sanitized headers and body, status,
+latency) to gzip segments that rotate by size. Lines are queued to a writer
+thread, so compression and file I/O stay off the event loop; when the queue
+is full, records are dropped rather than slowing requests down. Segment
+names carry the worker pid and each worker keeps its newest N segments,
+never touching files another live worker is writing. Secrets are always
+redacted; with text redaction on, string values are replaced by same-length
+filler so payload sizes survive but content does not.
+
+benchmarks/replay_traffic.py replays captures against an instance.
+"""
+
+import glob
+import gzip
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from config import config
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_SAFE_HEADERS = frozenset({
+    "content-type", "accept", "user-agent", "x-correlation-id",
+    # Admission control inputs; replay must keep tenant and priority mix
+    "x-tenant-id", "x-priority", "x-request-timeout",
+})
+# Keys are split into word parts (snake, kebab and camelCase) and matched on
+# whole parts: "max_tokens" or "tokens_used" must survive for replay
+_WORD_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+")
+_SECRET_PARTS = frozenset({"secret", "password", "passwd", "apikey", "cookie", "authorization", "credentials"})
+_SECRET_KEY_QUALIFIERS = frozenset({"api", "private", "secret", "access", "signing", "encryption"})
+_REDACTED = "[REDACTED]"
+# Identifiers that drive routing on replay; their values are kept verbatim
+_STRUCTURAL_KEYS = frozenset({"model", "provider", "role", "type", "task_type", "domain", "version", "format"})
+_MAX_BODY_BYTES = 1024 * 1024
+
+
+def is_secret_key(key: str) -> bool:
+    """True for api_key, clientSecret, privateKey, X-API-Key, idToken, Set-Cookie, ..."""
+    parts = [part.lower() for part in _WORD_PART_RE.findall(key)]
+    if not parts:
+        return False
+    if _SECRET_PARTS.intersection(parts) or parts[-1] == "token":
+        return True
+    return len(parts) > 1 and parts[-1] == "key" and parts[-2] in _SECRET_KEY_QUALIFIERS
+
+
+def _sanitize_field(key: str, value: Any, redact_text: bool) -> Any:
+    if is_secret_key(key):
+        return _REDACTED
+    if (key in _STRUCTURAL_KEYS or key.endswith("_id")) and not isinstance(value, (dict, list)):
+        return value
+    return sanitize(value, redact_text)
+
+
+def sanitize(value: Any, redact_text: bool = True) -> Any:
+    """Drop secrets; optionally replace free text with same-length filler."""
+    if isinstance(value, dict):
+        return {k: _sanitize_field(k, v, redact_text) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v, redact_text) for v in value]
+    if isinstance(value, str) and redact_text:
+        return "x" * len(value)
+    return value
+
+
+def sanitize_query(query: str, redact_text: bool = True) -> str:
+    """Query string with the same treatment as body fields; numeric values are kept."""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([
+        (k, v if v.lstrip("-").replace(".", "", 1).isdigit() and not is_secret_key(k)
+         else _sanitize_field(k, v, redact_text))
+        for k, v in pairs
+    ])
+
+
+class TrafficRecorder:
+    """Queues capture records for a writer thread that appends to gzip NDJSON segments."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segments: int = 20,
+        sample_rate: float = 1.0,
+        redact_text: bool = True,
+        compresslevel: int = 1,
+        max_queue: int = 10000
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.sample_rate = sample_rate
+        self.redact_text = redact_text
+        self.compresslevel = compresslevel
+
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()  # guards the writer thread's lifecycle
+        self._writer: Optional[threading.Thread] = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._segment_bytes = 0
+        self._segment_index = 0
+        self.recorded = 0
+        self.dropped = 0
+
+    def should_capture(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        arrival_ts: float,
+        correlation_id: Optional[str] = None,
+        route: Optional[str] = None,
+        query: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        body: bytes = b"",
+        status: Optional[int] = None,
+        latency_ms: Optional[float] = None
+    ) -> None:
+        entry: Dict[str, Any] = {
+            "ts": round(arrival_ts, 6),
+            "cid": correlation_id,
+            "method": method,
+            "path": path,
+            "route": route or path,
+        }
+        if query:
+            entry["query"] = sanitize_query(query, self.redact_text)
+        if headers:
+            entry["headers"] = {k: v for k, v in headers.items() if k.lower() in _SAFE_HEADERS}
+        if body:
+            try:
+                entry["body"] = sanitize(loads(body), self.redact_text)
+            except (ValueError, UnicodeDecodeError):
+                entry["body_bytes"] = len(body)  # non-JSON payloads keep only their size
+        if status is not None:
+            entry["status"] = status
+        if latency_ms is not None:
+            entry["latency_ms"] = round(latency_ms, 2)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(dumps(entry) + b"\n")
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Wait for queued records to be written and make them readable by load_capture."""
+        if self._writer is None:
+            return
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            line = self._queue.get()
+            try:
+                if line is None:
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    return
+                self._write(line)
+                if self._queue.empty() and self._file is not None:
+                    self._file.flush()  # sync-flush so readers see complete lines
+            except OSError as e:
+                logger.warning(f"Traffic capture write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, line: bytes) -> None:
+        if self._file is None or self._segment_bytes >= self.max_segment_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._segment_bytes += len(line)
+        self.recorded += 1
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_index += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        path = os.path.join(self.directory, f"capture-{stamp}-{os.getpid()}-{self._segment_index:04d}.ndjson.gz")
+        self._file = gzip.open(path, "wb", compresslevel=self.compresslevel)
+        self._segment_bytes = 0
+
+        own, orphaned = [], []
+        for segment in glob.glob(os.path.join(self.directory, "capture-*.ndjson.gz")):
+            pid = _segment_pid(segment)
+            if pid == os.getpid():
+                own.append(segment)
+            elif pid is not None and not _pid_alive(pid):
+                orphaned.append(segment)
+        own.sort(key=os.path.getmtime)
+        # Retention is per worker; orphaned segments count against this worker's budget
+        expired = own[:-self.max_segments]
+        spare = max(0, self.max_segments - len(own))
+        orphaned.sort(key=os.path.getmtime)
+        expired += orphaned[:max(0, len(orphaned) - spare)]
+        for old in expired:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _segment_pid(path: str) -> Optional[int]:
+    """Worker pid from capture-<date>-<time>-<pid>-<index>.ndjson.gz."""
+    parts = os.path.basename(path).split("-")
+    return int(parts[3]) if len(parts) == 5 and parts[3].isdigit() else None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TrafficCaptureMiddleware:
+    """
+    Pure ASGI middleware that tees request bodies into the recorder.
+
+    The body is collected as the app consumes it, so nothing is read twice
+    and streaming endpoints are unaffected.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.should_capture():
+            await self.app(scope, receive, send)
+            return
+
+        arrival_ts = time.time()
+        start = time.perf_counter()
+        body = bytearray()
+        response: Dict[str, Any] = {}
+
+        async def tee_receive():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < _MAX_BODY_BYTES:
+                body.extend(message.get("body", b""))
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for key, value in message.get("headers", []):
+                    if key.lower() == b"x-correlation-id":
+                        response["cid"] = value.decode("latin-1")
+            await send(message)
+
+        try:
+            await self.app(scope, tee_receive, capture_send)
+        finally:
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+            route = scope.get("route")
+            try:
+                self.recorder.record(
+                    method=scope["method"],
+                    path=scope["path"],
+                    arrival_ts=arrival_ts,
+                    correlation_id=response.get("cid") or headers.get("x-correlation-id"),
+                    route=getattr(route, "path", None),
+                    query=scope.get("query_string", b"").decode("latin-1"),
+                    headers=headers,
+                    body=bytes(body),
+                    status=response.get("status"),
+                    latency_ms=(time.perf_counter() - start) * 1000,
+                )
+            except Exception as e:
+                logger.warning(f"Traffic capture failed: {e}")
+
+
+# ----------------------------------------------------------------------
+# Replay helpers
+# ----------------------------------------------------------------------
+
+def _read_segment(path: str) -> bytes:
+    """
+    Decompressed contents of a segment, including one still being written.
+
+    An open segment has no gzip trailer yet, so gzip.open() would raise
+    EOFError; decompressing incrementally keeps every complete line.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not path.endswith(".gz"):
+        return data
+    out = []
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            out.append(decompressor.decompress(data))
+        except zlib.error as e:
+            logger.warning(f"Corrupt capture segment {path}: {e}")
+            break
+        data = decompressor.unused_data  # next gzip member, if any
+    return b"".join(out)
+
+
+def load_capture(path: str) -> List[Dict[str, Any]]:
+    """Records from a segment file or a capture directory, in arrival order."""
+    paths = sorted(glob.glob(os.path.join(path, "capture-*.ndjson.gz"))) if os.path.isdir(path) else [path]
+    records = []
+    for segment in paths:
+        for line in _read_segment(segment).splitlines():
+            try:
+                records.append(loads(line))
+            except ValueError:
+                break  # truncated tail of a segment still being written
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def replay_schedule(
+    records: List[Dict[str, Any]],
+    speed: float = 1.0,
+    rps: Optional[float] = None
+) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    (offset_seconds, record) pairs.
+
+    By default preserves captured inter-arrival gaps scaled by 1/speed; with
+    `rps` requests are spaced evenly at that rate instead.
+    """
+    if not records:
+        return
+    t0 = records[0]["ts"]
+    for i, record in enumerate(records):
+        if rps:
+            yield i / rps, record
+        else:
+            yield (record["ts"] - t0) / speed, record
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+# Global instance
+traffic_recorder = TrafficRecorder(
+    directory=config.traffic_capture_dir,
+    max_segment_bytes=config.traffic_capture_segment_bytes,
+    max_segments=config.traffic_capture_max_segments,
+    sample_rate=config.traffic_capture_sample_rate,
+    redact_text=config.traffic_capture_redact_text,
+)
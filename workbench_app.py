@@ -4,14 +4,19 @@ Simplified FastAPI app for workbench routers only.
 Uses DataForge for all persistence (stateless architecture).
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import logging
+import os
 
 from config import config
+from tracing import TracingMiddleware, tracer
+from admission_control import AdmissionMiddleware, admission_controller, stream_admission_controller
+from provider_pool import provider_transport
+from ollama_scheduler import ollama_scheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +30,22 @@ from neuroforge_backend.workbench import (
     execution_router
 )
 from neuroforge_backend import auth_router
+import admin_router
+import inference_history_router
+import models_router
+import planning_sessions_router
+import prompt_versions_router
+import database
+from database import close_db
+from deployment_cache import deployment_resolver
+from embedding_service import embedding_service
+from fallback_maintenance import fallback_maintainer
+from planning_sessions import planning_sessions
+from prompt_cache import init_prompt_cache_store, prompt_cache_ledger
+from provider_catalog import provider_catalog
+from traffic_capture import TrafficCaptureMiddleware, traffic_recorder
+from metrics import render_metrics
+from output_cache import init_shared_output_cache
 
 # Import VibeForge automation routers directly (bypass __init__.py)
 import sys
@@ -64,7 +85,26 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Configure CORS
+# Admission control for LLM-bound endpoints (inside tracing, so queue time is a span)
+if config.admission_enabled:
+    app.add_middleware(
+        AdmissionMiddleware, controller=admission_controller, routes=config.admission_routes,
+        trusted_clients=config.admission_trusted_clients
+    )
+    app.add_middleware(
+        AdmissionMiddleware, controller=stream_admission_controller, routes=config.admission_stream_routes,
+        trusted_clients=config.admission_trusted_clients
+    )
+
+# Sampled request tracing
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Capture sanitized traffic for replay (outside tracing, so it sees the correlation id)
+if config.traffic_capture_enabled:
+    app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
+# Configure CORS (added last so it is outermost: preflights are answered before
+# admission control, and 429/503 rejections still carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # TODO: Restrict in production
@@ -73,12 +113,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
 # Include routers
 app.include_router(
     auth_router.router,
     tags=["authentication"]
 )
 
+app.include_router(
+    admin_router.router,
+    tags=["admin"]
+)
+
+app.include_router(
+    inference_history_router.router,
+    tags=["inference"]
+)
+
+app.include_router(
+    models_router.router,
+    tags=["models"]
+)
+
+app.include_router(
+    planning_sessions_router.router,
+    tags=["planning"]
+)
+
+app.include_router(
+    prompt_versions_router.router,
+    tags=["prompts"]
+)
+
 app.include_router(
     prompt_router.router,
     prefix="/api/v1/workbench",
@@ -115,6 +181,45 @@ app.include_router(
 )
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Pre-warm provider pools, open the local inference database and start background upkeep."""
+    if config.provider_prewarm:
+        provider_transport.warm_in_background()
+    try:
+        await inference_history_router.init_history_store()
+    except Exception as e:
+        logger.error(f"Failed to initialize inference history store: {e}")
+    try:
+        await init_prompt_cache_store()
+    except Exception as e:
+        logger.error(f"Failed to initialize prompt cache accounting: {e}")
+    try:
+        await planning_sessions.purge(config.planning_session_retention_hours)
+    except Exception as e:
+        logger.error(f"Failed to purge old planning sessions: {e}")
+    init_shared_output_cache()
+    if os.path.exists(config.fallback_db_path):
+        fallback_maintainer.start()
+    deployment_resolver.start()
+    provider_catalog.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background upkeep and close shared connections and the local database."""
+    await provider_catalog.stop()
+    await planning_sessions.close()
+    await deployment_resolver.stop()
+    await fallback_maintainer.stop()
+    await prompt_cache_ledger.stop(database.engine)
+    await embedding_service.close()
+    await ollama_scheduler.close()
+    await provider_transport.close()
+    await close_db()
+    traffic_recorder.close()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -126,6 +231,13 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metrics, aggregated across workers in multi-worker mode."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint with service info."""
@@ -136,6 +248,8 @@ async def root():
         "description": "Stateless compute layer - all data persisted in DataForge",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
+            "models": "/api/v1/models",
             "docs": "/docs",
             "prompts": "/api/v1/workbench/prompts",
             "chains": "/api/v1/workbench/chains",